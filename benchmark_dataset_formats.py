@@ -0,0 +1,140 @@
+# MIT License
+# 
+# Copyright (c) 2018
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+r"""Benchmarks the storage options of a network dataset.
+
+The image list of the network stage is rewritten with every image encoding and
+record compression of the TensorFlow files, and as memory-mapped arrays. The
+on-disk size, the conversion time and the training input throughput of each
+option are printed as a table.
+
+Usage:
+```shell
+
+$ python benchmark_dataset_formats.py \
+	--network_name=ONet \
+	--dataset_root_dir=./data/datasets/mtcnn
+
+$ python benchmark_dataset_formats.py \
+	--network_name=PNet \
+	--dataset_root_dir=./data/datasets/mtcnn \
+	--number_of_batches=200
+```
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import argparse
+import tensorflow as tf
+
+from datasets.TensorFlowDataset import TensorFlowDataset
+from datasets.MemmapDataset import MemmapDataset
+from datasets.MemmapWriter import MemmapWriter
+from nets.NetworkFactory import NetworkFactory
+
+def input_throughput(read_batch, batch_size, number_of_batches):
+	graph = tf.Graph()
+	with graph.as_default():
+		batch = read_batch()
+		with tf.Session() as session:
+			coordinator = tf.train.Coordinator()
+			threads = tf.train.start_queue_runners(sess=session, coord=coordinator)
+			session.run(batch)
+			start_time = time.time()
+			for _ in range(number_of_batches):
+				session.run(batch)
+			elapsed_time = time.time() - start_time
+			coordinator.request_stop()
+			coordinator.join(threads)
+	return(batch_size * number_of_batches / elapsed_time)
+
+def benchmark_tensorflow_format(tensorflow_file_name, target_root_dir, image_size, image_encoding, compression_type, batch_size, number_of_batches):
+	start_time = time.time()
+	TensorFlowDataset().generate_from_tensorflow_files([(tensorflow_file_name, None)], target_root_dir, 'image_list', 1, image_encoding, compression_type, shuffle=False)
+	conversion_time = time.time() - start_time
+
+	target_file_name = TensorFlowDataset.tensorflow_file_name(TensorFlowDataset.tensorflow_dir(target_root_dir), 'image_list')
+	size = sum(os.path.getsize(file_name) for file_name in TensorFlowDataset.tensorflow_file_names(target_file_name))
+	throughput = input_throughput(lambda: TensorFlowDataset().read_tensorflow_file(target_file_name, batch_size, image_size), batch_size, number_of_batches)
+	TensorFlowDataset.remove_tensorflow_files(target_file_name)
+	return(size, conversion_time, throughput)
+
+def benchmark_memmap_format(tensorflow_file_name, target_root_dir, image_size, batch_size, number_of_batches):
+	start_time = time.time()
+	MemmapDataset().convert(tensorflow_file_name, target_root_dir, 'image_list')
+	conversion_time = time.time() - start_time
+
+	target_file_name = MemmapDataset.memmap_file_name(MemmapDataset.memmap_dir(target_root_dir), 'image_list')
+	size = sum(os.path.getsize(MemmapWriter.array_file_name(file_name, array_name)) for file_name in MemmapDataset.memmap_file_names(target_file_name) for array_name in MemmapWriter.array_names())
+	throughput = input_throughput(lambda: MemmapDataset().read_memmap_file(target_file_name, batch_size, image_size), batch_size, number_of_batches)
+	MemmapDataset.remove_memmap_files(target_file_name)
+	return(size, conversion_time, throughput)
+
+def parse_arguments(argv):
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--network_name', type=str, help='The name of the network.', default='PNet')
+	parser.add_argument('--dataset_root_dir', type=str, help='The directory where the dataset files are stored.', default=None)
+	parser.add_argument('--batch_size', type=int, help='Number of samples in a training batch.', default=384)
+	parser.add_argument('--number_of_batches', type=int, help='Number of timed batches per option.', default=50)
+	return(parser.parse_args(argv))
+
+def main(args):
+	if( not (args.network_name in NetworkFactory.network_names()) ):
+		raise ValueError('The network name should be one of ' + ', '.join(NetworkFactory.network_names()) + '.')
+
+	if(not args.dataset_root_dir):
+		raise ValueError('You must supply input dataset directory with --dataset_root_dir.')
+
+	dataset_dir = os.path.join(args.dataset_root_dir, NetworkFactory.stage(args.network_name))
+	tensorflow_file_name = TensorFlowDataset.tensorflow_file_name(TensorFlowDataset.tensorflow_dir(dataset_dir), 'image_list')
+	if( not TensorFlowDataset.tensorflow_file_names(tensorflow_file_name) ):
+		raise ValueError('The TensorFlow dataset ' + tensorflow_file_name + ' does not exist.')
+
+	image_size = NetworkFactory.network_size(args.network_name)
+	number_of_records = TensorFlowDataset.number_of_records(tensorflow_file_name)
+	target_root_dir = tempfile.mkdtemp()
+
+	rows = []
+	try:
+		for image_encoding in TensorFlowDataset.image_encodings():
+			for compression_type in TensorFlowDataset.compression_types():
+				size, conversion_time, throughput = benchmark_tensorflow_format(tensorflow_file_name, target_root_dir, image_size, image_encoding, compression_type, args.batch_size, args.number_of_batches)
+				rows.append(('tensorflow', image_encoding, compression_type, size / 1e6, size / number_of_records, conversion_time, throughput))
+		size, conversion_time, throughput = benchmark_memmap_format(tensorflow_file_name, target_root_dir, image_size, args.batch_size, args.number_of_batches)
+		rows.append(('memmap', 'raw', 'none', size / 1e6, size / number_of_records, conversion_time, throughput))
+	finally:
+		shutil.rmtree(target_root_dir)
+
+	print('%s - %d samples of %dx%d.' % (tensorflow_file_name, number_of_records, image_size, image_size))
+	print('%-10s %-8s %-11s %10s %14s %12s %16s' % ('Format', 'Encoding', 'Compression', 'Size MB', 'Bytes/sample', 'Convert s', 'Samples/s'))
+	for row in rows:
+		print('%-10s %-8s %-11s %10.2f %14.1f %12.2f %16.0f' % row)
+
+if __name__ == '__main__':
+	os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3' 
+	main(parse_arguments(sys.argv[1:]))
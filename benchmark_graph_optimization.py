@@ -0,0 +1,110 @@
+# MIT License
+# 
+# Copyright (c) 2018
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+r"""Benchmarks the optimized inference graphs against the loaded model graphs.
+
+PReLU activations are fused, heads not used by the cascade are stripped and
+constants are folded. PNet is measured on a full image and RNet and ONet on a
+batch of face crops.
+
+Usage:
+```shell
+
+$ python benchmark_graph_optimization.py
+
+$ python benchmark_graph_optimization.py \
+	--model_root_dir=./models/mtcnn/deploy \
+	--data_format=auto \
+	--image_dir=./data/evaluation
+```
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+from nets.FaceDetector import FaceDetector
+from nets.NetworkFactory import NetworkFactory
+from compare_models import read_images, print_comparison
+
+def network_inputs(network_name, image_height, image_width, batch_size):
+	random_state = np.random.RandomState(0)
+	if( NetworkFactory.stage(network_name) == 'PNet' ):
+		return( random_state.uniform(-1.0, 1.0, (image_height, image_width, 3)).astype(np.float32) )
+	network_size = NetworkFactory.network_size(network_name)
+	return( random_state.uniform(-1.0, 1.0, (batch_size, network_size, network_size, 3)).astype(np.float32) )
+
+def detection_time(network, data_batch, number_of_runs):
+	network.detect(data_batch)
+	start_time = time.time()
+	for _ in range(number_of_runs):
+		network.detect(data_batch)
+	return( (time.time() - start_time) / number_of_runs )
+
+def parse_arguments(argv):
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--model_root_dir', type=str, help='Input model root directory where model weights are saved, or a weight file.', default=None)
+	parser.add_argument('--network_names', type=str, help='Comma separated PNet, RNet and ONet stage network names, PNet,RNet,ONet by default.', default=None)
+	parser.add_argument('--data_format', type=str, choices=['NHWC', 'NCHW', 'auto'], help='Data layout of the optimized graphs.', default='auto')
+	parser.add_argument('--image_width', type=int, help='Input image width for the PNet stage network.', default=640)
+	parser.add_argument('--image_height', type=int, help='Input image height for the PNet stage network.', default=480)
+	parser.add_argument('--batch_size', type=int, help='Number of face crops for the RNet and ONet stage networks.', default=256)
+	parser.add_argument('--number_of_runs', type=int, help='Number of timed runs per network.', default=20)
+	parser.add_argument('--image_dir', type=str, help='Input evaluation image directory, the full cascade is compared when set.', default=None)
+	parser.add_argument('--number_of_images', type=int, help='Maximum number of evaluation images.', default=100)
+	return(parser.parse_args(argv))
+
+def main(args):
+	if(args.model_root_dir):
+		model_root_dir = args.model_root_dir
+	else:
+		model_root_dir = NetworkFactory.model_deploy_dir()
+	network_names = NetworkFactory.cascade_network_names(args.network_names)
+
+	face_detector = FaceDetector(model_root_dir, network_names=network_names)
+	optimized_detector = FaceDetector(model_root_dir, network_names=network_names)
+	if( not optimized_detector.optimize_networks(args.data_format) ):
+		raise ValueError('Error optimizing the networks.')
+
+	print('%-14s %-6s %8s %8s %12s %12s %8s' % ('Network', 'Layout', 'Nodes', 'Fused', 'Model ms', 'Fused ms', 'Speedup'))
+	for network, optimized_network in zip(face_detector.networks(), optimized_detector.networks()):
+		data_batch = network_inputs(network.network_name(), args.image_height, args.image_width, args.batch_size)
+		model_time = detection_time(network, data_batch, args.number_of_runs)
+		optimized_time = detection_time(optimized_network, data_batch, args.number_of_runs)
+		print('%-14s %-6s %8d %8d %12.2f %12.2f %7.2fx' % (network.network_name(), optimized_network.data_format(), network.number_of_graph_nodes(), optimized_network.number_of_graph_nodes(), model_time * 1000, optimized_time * 1000, model_time / optimized_time))
+
+	if(args.image_dir):
+		images = read_images(args.image_dir, args.number_of_images)
+		if(not images):
+			raise ValueError('No images found in ' + args.image_dir + '.')
+
+		print_comparison(face_detector, optimized_detector, images, 'optimized')
+
+if __name__ == '__main__':
+	os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3' 
+	main(parse_arguments(sys.argv[1:]))
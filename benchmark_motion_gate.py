@@ -0,0 +1,116 @@
+# MIT License
+# 
+# Copyright (c) 2018
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+r"""Benchmarks motion-gated detection on a synthetic, mostly static video.
+
+Usage:
+```shell
+
+$ python benchmark_motion_gate.py
+
+$ python benchmark_motion_gate.py \
+	--image_file_name=./data/images/group.jpg \
+	--number_of_frames=300 \
+	--refresh_interval=30
+```
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import sys
+import time
+import argparse
+
+import cv2
+import numpy as np
+
+from nets.FaceDetector import FaceDetector
+from nets.MotionGatedFaceDetector import MotionGatedFaceDetector
+from nets.NetworkFactory import NetworkFactory
+
+def synthetic_video(image, number_of_frames, object_size):
+	height, width, _ = image.shape
+	random_state = np.random.RandomState(0)
+	for frame_index in range(number_of_frames):
+		frame = cv2.add(image, random_state.randint(0, 3, image.shape).astype(np.uint8))
+
+		# A single object crosses the otherwise static scene.
+		x = int((frame_index * 4) % max(1, width - object_size))
+		y = int(height / 2 + (height / 4) * np.sin(frame_index / 20.0))
+		y = min(max(0, y), height - object_size)
+		cv2.rectangle(frame, (x, y), (x + object_size, y + object_size), (40, 200, 40), -1)
+		yield frame
+
+def benchmark(detector, image, number_of_frames, object_size):
+	number_of_boxes = 0
+	start_time = time.time()
+	for frame in synthetic_video(image, number_of_frames, object_size):
+		boxes_c, _ = detector.detect(frame)
+		number_of_boxes += boxes_c.shape[0]
+	duration = time.time() - start_time
+	return( duration / number_of_frames, number_of_boxes / float(number_of_frames) )
+
+def parse_arguments(argv):
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--image_file_name', type=str, help='Input background image, ideally containing faces.', default=None)
+	parser.add_argument('--image_width', type=int, help='Synthetic frame width.', default=1280)
+	parser.add_argument('--image_height', type=int, help='Synthetic frame height.', default=720)
+	parser.add_argument('--number_of_frames', type=int, help='Number of synthetic frames.', default=150)
+	parser.add_argument('--object_size', type=int, help='Size of the moving object in pixels.', default=48)
+	parser.add_argument('--refresh_interval', type=int, help='Number of frames between full detections, 0 for none after the first frame.', default=30)
+	parser.add_argument('--model_root_dir', type=str, help='Input model root directory where model weights are saved.', default=None)
+	return(parser.parse_args(argv))
+
+def main(args):
+	if(args.model_root_dir):
+		model_root_dir = args.model_root_dir
+	else:
+		model_root_dir = NetworkFactory.model_deploy_dir()
+
+	if(args.image_file_name):
+		image = cv2.imread(args.image_file_name)
+		if(image is None):
+			raise ValueError('Error reading the image ' + args.image_file_name + '.')
+		image = cv2.resize(image, (args.image_width, args.image_height))
+	else:
+		random_state = np.random.RandomState(1)
+		image = random_state.randint(0, 255, (args.image_height // 8, args.image_width // 8, 3)).astype(np.uint8)
+		image = cv2.resize(image, (args.image_width, args.image_height), interpolation=cv2.INTER_CUBIC)
+
+	face_detector = FaceDetector(model_root_dir)
+	face_detector.detect(image)
+
+	full_time, full_boxes = benchmark(face_detector, image, args.number_of_frames, args.object_size)
+	print('Full cascade - %.2f ms per frame, %.2f faces per frame.' % (full_time * 1000, full_boxes))
+
+	gated_detector = MotionGatedFaceDetector(face_detector, refresh_interval=args.refresh_interval)
+	gated_time, gated_boxes = benchmark(gated_detector, image, args.number_of_frames, args.object_size)
+	print('Motion gated - %.2f ms per frame, %.2f faces per frame.' % (gated_time * 1000, gated_boxes))
+
+	print('Speedup - %.2fx' % (full_time / gated_time))
+
+if __name__ == '__main__':
+	os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3' 
+	main(parse_arguments(sys.argv[1:]))
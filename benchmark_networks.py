@@ -0,0 +1,96 @@
+# MIT License
+# 
+# Copyright (c) 2018
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+r"""Benchmarks the registered network architectures.
+
+Floating point operations, trainable parameters and the inference latency of
+each network are printed as a table. PNet stage networks are measured on a full
+image and the RNet and ONet stage networks on a batch of face crops. Weights are
+randomly initialized, so no trained model is required.
+
+Usage:
+```shell
+
+$ python benchmark_networks.py
+
+$ python benchmark_networks.py \
+	--network_names=PNet,PNetLite,PNetSeparable \
+	--image_width=1280 \
+	--image_height=720
+```
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import sys
+import argparse
+
+from nets.NetworkFactory import NetworkFactory
+
+def benchmark_network(network_name, image_height, image_width, batch_size, number_of_runs):
+	network = NetworkFactory.network(network_name, batch_size)
+	if( NetworkFactory.stage(network_name) == 'PNet' ):
+		number_of_flops, number_of_parameters = network.complexity(image_height, image_width)
+		latency = network.latency(image_height, image_width, 1, number_of_runs)
+	else:
+		number_of_flops, number_of_parameters = network.complexity()
+		number_of_flops = number_of_flops * batch_size
+		latency = network.latency(batch_size=batch_size, number_of_runs=number_of_runs)
+	return(network, number_of_flops, number_of_parameters, latency)
+
+def parse_arguments(argv):
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--network_names', type=str, help='Comma separated network names, all registered networks by default.', default=None)
+	parser.add_argument('--image_width', type=int, help='Input image width for PNet stage networks.', default=640)
+	parser.add_argument('--image_height', type=int, help='Input image height for PNet stage networks.', default=480)
+	parser.add_argument('--batch_size', type=int, help='Number of face crops for RNet and ONet stage networks.', default=256)
+	parser.add_argument('--number_of_runs', type=int, help='Number of timed runs per network.', default=20)
+	return(parser.parse_args(argv))
+
+def main(args):
+	if(args.network_names):
+		network_names = [ network_name.strip() for network_name in args.network_names.split(',') ]
+	else:
+		network_names = sorted(NetworkFactory.network_names(), key=lambda network_name: (['PNet', 'RNet', 'ONet'].index(NetworkFactory.stage(network_name)), network_name))
+
+	for network_name in network_names:
+		if( not (network_name in NetworkFactory.network_names()) ):
+			raise ValueError('The network name should be one of ' + ', '.join(NetworkFactory.network_names()) + '.')
+
+	rows = []
+	for network_name in network_names:
+		network, number_of_flops, number_of_parameters, latency = benchmark_network(network_name, args.image_height, args.image_width, args.batch_size, args.number_of_runs)
+		if( NetworkFactory.stage(network_name) == 'PNet' ):
+			input_size = '%dx%d' % (args.image_width, args.image_height)
+		else:
+			input_size = '%dx%d' % (args.batch_size, network.network_size())
+		rows.append((network_name, NetworkFactory.stage(network_name), str(network.widths()), str(network.separable()), input_size, number_of_flops / 1e6, number_of_parameters, latency * 1000))
+
+	print('%-14s %-6s %-26s %-9s %-12s %12s %10s %12s' % ('Network', 'Stage', 'Widths', 'Separable', 'Input', 'MFLOPs', 'Parameters', 'Latency ms'))
+	for row in rows:
+		print('%-14s %-6s %-26s %-9s %-12s %12.1f %10d %12.2f' % row)
+
+if __name__ == '__main__':
+	os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3' 
+	main(parse_arguments(sys.argv[1:]))
@@ -0,0 +1,168 @@
+# MIT License
+# 
+# Copyright (c) 2018
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+r"""Compares the detections of a face detector model with a reference model.
+
+Recall against the reference detections, mean box IoU of the matched faces,
+landmark error normalized by the face size and the detection time are reported.
+
+Usage:
+```shell
+
+$ python compare_models.py \
+	--model_root_dir=./models/mtcnn/pruned \
+	--image_dir=./data/evaluation
+
+$ python compare_models.py \
+	--model_root_dir=./data/models/mtcnn/train \
+	--network_names=PNetLite,RNetLite,ONetLite \
+	--image_dir=./data/evaluation
+
+$ python compare_models.py \
+	--reference_model_root_dir=./models/mtcnn/deploy \
+	--model_root_dir=./models/mtcnn/deploy \
+	--quantized_model_dir=./models/mtcnn/quantized \
+	--data_type=uint8 \
+	--image_dir=./data/evaluation
+```
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import sys
+import time
+import argparse
+
+import cv2
+import numpy as np
+
+from nets.FaceDetector import FaceDetector
+from nets.NetworkFactory import NetworkFactory
+from nets.QuantizedNetwork import QuantizedNetwork
+from utils.IoU import IoU
+
+def read_images(image_dir, number_of_images):
+	image_file_names = sorted(os.listdir(image_dir))
+	images = []
+	for image_file_name in image_file_names:
+		image = cv2.imread(os.path.join(image_dir, image_file_name))
+		if( image is None ):
+			continue
+		images.append(image)
+		if( len(images) >= number_of_images ):
+			break
+	return(images)
+
+def timed_detections(face_detector, images):
+	face_detector.detect(images[0])
+
+	detections = []
+	start_time = time.time()
+	for image in images:
+		detections.append(face_detector.detect(image))
+	return(detections, time.time() - start_time)
+
+def compare_detections(reference_detections, detections, minimum_IoU=0.5):
+	number_of_faces = 0
+	overlaps = []
+	landmark_errors = []
+	for (reference_boxes, reference_landmarks), (boxes, landmarks) in zip(reference_detections, detections):
+		number_of_faces = number_of_faces + reference_boxes.shape[0]
+		if( (reference_boxes.size == 0) or (boxes.size == 0) ):
+			continue
+
+		is_matched = np.zeros(boxes.shape[0], dtype=np.bool)
+		for index in np.argsort(-reference_boxes[:, 4]):
+			reference_box = reference_boxes[index]
+			overlap = IoU(reference_box, boxes)
+			overlap[is_matched] = 0
+			match_index = np.argmax(overlap)
+			if( overlap[match_index] < minimum_IoU ):
+				continue
+			is_matched[match_index] = True
+			overlaps.append(overlap[match_index])
+
+			# Landmark error is normalized by the reference face size.
+			face_size = ((reference_box[2] - reference_box[0] + 1) + (reference_box[3] - reference_box[1] + 1)) / 2.0
+			point_errors = np.sqrt(np.sum(np.square((landmarks[match_index] - reference_landmarks[index]).reshape(5, 2)), axis=1))
+			landmark_errors.append(np.mean(point_errors) / face_size)
+
+	recall = len(overlaps) / number_of_faces if number_of_faces else 1.0
+	mean_IoU = np.mean(overlaps) if overlaps else 0.0
+	landmark_error = np.mean(landmark_errors) if landmark_errors else 0.0
+	return(recall, mean_IoU, landmark_error, number_of_faces)
+
+def print_comparison(reference_detector, face_detector, images, model_name='model'):
+	reference_detections, reference_duration = timed_detections(reference_detector, images)
+	detections, duration = timed_detections(face_detector, images)
+	recall, mean_IoU, landmark_error, number_of_faces = compare_detections(reference_detections, detections)
+
+	print('Evaluated %d images with %d reference faces.' % (len(images), number_of_faces))
+	print('Recall - %.4f, mean box IoU - %.4f, normalized landmark error - %.4f.' % (recall, mean_IoU, landmark_error))
+	print('Detection time - reference %.2f ms, %s %.2f ms per image, speedup %.2fx.' % (1000.0 * reference_duration / len(images), model_name, 1000.0 * duration / len(images), reference_duration / duration))
+	return(recall, mean_IoU, landmark_error)
+
+def parse_arguments(argv):
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--reference_model_root_dir', type=str, help='Input reference model root directory, or a weight file.', default=None)
+	parser.add_argument('--model_root_dir', type=str, help='Input model root directory where model weights are saved, or a weight file.', default=None)
+	parser.add_argument('--network_names', type=str, help='Comma separated PNet, RNet and ONet stage network names, PNet,RNet,ONet by default.', default=None)
+	parser.add_argument('--quantized_model_dir', type=str, help='Input directory where quantized models are saved.', default=None)
+	parser.add_argument('--data_type', type=str, choices=QuantizedNetwork.data_types(), help='Quantized data type.', default='uint8')
+	parser.add_argument('--image_dir', type=str, help='Input evaluation image directory.', default=None)
+	parser.add_argument('--number_of_images', type=int, help='Maximum number of evaluation images.', default=100)
+	return(parser.parse_args(argv))
+
+def main(args):
+	if(not args.image_dir):
+		raise ValueError('You must supply input evaluation image directory with --image_dir.')
+
+	if(args.reference_model_root_dir):
+		reference_model_root_dir = args.reference_model_root_dir
+	else:
+		reference_model_root_dir = NetworkFactory.model_deploy_dir()
+
+	if(args.model_root_dir):
+		model_root_dir = args.model_root_dir
+	else:
+		model_root_dir = NetworkFactory.model_deploy_dir()
+	network_names = NetworkFactory.cascade_network_names(args.network_names)
+
+	images = read_images(args.image_dir, args.number_of_images)
+	if(not images):
+		raise ValueError('No images found in ' + args.image_dir + '.')
+
+	reference_detector = FaceDetector(reference_model_root_dir)
+	face_detector = FaceDetector(model_root_dir, network_names=network_names)
+	model_name = 'model'
+	if(args.quantized_model_dir):
+		if(not face_detector.set_quantized_networks(args.quantized_model_dir, args.data_type)):
+			raise ValueError('Error loading the quantized models from ' + args.quantized_model_dir + '.')
+		model_name = args.data_type
+
+	print_comparison(reference_detector, face_detector, images, model_name)
+
+if __name__ == '__main__':
+	main(parse_arguments(sys.argv[1:]))
@@ -0,0 +1,79 @@
+# MIT License
+# 
+# Copyright (c) 2018
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+r"""Converts the TensorFlow files of a network dataset to memory-mapped arrays.
+
+Usage:
+```shell
+
+$ python convert_dataset.py \
+	--network_name=PNet \
+	--dataset_root_dir=./data/datasets/mtcnn
+
+$ python convert_dataset.py \
+	--network_name=ONet \
+	--dataset_root_dir=./data/datasets/mtcnn
+```
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import sys
+import argparse
+
+from datasets.TensorFlowDataset import TensorFlowDataset
+from datasets.MemmapDataset import MemmapDataset
+from nets.NetworkFactory import NetworkFactory
+
+def parse_arguments(argv):
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--network_name', type=str, help='The name of the network.', default='PNet')
+	parser.add_argument('--dataset_root_dir', type=str, help='The directory where the dataset files are stored.', default=None)
+	return(parser.parse_args(argv))
+
+def main(args):
+	if( not (args.network_name in NetworkFactory.network_names()) ):
+		raise ValueError('The network name should be one of ' + ', '.join(NetworkFactory.network_names()) + '.')
+
+	if(not args.dataset_root_dir):
+		raise ValueError('You must supply input dataset directory with --dataset_root_dir.')
+
+	dataset_dir = os.path.join(args.dataset_root_dir, NetworkFactory.stage(args.network_name))
+	tensorflow_dir = TensorFlowDataset.tensorflow_dir(dataset_dir)
+	if(NetworkFactory.stage(args.network_name) == 'PNet'):
+		dataset_names = ['image_list']
+	else:
+		dataset_names = ['positive', 'part', 'negative', 'image_list']
+
+	memmap_dataset = MemmapDataset()
+	for dataset_name in dataset_names:
+		tensorflow_file_name = TensorFlowDataset.tensorflow_file_name(tensorflow_dir, dataset_name)
+		if(not memmap_dataset.convert(tensorflow_file_name, dataset_dir, dataset_name)):
+			raise ValueError('Error converting TensorFlow dataset ' + tensorflow_file_name + '.')
+		memmap_file_name = MemmapDataset.memmap_file_name(MemmapDataset.memmap_dir(dataset_dir), dataset_name)
+		print(dataset_name + ' - ' + str(MemmapDataset.number_of_records(memmap_file_name)) + ' samples are converted to ' + memmap_file_name + '.')
+
+if __name__ == '__main__':
+	os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3' 
+	main(parse_arguments(sys.argv[1:]))
@@ -0,0 +1,75 @@
+# MIT License
+# 
+# Copyright (c) 2018
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+r"""Converts the PNet, RNet and ONet checkpoints to a single memory-mapped weight file.
+
+Usage:
+```shell
+
+$ python convert_weight_file.py \
+	--output_file_name=./models/mtcnn/deploy/mtcnn.weights
+
+$ python convert_weight_file.py \
+	--model_root_dir=./models/mtcnn/train \
+	--output_file_name=./models/mtcnn/train/mtcnn-float16.weights \
+	--data_type=float16
+```
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import sys
+import argparse
+
+from nets.FaceDetector import FaceDetector
+from nets.NetworkFactory import NetworkFactory
+from utils.WeightFile import WeightFile
+
+def parse_arguments(argv):
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--model_root_dir', type=str, help='Input model root directory where PNet, RNet and ONet checkpoints are saved.', default=None)
+	parser.add_argument('--output_file_name', type=str, help='Output weight file.', default=None)
+	parser.add_argument('--data_type', type=str, choices=WeightFile.data_types(), help='Storage type of the convolution and fully connected kernels.', default='float32')
+	return(parser.parse_args(argv))
+
+def main(args):
+	if(not args.output_file_name):
+		raise ValueError('You must supply output weight file with --output_file_name.')
+
+	if(args.model_root_dir):
+		model_root_dir = args.model_root_dir
+	else:
+		model_root_dir = NetworkFactory.model_deploy_dir()
+
+	model_weights = FaceDetector.load_weights(model_root_dir)
+	if(not model_weights):
+		raise ValueError('Error loading the models from ' + model_root_dir + '.')
+
+	if(WeightFile.write(args.output_file_name, model_weights, args.data_type)):
+		print('Weight file is generated at ' + args.output_file_name + ' - ' + str(os.path.getsize(args.output_file_name)) + ' bytes.')
+	else:
+		print('Error generating weight file.')
+
+if __name__ == '__main__':
+	main(parse_arguments(sys.argv[1:]))
@@ -0,0 +1,172 @@
+# MIT License
+# 
+# Copyright (c) 2018
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import multiprocessing
+import numpy as np
+import cv2
+
+from utils.image_size import read_image_size
+
+class AnnotationIndex(object):
+
+	# Bumped whenever the layout of the cached arrays or the image probing changes.
+	__version = 2
+
+	def __init__(self):
+		self._is_valid = False
+		self._image_paths = []
+		self._image_sizes = np.zeros((0, 2), dtype=np.int32)
+		self._boxes = np.zeros((0, 4), dtype=np.float32)
+		self._box_offsets = np.zeros(1, dtype=np.int64)
+
+	@classmethod
+	def cache_file_name(cls, annotation_file_name):
+		return(annotation_file_name + '.npz')
+
+	def is_valid(self):
+		return(self._is_valid)
+
+	def number_of_images(self):
+		return(len(self._image_paths))
+
+	def image_paths(self):
+		return(self._image_paths)
+
+	def image_sizes(self):
+		return(self._image_sizes)
+
+	def boxes(self):
+		return(self._boxes)
+
+	def box_offsets(self):
+		return(self._box_offsets)
+
+	def image_boxes(self, image_index):
+		return(self._boxes[self._box_offsets[image_index]:self._box_offsets[image_index + 1]])
+
+	def bounding_boxes(self):
+		return(np.split(self._boxes, self._box_offsets[1:-1]))
+
+	def _cache_key(self, annotation_image_dir, annotation_file_name):
+		annotation_stat = os.stat(annotation_file_name)
+		return(np.array([ AnnotationIndex.__version, annotation_stat.st_size, int(annotation_stat.st_mtime * 1e6) ], dtype=np.int64), os.path.abspath(annotation_image_dir))
+
+	def _read_cache(self, annotation_image_dir, annotation_file_name):
+		cache_file_name = AnnotationIndex.cache_file_name(annotation_file_name)
+		if(not os.path.isfile(cache_file_name)):
+			return(False)
+
+		cache_key, image_dir = self._cache_key(annotation_image_dir, annotation_file_name)
+		try:
+			with np.load(cache_file_name) as cache:
+				if( (not np.array_equal(cache['key'], cache_key)) or (not (str(cache['image_dir']) == image_dir)) ):
+					return(False)
+				self._image_paths = cache['image_paths'].tolist()
+				self._image_sizes = cache['image_sizes']
+				self._boxes = cache['boxes']
+				self._box_offsets = cache['box_offsets']
+		except (IOError, KeyError, ValueError):
+			return(False)
+		return(True)
+
+	def _write_cache(self, annotation_image_dir, annotation_file_name):
+		cache_key, image_dir = self._cache_key(annotation_image_dir, annotation_file_name)
+		cache_file_name = AnnotationIndex.cache_file_name(annotation_file_name)
+		try:
+			# Written aside and renamed, so a concurrent reader never sees a partial cache.
+			with open(cache_file_name + '.tmp', 'wb') as cache_file:
+				np.savez(cache_file, key=cache_key, image_dir=np.array(image_dir), image_paths=np.array(self._image_paths, dtype=str), image_sizes=self._image_sizes, boxes=self._boxes, box_offsets=self._box_offsets)
+			os.rename(cache_file_name + '.tmp', cache_file_name)
+		except (IOError, OSError):
+			return(False)
+		return(True)
+
+	def _parse(self, annotation_image_dir, annotation_file_name):
+		with open(annotation_file_name, 'r') as annotation_file:
+			lines = annotation_file.read().splitlines()
+
+		image_paths = []
+		box_lines = []
+		number_of_boxes = []
+		line_index = 0
+		while( line_index < len(lines) ):
+			image_path = lines[line_index].strip()
+			if( (not image_path) or (line_index + 1 == len(lines)) ):
+				break
+			number_of_faces = int(lines[line_index + 1])
+			image_box_lines = lines[line_index + 2 : line_index + 2 + number_of_faces]
+			image_paths.append(os.path.join(annotation_image_dir, image_path))
+			box_lines.extend(image_box_lines)
+			number_of_boxes.append(len(image_box_lines))
+			line_index += 2 + number_of_faces
+
+		boxes = np.array([ line.split()[:4] for line in box_lines ], dtype=np.float32).reshape(-1, 4)
+		# Width and height become the bottom right corner.
+		boxes[:, 2:4] += boxes[:, 0:2]
+		box_offsets = np.concatenate([ [0], np.cumsum(number_of_boxes) ]).astype(np.int64)
+		return(image_paths, boxes, box_offsets)
+
+	def read(self, annotation_image_dir, annotation_file_name, number_of_workers=1):
+		self._is_valid = False
+		if(not os.path.isfile(annotation_file_name)):
+			return(False)
+
+		if(self._read_cache(annotation_image_dir, annotation_file_name)):
+			self._is_valid = (self.number_of_images() > 0)
+			return(self.is_valid())
+
+		image_paths, boxes, box_offsets = self._parse(annotation_image_dir, annotation_file_name)
+
+		if( number_of_workers > 1 ):
+			pool = multiprocessing.Pool(number_of_workers)
+			image_sizes = pool.map(_probe_image, image_paths, chunksize=max(1, len(image_paths) // (number_of_workers * 16)))
+			pool.close()
+			pool.join()
+		else:
+			image_sizes = [ _probe_image(image_path) for image_path in image_paths ]
+
+		# Unreadable images are dropped together with their boxes.
+		valid_images = np.array([ image_size is not None for image_size in image_sizes ], dtype=np.bool)
+		box_counts = np.diff(box_offsets)[valid_images]
+		self._image_paths = [ image_path for image_path, is_valid in zip(image_paths, valid_images) if is_valid ]
+		self._image_sizes = np.array([ image_size for image_size in image_sizes if image_size is not None ], dtype=np.int32).reshape(-1, 2)
+		self._boxes = boxes[np.repeat(valid_images, np.diff(box_offsets))]
+		self._box_offsets = np.concatenate([ [0], np.cumsum(box_counts) ]).astype(np.int64)
+
+		self._write_cache(annotation_image_dir, annotation_file_name)
+
+		self._is_valid = (self.number_of_images() > 0)
+		return(self.is_valid())
+
+def _probe_image(image_path):
+	image_size = read_image_size(image_path)
+	if( (image_size is None) and os.path.isfile(image_path) ):
+		# Formats without a known header are decoded once.
+		image = cv2.imread(image_path)
+		if(image is not None):
+			image_size = image.shape[:2]
+	return(image_size)
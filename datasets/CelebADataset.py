@@ -25,55 +25,50 @@ from __future__ import division
 from __future__ import print_function
 
 import os
-import cv2
 import numpy as np
 
-from utils.BBox import BBox
+from utils.BBoxArray import BBoxArray
 
 class CelebADataset(object):
 
 	def __init__(self, name='CelebA'):
 		self._name = name
 		self._is_valid = False
-		self._landmark_data = []
+		self._image_paths = []
+		self._bounding_boxes = BBoxArray(np.zeros((0, 4), dtype=np.int64))
+		self._landmarks = np.zeros((0, 5, 2))
 
 	def is_valid(self):
 		return(self._is_valid)
 
 	def data(self):
-		return(self._landmark_data)
+		return( (self._image_paths, self._bounding_boxes, self._landmarks) )
+
+	def image_paths(self):
+		return(self._image_paths)
+
+	def bounding_boxes(self):
+		return(self._bounding_boxes)
+
+	def landmarks(self):
+		return(self._landmarks)
 
 	def read(self, landmark_image_dir, landmark_file_name):
 
 		self._is_valid = False
-    		self._landmark_data = []
 
 		with open(landmark_file_name, 'r') as landmark_file:
-        		lines = landmark_file.readlines()
-
-    		for line in lines:
-        			line = line.strip()
-        			components = line.split(' ')
-        			image_path = os.path.join(landmark_image_dir, components[0])
-
-				image_left = float(components[1])
-				image_top = float(components[2])
-				image_with = float(components[3])
-				image_height = float(components[4])
-				image_right = image_left + image_with
-				image_bottom = image_top  + image_height
-        			bounding_box = (image_left, image_top, image_right, image_bottom)        
-        			bounding_box = map(int,bounding_box)
-
-        			landmark = np.zeros((5, 2))
-        			for index in range(0, 5):
-            				rv = (float(components[5+2*index]), float(components[5+2*index+1]))
-            				landmark[index] = rv
-
-        			self._landmark_data.append((image_path, BBox(bounding_box), landmark))
-
-		if(len(self._landmark_data)):
-			self._is_valid = True
+			components = [ line.split() for line in landmark_file if line.strip() ]
 
-    		return(self._is_valid)
+		self._image_paths = [ os.path.join(landmark_image_dir, line_components[0]) for line_components in components ]
+		values = np.array([ line_components[1:15] for line_components in components ], dtype=np.float64).reshape(-1, 14)
 
+		# Boxes are stored as left, top, width and height.
+		bounding_boxes = np.concatenate([ values[:, 0:2], values[:, 0:2] + values[:, 2:4] ], axis=1)
+		self._bounding_boxes = BBoxArray(bounding_boxes.astype(np.int64))
+		self._landmarks = values[:, 4:14].reshape(-1, 5, 2)
+
+		if(len(self._image_paths)):
+			self._is_valid = True
+
+		return(self._is_valid)
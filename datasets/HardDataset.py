@@ -32,7 +32,9 @@ from datasets.SimpleDataset import SimpleDataset
 from datasets.SimpleFaceDataset import SimpleFaceDataset
 from datasets.HardFaceDataset import HardFaceDataset
 from datasets.LandmarkDataset import LandmarkDataset
+from datasets.SampleWriter import SampleWriter
 from datasets.TensorFlowDataset import TensorFlowDataset
+from datasets.MemmapDataset import MemmapDataset
 
 from nets.FaceDetector import FaceDetector
 from nets.NetworkFactory import NetworkFactory
@@ -42,9 +44,9 @@ class HardDataset(SimpleDataset):
 	def __init__(self, name):	
 		SimpleDataset.__init__(self, name)	
 
-	def _generate_image_samples(self, annotation_file_name, annotation_image_dir, model_train_dir, minimum_face, target_root_dir):
+	def _generate_image_samples(self, annotation_file_name, annotation_image_dir, model_train_dir, minimum_face, target_root_dir, network_names=None, sample_format='images', number_of_workers=1):
 		wider_dataset = HardFaceDataset()
-		return(wider_dataset.generate_samples(annotation_image_dir, annotation_file_name, model_train_dir, self.network_name(), minimum_face, target_root_dir))
+		return(wider_dataset.generate_samples(annotation_image_dir, annotation_file_name, model_train_dir, self.network_name(), minimum_face, target_root_dir, network_names, sample_format, number_of_workers))
 
 	def _generate_image_list(self, target_root_dir):
 		positive_file = open(SimpleFaceDataset.positive_file_name(target_root_dir), 'r')
@@ -75,36 +77,59 @@ class HardDataset(SimpleDataset):
 
 		return(True)
 
-	def _generate_dataset(self, target_root_dir):
+	def _generate_record_list(self, target_root_dir, number_of_shards=1, image_encoding='raw', compression_type='none'):
+		tensorflow_dir = TensorFlowDataset.tensorflow_dir(target_root_dir)
+		tensorflow_sources = [ (TensorFlowDataset.tensorflow_file_name(tensorflow_dir, sample_type), None) for sample_type in ['positive', 'negative', 'part', 'landmark'] ]
+
+		tensorflow_dataset = TensorFlowDataset()
+		return(tensorflow_dataset.generate_from_tensorflow_files(tensorflow_sources, target_root_dir, 'image_list', number_of_shards, image_encoding, compression_type))
+
+	def _generate_memmap_list(self, target_root_dir):
+		memmap_dir = MemmapDataset.memmap_dir(target_root_dir)
+		memmap_sources = [ (MemmapDataset.memmap_file_name(memmap_dir, sample_type), None) for sample_type in ['positive', 'negative', 'part', 'landmark'] ]
+
+		memmap_dataset = MemmapDataset()
+		return(memmap_dataset.generate_from_memmap_files(memmap_sources, target_root_dir, 'image_list'))
+
+	def _generate_dataset(self, target_root_dir, number_of_shards=1, number_of_workers=1, image_encoding='raw', compression_type='none'):
 		tensorflow_dataset = TensorFlowDataset()
 
 		print('Generating TensorFlow dataset for positive images.')
-		if(not tensorflow_dataset.generate(SimpleFaceDataset.positive_file_name(target_root_dir), target_root_dir, 'positive')):
+		if(not tensorflow_dataset.generate(SimpleFaceDataset.positive_file_name(target_root_dir), target_root_dir, 'positive', number_of_shards, number_of_workers, image_encoding, compression_type)):
 			print('Error generating TensorFlow dataset for positive images.')
 			return(False) 
 		print('Generated TensorFlow dataset for positive images.')
 
 		print('Generating TensorFlow dataset for partial images.')
-		if(not tensorflow_dataset.generate(SimpleFaceDataset.part_file_name(target_root_dir), target_root_dir, 'part')):
+		if(not tensorflow_dataset.generate(SimpleFaceDataset.part_file_name(target_root_dir), target_root_dir, 'part', number_of_shards, number_of_workers, image_encoding, compression_type)):
 			print('Error generating TensorFlow dataset for partial images.')		
 			return(False) 
 		print('Generated TensorFlow dataset for partial images.')
 
 		print('Generating TensorFlow dataset for negative images.')
-		if(not tensorflow_dataset.generate(SimpleFaceDataset.negative_file_name(target_root_dir), target_root_dir, 'negative')):
+		if(not tensorflow_dataset.generate(SimpleFaceDataset.negative_file_name(target_root_dir), target_root_dir, 'negative', number_of_shards, number_of_workers, image_encoding, compression_type)):
 			print('Error generating TensorFlow dataset for negative images.')
 			return(False) 
 		print('Generated TensorFlow dataset for negative images.')
 
 		print('Generating TensorFlow dataset for landmark images.')
-		if(not tensorflow_dataset.generate(self._image_list_file_name(target_root_dir), target_root_dir, 'image_list')):
+		if(not tensorflow_dataset.generate(self._image_list_file_name(target_root_dir), target_root_dir, 'image_list', number_of_shards, number_of_workers, image_encoding, compression_type)):
 			print('Error generating TensorFlow dataset for landmark images.')
 			return(False) 
 		print('Generated TensorFlow dataset for landmark images.')
 
 		return(True)
 
-	def generate(self, annotation_image_dir, annotation_file_name, landmark_image_dir, landmark_file_name, model_train_dir, target_root_dir):
+	def _has_landmark_samples(self, target_root_dir, sample_format):
+		if( SampleWriter.writes_images(sample_format) and not os.path.isfile(LandmarkDataset.landmark_file_name(target_root_dir)) ):
+			return(False)
+		if( SampleWriter.writes_records(sample_format) and not TensorFlowDataset.tensorflow_file_names(TensorFlowDataset.tensorflow_file_name(TensorFlowDataset.tensorflow_dir(target_root_dir), 'landmark')) ):
+			return(False)
+		if( SampleWriter.writes_memmap(sample_format) and not MemmapDataset.memmap_file_names(MemmapDataset.memmap_file_name(MemmapDataset.memmap_dir(target_root_dir), 'landmark')) ):
+			return(False)
+		return(True)
+
+	def generate(self, annotation_image_dir, annotation_file_name, landmark_image_dir, landmark_file_name, model_train_dir, target_root_dir, network_names=None, sample_format='images', number_of_shards=1, number_of_workers=1, image_encoding='raw', compression_type='none', reuse_landmark_samples=False):
 
 		if(not os.path.isfile(annotation_file_name)):
 			return(False)
@@ -119,29 +144,50 @@ class HardDataset(SimpleDataset):
 			return(False)
 
 		target_root_dir = os.path.expanduser(target_root_dir)
-		target_root_dir = os.path.join(target_root_dir, self.network_name())
+		target_root_dir = os.path.join(target_root_dir, NetworkFactory.stage(self.network_name()))
 		if(not os.path.exists(target_root_dir)):
 			os.makedirs(target_root_dir)
 
 		image_size = NetworkFactory.network_size(self.network_name())
 
-		print('Generating landmark samples.')
-		if(not super(HardDataset, self)._generate_landmark_samples(landmark_image_dir, landmark_file_name, image_size, target_root_dir)):
-			print('Error generating landmark samples.')
-			return(False)
-		print('Generated landmark samples.')
+		# Landmark samples do not depend on the previous networks, the ones of a multi-scale simple dataset pass can be kept.
+		if( reuse_landmark_samples and self._has_landmark_samples(target_root_dir, sample_format) ):
+			print('Reusing landmark samples.')
+		else:
+			print('Generating landmark samples.')
+			if(not super(HardDataset, self)._generate_landmark_samples(landmark_image_dir, landmark_file_name, image_size, target_root_dir, sample_format, number_of_workers)):
+				print('Error generating landmark samples.')
+				return(False)
+			print('Generated landmark samples.')
 
 		print('Generating image samples.')
-		if(not self._generate_image_samples(annotation_file_name, annotation_image_dir, model_train_dir, image_size, target_root_dir)):
+		if(not self._generate_image_samples(annotation_file_name, annotation_image_dir, model_train_dir, image_size, target_root_dir, network_names, sample_format, number_of_workers)):
 			print('Error generating image samples.')
 			return(False)
 		print('Generated image samples.')
 
+		# The positive, part and negative TensorFlow files are already written, only the mixed list is left.
+		if(SampleWriter.writes_records(sample_format)):
+			print('Generating TensorFlow dataset.')
+			if(not self._generate_record_list(target_root_dir, number_of_shards, image_encoding, compression_type)):
+				print('Error generating TensorFlow dataset.')
+				return(False)
+			print('Generated TensorFlow dataset.')
+			return(True)
+
+		if(SampleWriter.writes_memmap(sample_format)):
+			print('Generating memory-mapped dataset.')
+			if(not self._generate_memmap_list(target_root_dir)):
+				print('Error generating memory-mapped dataset.')
+				return(False)
+			print('Generated memory-mapped dataset.')
+			return(True)
+
 		if(not self._generate_image_list(target_root_dir)):
 			return(False)
 
 		print('Generating TensorFlow dataset.')
-		if(not self._generate_dataset(target_root_dir)):
+		if(not self._generate_dataset(target_root_dir, number_of_shards, number_of_workers, image_encoding, compression_type)):
 			print('Error generating TensorFlow dataset.')
 			return(False)
 		print('Generated TensorFlow dataset.')
@@ -30,6 +30,9 @@ import cv2
 import numpy.random as npr
 
 from datasets.SimpleFaceDataset import SimpleFaceDataset
+from datasets.SampleWriter import SampleWriter
+from datasets.TensorFlowDataset import TensorFlowDataset
+from datasets.MemmapDataset import MemmapDataset
 from datasets.InferenceBatch import InferenceBatch
 
 from nets.FaceDetector import FaceDetector
@@ -43,7 +46,7 @@ class HardFaceDataset(SimpleFaceDataset):
 	def __init__(self, name='HardFaceDataset'):
 		SimpleFaceDataset.__init__(self, name)	
 
-	def _generate_hard_samples(self, network_name, detected_boxes, minimum_face, target_root_dir):
+	def _generate_hard_samples(self, network_name, detected_boxes, minimum_face, target_root_dir, sample_format='images'):
 
 		image_file_names = self._data['images']
 		ground_truth_boxes = self._data['bboxes']
@@ -54,25 +57,30 @@ class HardFaceDataset(SimpleFaceDataset):
 
 		image_size = NetworkFactory.network_size(network_name)
 
-		positive_dir = os.path.join(target_root_dir, 'positive')
-		part_dir = os.path.join(target_root_dir, 'part')
-		negative_dir = os.path.join(target_root_dir, 'negative')
-
-		if(not os.path.exists(positive_dir)):
-    			os.makedirs(positive_dir)
-		if(not os.path.exists(part_dir)):
-    			os.makedirs(part_dir)
-		if(not os.path.exists(negative_dir)):
-    			os.makedirs(negative_dir)
-
-		positive_file = open(SimpleFaceDataset.positive_file_name(target_root_dir), 'w')
-		part_file = open(SimpleFaceDataset.part_file_name(target_root_dir), 'w')
-		negative_file = open(SimpleFaceDataset.negative_file_name(target_root_dir), 'w')
-
-    		negative_images = 0
-    		positive_images = 0
-    		part_images = 0
-
+		sample_file_names = { 'positive': SimpleFaceDataset.positive_file_name(target_root_dir), 'part': SimpleFaceDataset.part_file_name(target_root_dir), 'negative': SimpleFaceDataset.negative_file_name(target_root_dir) }
+		tensorflow_dir = TensorFlowDataset.tensorflow_dir(target_root_dir)
+		memmap_dir = MemmapDataset.memmap_dir(target_root_dir)
+		sample_writers = dict()
+		for sample_type in ['positive', 'part', 'negative']:
+			sample_dir, list_file_name, tensorflow_file_name, memmap_file_name = None, None, None, None
+			if(SampleWriter.writes_images(sample_format)):
+				sample_dir = os.path.join(target_root_dir, sample_type)
+				if(not os.path.exists(sample_dir)):
+    					os.makedirs(sample_dir)
+				list_file_name = sample_file_names[sample_type]
+			if(SampleWriter.writes_records(sample_format)):
+				if(not os.path.exists(tensorflow_dir)):
+    					os.makedirs(tensorflow_dir)
+				TensorFlowDataset.remove_tensorflow_files(TensorFlowDataset.tensorflow_file_name(tensorflow_dir, sample_type))
+				tensorflow_file_name = TensorFlowDataset.tensorflow_shard_file_name(tensorflow_dir, sample_type, 0)
+			if(SampleWriter.writes_memmap(sample_format)):
+				if(not os.path.exists(memmap_dir)):
+    					os.makedirs(memmap_dir)
+				memmap_file_name = MemmapDataset.memmap_file_name(memmap_dir, sample_type)
+				MemmapDataset.remove_memmap_files(memmap_file_name)
+			sample_writers[sample_type] = SampleWriter(sample_dir, list_file_name, tensorflow_file_name, memmap_file_name)
+
+		number_of_skipped_images = 0
     		for image_file_path, detected_box, ground_truth_box in zip(image_file_names, detected_boxes, ground_truth_boxes):
         		ground_truth_box = np.array(ground_truth_box, dtype=np.float32).reshape(-1, 4)
 
@@ -83,6 +91,9 @@ class HardFaceDataset(SimpleFaceDataset):
         		detected_box[:, 0:4] = np.round(detected_box[:, 0:4])
 
         		current_image = cv2.imread(image_file_path)
+        		if( current_image is None ):
+            			number_of_skipped_images += 1
+            			continue
 
         		neg_num = 0
         		for box in detected_box:
@@ -98,10 +109,7 @@ class HardFaceDataset(SimpleFaceDataset):
             			resized_image = cv2.resize(cropped_image, (image_size, image_size), interpolation=cv2.INTER_LINEAR)
 
             			if( (np.max(current_IoU) < SimpleFaceDataset.negative_IoU()) and (neg_num < 60) ):
-                			file_path = os.path.join(negative_dir, "%s.jpg" % negative_images)
-                			negative_file.write(file_path + ' 0\n')
-                			cv2.imwrite(file_path, resized_image)
-                			negative_images += 1
+                			sample_writers['negative'].write(resized_image, 0)
                 			neg_num += 1
             			else:
                 			idx = np.argmax(current_IoU)
@@ -114,35 +122,34 @@ class HardFaceDataset(SimpleFaceDataset):
                 			offset_y2 = (y2 - y_bottom) / float(height)
 
                 			if( np.max(current_IoU) >= SimpleFaceDataset.positive_IoU() ):
-                    				file_path = os.path.join(positive_dir, "%s.jpg" % positive_images)
-                    				positive_file.write(file_path + ' 1 %.2f %.2f %.2f %.2f\n' % (offset_x1, offset_y1, offset_x2, offset_y2))
-                    				cv2.imwrite(file_path, resized_image)
-                    				positive_images += 1
+                    				sample_writers['positive'].write(resized_image, 1, (offset_x1, offset_y1, offset_x2, offset_y2))
 
                 			elif( np.max(current_IoU) >= SimpleFaceDataset.part_IoU() ):
-                    				file_path = os.path.join(part_dir, "%s.jpg" % part_images)
-                    				part_file.write(file_path + ' -1 %.2f %.2f %.2f %.2f\n' % (offset_x1, offset_y1, offset_x2, offset_y2))
-                    				cv2.imwrite(file_path, resized_image)
-                    				part_images += 1
-    		negative_file.close()
-    		part_file.close()
-    		positive_file.close()
+                    				sample_writers['part'].write(resized_image, -1, (offset_x1, offset_y1, offset_x2, offset_y2))
+
+		if( number_of_skipped_images > 0 ):
+			print('%s images could not be decoded and were skipped.' % number_of_skipped_images)
+
+		for sample_type, sample_writer in sample_writers.items():
+			tensorflow_shard = sample_writer.close()
+			if(tensorflow_shard is not None):
+				TensorFlowDataset.write_index(TensorFlowDataset.tensorflow_file_name(tensorflow_dir, sample_type), [ tensorflow_shard ])
 
 		return(True)
 
-	def generate_samples(self, annotation_image_dir, annotation_file_name, model_train_dir, network_name, minimum_face, target_root_dir):
+	def generate_samples(self, annotation_image_dir, annotation_file_name, model_train_dir, network_name, minimum_face, target_root_dir, network_names=None, sample_format='images', number_of_workers=1):
 
-		if(not self._read_annotation(annotation_image_dir, annotation_file_name)):
+		if(not self._read_annotation(annotation_image_dir, annotation_file_name, number_of_workers)):
 			return(False)
 
 		test_data = InferenceBatch(self._data['images'])
 
 		if(not model_train_dir):
 			model_train_dir = NetworkFactory.model_train_dir()			
-		face_detector = FaceDetector(model_train_dir)
+		face_detector = FaceDetector(model_train_dir, network_names=network_names)
 
 		previous_network = NetworkFactory.previous_network(network_name)
 		detected_boxes, landmarks = face_detector.detect_face(test_data, previous_network)
 
-		return(self._generate_hard_samples(network_name, detected_boxes, minimum_face, target_root_dir))
+		return(self._generate_hard_samples(network_name, detected_boxes, minimum_face, target_root_dir, sample_format))
 
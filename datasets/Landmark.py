@@ -33,25 +33,62 @@ def show_landmark(face, landmark):
     cv2.waitKey(0)
 
 
+def rotation_matrices(centers, alpha):
+    # Batched cv2.getRotationMatrix2D with unit scale, one 2x3 matrix per center.
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+    a = np.cos(np.deg2rad(alpha))
+    b = np.sin(np.deg2rad(alpha))
+    rot_mats = np.empty((len(centers), 2, 3))
+    rot_mats[:, 0, 0] = a
+    rot_mats[:, 0, 1] = b
+    rot_mats[:, 0, 2] = (1 - a) * centers[:, 0] - b * centers[:, 1]
+    rot_mats[:, 1, 0] = -b
+    rot_mats[:, 1, 1] = a
+    rot_mats[:, 1, 2] = b * centers[:, 0] + (1 - a) * centers[:, 1]
+    return rot_mats
+
+
+def transform_landmarks(rot_mats, landmarks):
+    # Applies 2x3 affine matrices to landmark sets of shape (..., N, 2), one matrix per set.
+    rot_mats = np.asarray(rot_mats, dtype=np.float64)
+    landmarks = np.asarray(landmarks, dtype=np.float64)
+    return np.einsum('...ij,...nj->...ni', rot_mats[..., 0:2], landmarks) + rot_mats[..., np.newaxis, :, 2]
+
+
+def warp_crop(img, rot_mat, left, top, right, bottom):
+    # Warps only the [left, right) x [top, bottom) window of the transformed image, clipped to the image like a slice.
+    left, top = max(int(left), 0), max(int(top), 0)
+    right, bottom = min(int(right), img.shape[1]), min(int(bottom), img.shape[0])
+    width, height = max(right - left, 0), max(bottom - top, 0)
+    if width == 0 or height == 0:
+        return np.zeros((height, width) + img.shape[2:], dtype=img.dtype)
+
+    crop_mat = np.array(rot_mat, dtype=np.float64)
+    crop_mat[:, 2] -= (left, top)
+    return cv2.warpAffine(img, crop_mat, (width, height))
+
+
 def rotate(img, bbox, landmark, alpha):
     center = ((bbox.left+bbox.right)/2, (bbox.top+bbox.bottom)/2)
     rot_mat = cv2.getRotationMatrix2D(center, alpha, 1)
 
-    img_rotated_by_alpha = cv2.warpAffine(img, rot_mat,(img.shape[1],img.shape[0]))
-    landmark_ = np.asarray([(rot_mat[0][0]*x+rot_mat[0][1]*y+rot_mat[0][2],
-                 rot_mat[1][0]*x+rot_mat[1][1]*y+rot_mat[1][2]) for (x, y) in landmark])
-
-    face = img_rotated_by_alpha[bbox.top:bbox.bottom+1,bbox.left:bbox.right+1]
+    landmark_ = transform_landmarks(rot_mat, landmark)
+    face = warp_crop(img, rot_mat, bbox.left, bbox.top, bbox.right+1, bbox.bottom+1)
     return (face, landmark_)
 
 
+def flip_landmarks(landmarks):
+    # Mirrors landmark sets of shape (..., 5, 2) normalized to the face, swapping the left and right points.
+    landmarks_ = np.array(landmarks, dtype=np.float64)
+    landmarks_[..., 0] = 1 - landmarks_[..., 0]
+    return landmarks_[..., [1, 0, 2, 4, 3], :]#left eye<->right eye, left mouth<->right mouth
+
+
 def flip(face, landmark):
 
     face_flipped_by_x = cv2.flip(face, 1)
 
-    landmark_ = np.asarray([(1-x, y) for (x, y) in landmark])
-    landmark_[[0, 1]] = landmark_[[1, 0]]#left eye<->right eye
-    landmark_[[3, 4]] = landmark_[[4, 3]]#left mouth<->right mouth
+    landmark_ = flip_landmarks(landmark)
     return (face_flipped_by_x, landmark_)
 
 def randomShift(landmarkGt, shift):
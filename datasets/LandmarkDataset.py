@@ -25,29 +25,29 @@ from __future__ import division
 from __future__ import print_function
 
 import os
-from os.path import join, exists
-import random
+import multiprocessing
 import cv2
 import numpy as np
-import numpy.random as npr
 
-from utils.BBox import BBox
-from utils.IoU import IoU
+from utils.BBoxArray import BBoxArray
 
 from datasets.LFWLandmarkDataset import LFWLandmarkDataset
 from datasets.CelebADataset import CelebADataset
 from datasets.SimpleFaceDataset import SimpleFaceDataset
-from datasets.Landmark import rotate
-from datasets.Landmark import flip
-from datasets.Landmark import randomShift
-from datasets.Landmark import randomShiftWithArgument
+from datasets.SampleWriter import SampleWriter
+from datasets.TensorFlowDataset import TensorFlowDataset
+from datasets.MemmapDataset import MemmapDataset
+from datasets.Landmark import rotation_matrices
+from datasets.Landmark import transform_landmarks
+from datasets.Landmark import warp_crop
+from datasets.Landmark import flip_landmarks
 
 class LandmarkDataset(object):
 
 	def __init__(self, name='Landmark'):
 		self._name = name
 		self._is_valid = False
-		self._landmark_data = []
+		self._landmark_data = ( [], BBoxArray(np.zeros((0, 4), dtype=np.int64)), np.zeros((0, 5, 2)) )
 
 	@classmethod
 	def landmark_file_name(cls, target_root_dir):
@@ -63,7 +63,7 @@ class LandmarkDataset(object):
 	def _read(self, landmark_image_dir, landmark_file_name):
 		
 		self._is_valid = False
-    		self._landmark_data = []
+    		self._landmark_data = ( [], BBoxArray(np.zeros((0, 4), dtype=np.int64)), np.zeros((0, 5, 2)) )
 	
 		landmark_dataset = LFWLandmarkDataset()
 		#landmark_dataset = CelebADataset()
@@ -72,142 +72,187 @@ class LandmarkDataset(object):
 			self._landmark_data = landmark_dataset.data()		
 		else:
 			self._is_valid = False
-    			self._landmark_data = []
+    			self._landmark_data = ( [], BBoxArray(np.zeros((0, 4), dtype=np.int64)), np.zeros((0, 5, 2)) )
 
 		return(self._is_valid)
 
-	def generate(self, landmark_image_dir, landmark_file_name, minimum_face, target_root_dir):
+	def generate(self, landmark_image_dir, landmark_file_name, minimum_face, target_root_dir, sample_format='images', number_of_workers=1, seed=0):
+		return(self.generate_multi_scale(landmark_image_dir, landmark_file_name, [ (minimum_face, target_root_dir) ], sample_format, number_of_workers, seed))
 
+	def generate_multi_scale(self, landmark_image_dir, landmark_file_name, sample_targets, sample_format='images', number_of_workers=1, seed=0):
+		# Each sample target is an image size with the directory its samples are written to, the crops are shared by all of them.
 		if(not self._read(landmark_image_dir, landmark_file_name)):
 			return(False)
-		
-		landmark_dir = os.path.join(target_root_dir, 'landmark')
-		if(not os.path.exists(landmark_dir)):
-    			os.makedirs(landmark_dir)
-
-		landmark_file = open(LandmarkDataset.landmark_file_name(target_root_dir), 'w')
-
-		size = minimum_face
-		argument = True
-
-		number_of_images = 0
-    		number_of_input_images = 0
-		total_number_of_input_images = len(self._landmark_data)
-    		for (image_path, bounding_box, landmarkGt) in self._landmark_data:
-        		F_imgs = []
-        		F_landmarks = []  
-
-			image_path = image_path.replace("\\", '/')
-        		image = cv2.imread(image_path)
-			if( image is None):
-				continue     
-   		
-        		image_height, image_width, image_channels = image.shape
-        		gt_box = np.array([bounding_box.left,bounding_box.top,bounding_box.right,bounding_box.bottom])
-        		f_face = image[bounding_box.top:bounding_box.bottom+1,bounding_box.left:bounding_box.right+1]
-        		f_face = cv2.resize(f_face,(size,size))
-        		landmark = np.zeros((5, 2))
-
-        		for index, one in enumerate(landmarkGt):
-            			rv = ((one[0]-gt_box[0])/(gt_box[2]-gt_box[0]), (one[1]-gt_box[1])/(gt_box[3]-gt_box[1]))
-            			landmark[index] = rv
-
-        		F_imgs.append(f_face)
-        		F_landmarks.append(landmark.reshape(10))
-        		landmark = np.zeros((5, 2))  
-
-			if argument:
-            			number_of_input_images = number_of_input_images + 1
-            			if( number_of_input_images % 1000 == 0 ):
-                			print( '( %s / %s ) number of input images are done.' % ( number_of_input_images, total_number_of_input_images) )
-
-            			x1, y1, x2, y2 = gt_box
-            			gt_w = x2 - x1 + 1
-            			gt_h = y2 - y1 + 1        
-            			if max(gt_w, gt_h) < 40 or x1 < 0 or y1 < 0:
-                			continue
-
-				for i in range(10):
-
-                			bounding_box_size = npr.randint(int(min(gt_w, gt_h) * 0.8), np.ceil(1.25 * max(gt_w, gt_h)))
-                			delta_x = npr.randint(-gt_w * 0.2, gt_w * 0.2)
-                			delta_y = npr.randint(-gt_h * 0.2, gt_h * 0.2)
-                			nx1 = int(max(x1+gt_w/2-bounding_box_size/2+delta_x,0))
-                			ny1 = int(max(y1+gt_h/2-bounding_box_size/2+delta_y,0))
-                
-                			nx2 = nx1 + int(bounding_box_size)
-                			ny2 = ny1 + int(bounding_box_size)
-                			if nx2 > image_width or ny2 > image_height:
-                    				continue
-
-                			crop_box = np.array([nx1,ny1,nx2,ny2])
-                			cropped_im = image[ny1:ny2+1,nx1:nx2+1,:]
-                			resized_im = cv2.resize(cropped_im, (size, size))
-
-                			current_IoU = IoU(crop_box, np.expand_dims(gt_box,0))
-
-					if( current_IoU >= SimpleFaceDataset.positive_IoU() ):
-                    				F_imgs.append(resized_im)
-
-                    				for index, one in enumerate(landmarkGt):
-                        				rv = ((one[0]-nx1)/bounding_box_size, (one[1]-ny1)/bounding_box_size)
-                        				landmark[index] = rv
-                    				F_landmarks.append(landmark.reshape(10))
-                    				landmark = np.zeros((5, 2))
-                    				landmark_ = F_landmarks[-1].reshape(-1,2)
-                    				bounding_box = BBox([nx1,ny1,nx2,ny2])   
-
-                    				#mirror                    
-                    				if random.choice([0,1]) > 0:
-                        				face_flipped, landmark_flipped = flip(resized_im, landmark_)
-                        				face_flipped = cv2.resize(face_flipped, (size, size))
-                        				#c*h*w
-                        				F_imgs.append(face_flipped)
-                        				F_landmarks.append(landmark_flipped.reshape(10))
-                    				#rotate
-                    				if random.choice([0,1]) > 0:
-                        				face_rotated_by_alpha, landmark_rotated = rotate(image, bounding_box,bounding_box.reprojectLandmark(landmark_), 5)
-                        				#landmark_offset
-                        				landmark_rotated = bounding_box.projectLandmark(landmark_rotated)
-                        				face_rotated_by_alpha = cv2.resize(face_rotated_by_alpha, (size, size))
-                        				F_imgs.append(face_rotated_by_alpha)
-                        				F_landmarks.append(landmark_rotated.reshape(10))
-                
-                        				#flip
-                        				face_flipped, landmark_flipped = flip(face_rotated_by_alpha, landmark_rotated)
-                        				face_flipped = cv2.resize(face_flipped, (size, size))
-                        				F_imgs.append(face_flipped)
-                       					F_landmarks.append(landmark_flipped.reshape(10))                
-                    
-                    				#inverse clockwise rotation
-                    				if random.choice([0,1]) > 0: 
-                        				face_rotated_by_alpha, landmark_rotated = rotate(image, bounding_box, bounding_box.reprojectLandmark(landmark_), -5)
-                        				landmark_rotated = bounding_box.projectLandmark(landmark_rotated)
-                        				face_rotated_by_alpha = cv2.resize(face_rotated_by_alpha, (size, size))
-                        				F_imgs.append(face_rotated_by_alpha)
-                        				F_landmarks.append(landmark_rotated.reshape(10))
-                
-                        				face_flipped, landmark_flipped = flip(face_rotated_by_alpha, landmark_rotated)
-                        				face_flipped = cv2.resize(face_flipped, (size, size))
-                        				F_imgs.append(face_flipped)
-                        				F_landmarks.append(landmark_flipped.reshape(10)) 
-
-				F_imgs, F_landmarks = np.asarray(F_imgs), np.asarray(F_landmarks)
-
-            			for i in range(len(F_imgs)):
-                			if np.sum(np.where(F_landmarks[i] <= 0, 1, 0)) > 0:
-                    				continue
-
-                			if np.sum(np.where(F_landmarks[i] >= 1, 1, 0)) > 0:
-                    				continue
-
-                			cv2.imwrite(join(landmark_dir,"%d.jpg" %(number_of_images)), F_imgs[i])
-                			landmarks = map(str,list(F_landmarks[i]))
-                			landmark_file.write(join(landmark_dir,"%d.jpg" %(number_of_images))+" -2 "+" ".join(landmarks)+"\n")
-                			number_of_images = number_of_images + 1
-
-    		landmark_file.close()
-		return(True)
 
+		sample_dirs = []
+		for _, target_root_dir in sample_targets:
+			if(SampleWriter.writes_images(sample_format)):
+				sample_dirs += [ os.path.join(target_root_dir, 'landmark'), _shard_dir(target_root_dir) ]
+			if(SampleWriter.writes_records(sample_format)):
+				tensorflow_dir = TensorFlowDataset.tensorflow_dir(target_root_dir)
+				sample_dirs.append(tensorflow_dir)
+				TensorFlowDataset.remove_tensorflow_files(TensorFlowDataset.tensorflow_file_name(tensorflow_dir, 'landmark'))
+			if(SampleWriter.writes_memmap(sample_format)):
+				memmap_dir = MemmapDataset.memmap_dir(target_root_dir)
+				sample_dirs.append(memmap_dir)
+				MemmapDataset.remove_memmap_files(MemmapDataset.memmap_file_name(memmap_dir, 'landmark'))
+		for sample_dir in sample_dirs:
+			if(not os.path.exists(sample_dir)):
+				os.makedirs(sample_dir)
+
+		# Contiguous shards merged in order give the same files for any number of workers.
+		image_paths, bounding_boxes, landmarks = self._landmark_data
+		total_number_of_input_images = len(image_paths)
+		number_of_shards = min(total_number_of_input_images, max(1, number_of_workers) * 4)
+		shards = []
+		for shard_index, face_indices in enumerate(np.array_split(np.arange(total_number_of_input_images), number_of_shards)):
+			shard_faces = (face_indices, [ image_paths[face_index] for face_index in face_indices ], bounding_boxes[face_indices], landmarks[face_indices])
+			shards.append((shard_index, shard_faces, sample_targets, seed, sample_format))
+
+		if( number_of_workers > 1 ):
+			pool = multiprocessing.Pool(number_of_workers)
+			shard_results = pool.imap(_generate_shard, shards)
+		else:
+			pool = None
+			shard_results = ( _generate_shard(shard) for shard in shards )
+
+		tensorflow_shards = [ [] for _ in sample_targets ]
+		number_of_input_images = 0
+		number_of_samples = 0
+		for shard_index, (shard_number_of_samples, shard_tensorflow_shards) in enumerate(shard_results):
+			for target_index in range(len(sample_targets)):
+				tensorflow_shards[target_index].append(shard_tensorflow_shards[target_index])
+			number_of_input_images += len(shards[shard_index][1])
+			number_of_samples += shard_number_of_samples
+			print( '( %s / %s ) number of input images are done - landmark - %s.' % ( number_of_input_images, total_number_of_input_images, number_of_samples) )
+
+		if( pool is not None ):
+			pool.close()
+			pool.join()
+
+		for target_index, (_, target_root_dir) in enumerate(sample_targets):
+			if(SampleWriter.writes_records(sample_format)):
+				TensorFlowDataset.write_index(TensorFlowDataset.tensorflow_file_name(TensorFlowDataset.tensorflow_dir(target_root_dir), 'landmark'), tensorflow_shards[target_index])
+
+			if(not SampleWriter.writes_images(sample_format)):
+				continue
+
+			landmark_file = open(LandmarkDataset.landmark_file_name(target_root_dir), 'w')
+			for shard_index in range(number_of_shards):
+				shard_file_name = _shard_file_name(target_root_dir, shard_index)
+				shard_file = open(shard_file_name, 'r')
+				landmark_file.write(shard_file.read())
+				shard_file.close()
+				os.remove(shard_file_name)
+			landmark_file.close()
+			os.rmdir(_shard_dir(target_root_dir))
 
+		return(True)
 
+_number_of_crops = 10
+_rotation_angles = [5, -5]
+
+def _shard_dir(target_root_dir):
+	return(os.path.join(target_root_dir, 'landmark_shards'))
+
+def _shard_file_name(target_root_dir, shard_index):
+	return(os.path.join(_shard_dir(target_root_dir), 'landmark-%05d.txt' % shard_index))
+
+def _generate_face_samples(face_index, image_path, gt_box, landmarkGt, face_landmark, random_state, landmark_writers):
+	image = cv2.imread(image_path.replace("\\", '/'))
+	if( image is None):
+		return(0)
+
+	image_height, image_width, image_channels = image.shape
+	x1, y1, x2, y2 = gt_box
+	gt_w = x2 - x1 + 1
+	gt_h = y2 - y1 + 1
+	if( (max(gt_w, gt_h) < 40) or (x1 < 0) or (y1 < 0) ):
+		return(0)
+
+	# Candidate crops around the face, only the positive ones are augmented.
+	low = int(min(gt_w, gt_h) * 0.8)
+	size = random_state.randint(low, max(int(np.ceil(1.25 * max(gt_w, gt_h))), low + 1), _number_of_crops)
+	delta_x = random_state.randint(int(-gt_w * 0.2), max(int(gt_w * 0.2), int(-gt_w * 0.2) + 1), _number_of_crops)
+	delta_y = random_state.randint(int(-gt_h * 0.2), max(int(gt_h * 0.2), int(-gt_h * 0.2) + 1), _number_of_crops)
+	nx1 = np.maximum(x1 + gt_w / 2 - size / 2 + delta_x, 0).astype(np.int64)
+	ny1 = np.maximum(y1 + gt_h / 2 - size / 2 + delta_y, 0).astype(np.int64)
+	crop_boxes = np.stack([nx1, ny1, nx1 + size, ny1 + size], axis=1)
+	crop_boxes = crop_boxes[ (crop_boxes[:, 2] <= image_width) & (crop_boxes[:, 3] <= image_height) ]
+	crop_boxes = crop_boxes[ BBoxArray(crop_boxes).IoU(gt_box)[:, 0] >= SimpleFaceDataset.positive_IoU() ]
+
+	# Landmarks of all crops and of their mirrored and rotated variants are transformed together.
+	crop_bounding_boxes = BBoxArray(crop_boxes)
+	crop_landmarks = { 0: crop_bounding_boxes.projectLandmark(np.broadcast_to(landmarkGt, (len(crop_boxes),) + landmarkGt.shape)) }
+	# Integer centers, as the crops are rotated about them.
+	centers = (crop_boxes[:, 0:2] + crop_boxes[:, 2:4]) // 2
+	rot_mats = dict( (angle, rotation_matrices(centers, angle)) for angle in _rotation_angles )
+	for angle in _rotation_angles:
+		crop_landmarks[angle] = crop_bounding_boxes.projectLandmark(transform_landmarks(rot_mats[angle], crop_bounding_boxes.reprojectLandmark(crop_landmarks[0])))
+	flipped_landmarks = dict( (angle, flip_landmarks(landmarks)) for angle, landmarks in crop_landmarks.items() )
+
+	# Each sample is a crop, its rotation angle, a mirror flag and its landmarks, in the order of the former per-crop loop.
+	samples = [ (None, None, False, face_landmark) ]
+	augmentations = random_state.randint(2, size=(len(crop_boxes), 1 + len(_rotation_angles)))
+	for crop_index, (is_mirrored, is_rotated_clockwise, is_rotated_counterclockwise) in enumerate(augmentations):
+		samples.append((crop_index, 0, False, crop_landmarks[0][crop_index]))
+		if(is_mirrored):
+			samples.append((crop_index, 0, True, flipped_landmarks[0][crop_index]))
+		for angle, is_rotated in zip(_rotation_angles, [is_rotated_clockwise, is_rotated_counterclockwise]):
+			if(is_rotated):
+				samples.append((crop_index, angle, False, crop_landmarks[angle][crop_index]))
+				samples.append((crop_index, angle, True, flipped_landmarks[angle][crop_index]))
+
+	# Faces are cut or warped only for the samples whose landmarks stay inside the crop, and resized per sample target.
+	faces = dict()
+	number_of_samples = 0
+	for crop_index, angle, is_flipped, landmark in samples:
+		if( np.any(landmark <= 0) or np.any(landmark >= 1) ):
+			continue
+
+		if( (crop_index, angle) not in faces ):
+			if( crop_index is None ):
+				faces[(crop_index, angle)] = image[y1:y2 + 1, x1:x2 + 1]
+			else:
+				nx1, ny1, nx2, ny2 = crop_boxes[crop_index]
+				if( angle == 0 ):
+					faces[(crop_index, angle)] = image[ny1:ny2 + 1, nx1:nx2 + 1]
+				else:
+					faces[(crop_index, angle)] = warp_crop(image, rot_mats[angle][crop_index], nx1, ny1, nx2 + 1, ny2 + 1)
+		face = faces[(crop_index, angle)]
+
+		for size, landmark_writer in landmark_writers:
+			resized_face = cv2.resize(face, (size, size))
+			if(is_flipped):
+				resized_face = cv2.flip(resized_face, 1)
+			landmark_writer.write(resized_face, -2, None, landmark.reshape(10), '%d_%d.jpg' % (face_index, number_of_samples))
+		number_of_samples += 1
+
+	return(number_of_samples)
+
+def _generate_shard(shard):
+	shard_index, shard_faces, sample_targets, seed, sample_format = shard
+
+	landmark_writers = []
+	for size, target_root_dir in sample_targets:
+		landmark_dir, list_file_name, tensorflow_file_name, memmap_file_name = None, None, None, None
+		if(SampleWriter.writes_images(sample_format)):
+			landmark_dir = os.path.join(target_root_dir, 'landmark')
+			list_file_name = _shard_file_name(target_root_dir, shard_index)
+		if(SampleWriter.writes_records(sample_format)):
+			tensorflow_file_name = TensorFlowDataset.tensorflow_shard_file_name(TensorFlowDataset.tensorflow_dir(target_root_dir), 'landmark', shard_index)
+		if(SampleWriter.writes_memmap(sample_format)):
+			memmap_file_name = MemmapDataset.memmap_shard_file_name(MemmapDataset.memmap_dir(target_root_dir), 'landmark', shard_index)
+		landmark_writers.append((size, SampleWriter(landmark_dir, list_file_name, tensorflow_file_name, memmap_file_name)))
+
+	number_of_samples = 0
+	face_indices, image_paths, bounding_boxes, landmarks = shard_faces
+	# Landmarks relative to the annotated faces, for the whole shard at once.
+	face_landmarks = bounding_boxes.projectLandmark(landmarks)
+	for face_index, image_path, gt_box, landmarkGt, face_landmark in zip(face_indices, image_paths, bounding_boxes.boxes(), landmarks, face_landmarks):
+		# Seeded by the face index, so the samples do not depend on the shard layout.
+		random_state = np.random.RandomState([seed, face_index])
+		number_of_samples += _generate_face_samples(face_index, image_path, gt_box, landmarkGt, face_landmark, random_state, landmark_writers)
+
+	tensorflow_shards = [ landmark_writer.close() for _, landmark_writer in landmark_writers ]
+	return(number_of_samples, tensorflow_shards)
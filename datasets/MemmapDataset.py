@@ -0,0 +1,229 @@
+# MIT License
+# 
+# Copyright (c) 2018
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import glob
+import json
+import numpy as np
+import tensorflow as tf
+
+from datasets.MemmapWriter import MemmapWriter
+from datasets.TensorFlowDataset import TensorFlowDataset
+
+class MemmapDataset(object):
+
+	__chunk_size = 4096
+
+	def __init__(self):
+		self._is_valid = False
+		self._arrays = []
+		self._offsets = np.zeros(1, dtype=np.int64)
+		self._image_size = 0
+		self._random_state = np.random.RandomState()
+		self._permutation = np.zeros(0, dtype=np.int64)
+		self._position = 0
+
+	def is_valid(self):
+		return(self._is_valid)
+
+	def number_of_samples(self):
+		return(int(self._offsets[-1]))
+
+	def image_size(self):
+		return(self._image_size)
+
+	@classmethod
+	def memmap_dir(cls, target_root_dir):
+		return(os.path.join(target_root_dir, 'memmap'))
+
+	@classmethod
+	def memmap_file_name(cls, target_dir, target_name):
+		return(os.path.join(target_dir, target_name + '.memmap'))
+
+	@classmethod
+	def memmap_shard_file_name(cls, target_dir, target_name, shard_index):
+		return(MemmapDataset.memmap_file_name(target_dir, target_name) + '-%05d' % shard_index)
+
+	@classmethod
+	def memmap_file_names(cls, memmap_file_name):
+		# A dataset is either a single set of arrays or the shards written next to its name.
+		if(os.path.isfile(MemmapWriter.meta_file_name(memmap_file_name))):
+			return([memmap_file_name])
+		return(sorted( meta_file_name[:-len('.json')] for meta_file_name in glob.glob(memmap_file_name + '-[0-9]*.json') ))
+
+	@classmethod
+	def remove_memmap_files(cls, memmap_file_name):
+		for file_name in MemmapDataset.memmap_file_names(memmap_file_name):
+			for array_name in MemmapWriter.array_names():
+				os.remove(MemmapWriter.array_file_name(file_name, array_name))
+			os.remove(MemmapWriter.meta_file_name(file_name))
+
+	@classmethod
+	def number_of_records(cls, memmap_file_name):
+		number_of_records = 0
+		for file_name in MemmapDataset.memmap_file_names(memmap_file_name):
+			with open(MemmapWriter.meta_file_name(file_name), 'r') as meta_file:
+				number_of_records += json.load(meta_file)['number_of_samples']
+		return(number_of_records)
+
+	def read(self, memmap_file_name):
+		self._is_valid = False
+		self._arrays = []
+
+		for file_name in MemmapDataset.memmap_file_names(memmap_file_name):
+			with open(MemmapWriter.meta_file_name(file_name), 'r') as meta_file:
+				meta = json.load(meta_file)
+			number_of_samples, image_size = meta['number_of_samples'], meta['image_size']
+			if( not number_of_samples ):
+				continue
+			self._image_size = image_size
+			self._arrays.append({
+				'images': np.memmap(MemmapWriter.array_file_name(file_name, 'images'), dtype=np.uint8, mode='r', shape=(number_of_samples, image_size, image_size, 3)),
+				'labels': np.memmap(MemmapWriter.array_file_name(file_name, 'labels'), dtype=np.int8, mode='r', shape=(number_of_samples,)),
+				'rois': np.memmap(MemmapWriter.array_file_name(file_name, 'rois'), dtype=np.float32, mode='r', shape=(number_of_samples, 4)),
+				'landmarks': np.memmap(MemmapWriter.array_file_name(file_name, 'landmarks'), dtype=np.float32, mode='r', shape=(number_of_samples, 10))
+				})
+
+		self._offsets = np.cumsum([0] + [ len(arrays['labels']) for arrays in self._arrays ]).astype(np.int64)
+		self._is_valid = (self.number_of_samples() > 0)
+		return(self._is_valid)
+
+	def samples(self, sample_indices):
+		sample_indices = np.asarray(sample_indices, dtype=np.int64)
+		images = np.empty((len(sample_indices), self._image_size, self._image_size, 3), dtype=np.uint8)
+		labels = np.empty(len(sample_indices), dtype=np.int8)
+		rois = np.empty((len(sample_indices), 4), dtype=np.float32)
+		landmarks = np.empty((len(sample_indices), 10), dtype=np.float32)
+
+		# Samples are gathered shard by shard in file order, which keeps the page cache reads sequential.
+		shard_indices = np.searchsorted(self._offsets, sample_indices, side='right') - 1
+		for shard_index in np.unique(shard_indices):
+			positions = np.flatnonzero(shard_indices == shard_index)
+			local_indices = sample_indices[positions] - self._offsets[shard_index]
+			order = np.argsort(local_indices, kind='mergesort')
+			positions, local_indices = positions[order], local_indices[order]
+
+			arrays = self._arrays[shard_index]
+			images[positions] = arrays['images'][local_indices]
+			labels[positions] = arrays['labels'][local_indices]
+			rois[positions] = arrays['rois'][local_indices]
+			landmarks[positions] = arrays['landmarks'][local_indices]
+
+		return( images, labels, rois, landmarks )
+
+	def next_batch(self, batch_size):
+		# Random batches, every sample is visited once per epoch.
+		sample_indices = []
+		while( len(sample_indices) < batch_size ):
+			if( self._position >= len(self._permutation) ):
+				self._permutation = self._random_state.permutation(self.number_of_samples())
+				self._position = 0
+			count = min(batch_size - len(sample_indices), len(self._permutation) - self._position)
+			sample_indices.extend(self._permutation[self._position : self._position + count])
+			self._position += count
+
+		images, labels, rois, landmarks = self.samples(sample_indices)
+		images = (images.astype(np.float32) - 127.5) / 128
+		return( images, labels.astype(np.float32), rois, landmarks )
+
+	def read_memmap_file(self, memmap_file_name, batch_size, image_size):
+		if( (not self.read(memmap_file_name)) or (not (self.image_size() == image_size)) ):
+			raise ValueError('Invalid memory-mapped dataset - ' + memmap_file_name + '.')
+
+		image, label, roi, landmark = tf.py_func(lambda: self.next_batch(batch_size), [], [tf.float32, tf.float32, tf.float32, tf.float32], stateful=True)
+		image.set_shape([batch_size, image_size, image_size, 3])
+		label.set_shape([batch_size])
+		roi.set_shape([batch_size, 4])
+		landmark.set_shape([batch_size, 10])
+		return( image, label, roi, landmark )
+
+	def read_memmap_files(self, memmap_file_names, batch_sizes, image_size):
+		batches = [ MemmapDataset().read_memmap_file(memmap_file_name, batch_size, image_size) for memmap_file_name, batch_size in zip(memmap_file_names, batch_sizes) ]
+		images, labels, rois, landmarks = [ tf.concat(tensors, 0, name='concat/' + tensor_name) for tensors, tensor_name in zip(zip(*batches), ['image', 'label', 'roi', 'landmark']) ]
+		return( images, labels, rois, landmarks )
+
+	def generate_from_memmap_files(self, memmap_sources, target_root_dir, target_name):
+		# Each source is a memory-mapped file name with the indices of the samples to copy, or None for every sample.
+		datasets = []
+		source_indices = []
+		sample_indices = []
+		for source_index, (memmap_file_name, indices) in enumerate(memmap_sources):
+			dataset = MemmapDataset()
+			if( not dataset.read(memmap_file_name) ):
+				continue
+			if( indices is None ):
+				indices = np.arange(dataset.number_of_samples())
+			datasets.append(dataset)
+			source_indices.append(np.full(len(indices), len(datasets) - 1, dtype=np.int64))
+			sample_indices.append(np.asarray(indices, dtype=np.int64))
+
+		if(not len(datasets)):
+			return(False)
+		source_indices = np.concatenate(source_indices)
+		sample_indices = np.concatenate(sample_indices)
+		permutation = np.random.permutation(len(sample_indices))
+
+		memmap_dir = MemmapDataset.memmap_dir(target_root_dir)
+		if(not os.path.exists(memmap_dir)):
+			os.makedirs(memmap_dir)
+		memmap_file_name = MemmapDataset.memmap_file_name(memmap_dir, target_name)
+		MemmapDataset.remove_memmap_files(memmap_file_name)
+		memmap_writer = MemmapWriter(memmap_file_name)
+		for start in range(0, len(permutation), MemmapDataset.__chunk_size):
+			chunk = permutation[start : start + MemmapDataset.__chunk_size]
+			chunk_sources, chunk_samples = source_indices[chunk], sample_indices[chunk]
+			image_size = datasets[0].image_size()
+			images = np.empty((len(chunk), image_size, image_size, 3), dtype=np.uint8)
+			labels = np.empty(len(chunk), dtype=np.int8)
+			rois = np.empty((len(chunk), 4), dtype=np.float32)
+			landmarks = np.empty((len(chunk), 10), dtype=np.float32)
+			for source_index, dataset in enumerate(datasets):
+				positions = np.flatnonzero(chunk_sources == source_index)
+				if( len(positions) ):
+					images[positions], labels[positions], rois[positions], landmarks[positions] = dataset.samples(chunk_samples[positions])
+			memmap_writer.write_batch(images, labels, rois, landmarks)
+		memmap_writer.close()
+
+		return(True)
+
+	def convert(self, tensorflow_file_name, target_root_dir, target_name):
+		if( not TensorFlowDataset.tensorflow_file_names(tensorflow_file_name) ):
+			return(False)
+
+		memmap_dir = MemmapDataset.memmap_dir(target_root_dir)
+		if(not os.path.exists(memmap_dir)):
+			os.makedirs(memmap_dir)
+		memmap_file_name = MemmapDataset.memmap_file_name(memmap_dir, target_name)
+		MemmapDataset.remove_memmap_files(memmap_file_name)
+
+		image_encoding, _ = TensorFlowDataset.dataset_options(tensorflow_file_name)
+		memmap_writer = MemmapWriter(memmap_file_name)
+		for _, record in TensorFlowDataset.read_records(tensorflow_file_name):
+			image, label, roi, landmark = TensorFlowDataset.parse_sample(record, image_encoding)
+			memmap_writer.write(image, label, roi, landmark)
+		memmap_writer.close()
+
+		return(True)
@@ -0,0 +1,90 @@
+# MIT License
+# 
+# Copyright (c) 2018
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import json
+import numpy as np
+
+class MemmapWriter(object):
+
+	__array_names = ['images', 'labels', 'rois', 'landmarks']
+
+	def __init__(self, file_name):
+		self._file_name = file_name
+		self._array_files = dict( (array_name, open(MemmapWriter.array_file_name(file_name, array_name), 'wb')) for array_name in MemmapWriter.__array_names )
+		self._image_size = 0
+		self._number_of_samples = 0
+		self._label_counts = dict()
+
+	@classmethod
+	def array_names(cls):
+		return(MemmapWriter.__array_names)
+
+	@classmethod
+	def array_file_name(cls, file_name, array_name):
+		return(file_name + '.' + array_name)
+
+	@classmethod
+	def meta_file_name(cls, file_name):
+		return(file_name + '.json')
+
+	def file_name(self):
+		return(self._file_name)
+
+	def number_of_samples(self):
+		return(self._number_of_samples)
+
+	def write_batch(self, images, labels, rois, landmarks):
+		images = np.ascontiguousarray(images, dtype=np.uint8)
+		if( not self._image_size ):
+			self._image_size = images.shape[1]
+
+		labels = np.asarray(labels, dtype=np.int8).reshape(-1)
+		self._array_files['images'].write(images.tostring())
+		self._array_files['labels'].write(labels.tostring())
+		self._array_files['rois'].write(np.asarray(rois, dtype=np.float32).reshape(-1, 4).tostring())
+		self._array_files['landmarks'].write(np.asarray(landmarks, dtype=np.float32).reshape(-1, 10).tostring())
+
+		for label, count in zip(*np.unique(labels, return_counts=True)):
+			self._label_counts[str(label)] = self._label_counts.get(str(label), 0) + int(count)
+		self._number_of_samples += len(labels)
+
+	def write(self, image, label, roi=None, landmark=None):
+		if( roi is None ):
+			roi = np.zeros(4)
+		if( landmark is None ):
+			landmark = np.zeros(10)
+		self.write_batch(image[np.newaxis], [label], roi, landmark)
+
+	def close(self):
+		if( self._array_files is None ):
+			return
+		for array_file in self._array_files.values():
+			array_file.close()
+		self._array_files = None
+
+		# The sample count and patch size describe the flat arrays for the reader.
+		with open(MemmapWriter.meta_file_name(self._file_name), 'w') as meta_file:
+			json.dump({ 'number_of_samples': self._number_of_samples, 'image_size': self._image_size, 'labels': self._label_counts }, meta_file, indent=1, sort_keys=True)
@@ -0,0 +1,108 @@
+# MIT License
+# 
+# Copyright (c) 2018
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import cv2
+
+from datasets.TensorFlowDataset import TensorFlowDataset
+from datasets.TensorFlowRecordWriter import TensorFlowRecordWriter
+from datasets.MemmapWriter import MemmapWriter
+
+class SampleWriter(object):
+
+	__sample_formats = ['images', 'records', 'both', 'memmap']
+
+	def __init__(self, image_dir=None, list_file_name=None, tensorflow_file_name=None, memmap_file_name=None):
+		self._image_dir = image_dir
+		self._list_file = None
+		self._tensorflow_writer = None
+		self._memmap_writer = None
+		self._number_of_samples = 0
+
+		if( image_dir and list_file_name ):
+			self._list_file = open(list_file_name, 'w')
+		if( tensorflow_file_name ):
+			self._tensorflow_writer = TensorFlowRecordWriter(tensorflow_file_name)
+		if( memmap_file_name ):
+			self._memmap_writer = MemmapWriter(memmap_file_name)
+
+	@classmethod
+	def sample_formats(cls):
+		return(SampleWriter.__sample_formats)
+
+	@classmethod
+	def writes_images(cls, sample_format):
+		return(sample_format in ['images', 'both'])
+
+	@classmethod
+	def writes_records(cls, sample_format):
+		return(sample_format in ['records', 'both'])
+
+	@classmethod
+	def writes_memmap(cls, sample_format):
+		return(sample_format == 'memmap')
+
+	@classmethod
+	def sample_label(cls, label, roi=None, landmark=None):
+		if( landmark is not None ):
+			return(' %d ' % label + ' '.join(map(str, list(landmark))))
+		if( roi is not None ):
+			return(' %d %.2f %.2f %.2f %.2f' % ((label,) + tuple(roi)))
+		return(' %d' % label)
+
+	def number_of_samples(self):
+		return(self._number_of_samples)
+
+	def write(self, image, label, roi=None, landmark=None, image_name=None):
+		if( self._list_file is not None ):
+			if( image_name is None ):
+				image_name = '%d.jpg' % self._number_of_samples
+			file_path = os.path.join(self._image_dir, image_name)
+			self._list_file.write(file_path + SampleWriter.sample_label(label, roi, landmark) + '\n')
+			cv2.imwrite(file_path, image)
+
+		if( self._tensorflow_writer is not None ):
+			self._tensorflow_writer.write(TensorFlowDataset.serialize_sample(image, label, roi, landmark), label)
+
+		if( self._memmap_writer is not None ):
+			self._memmap_writer.write(image, label, roi, landmark)
+
+		self._number_of_samples += 1
+
+	def close(self):
+		if( self._list_file is not None ):
+			self._list_file.close()
+			self._list_file = None
+
+		if( self._memmap_writer is not None ):
+			self._memmap_writer.close()
+			self._memmap_writer = None
+
+		tensorflow_shard = None
+		if( self._tensorflow_writer is not None ):
+			tensorflow_shard = self._tensorflow_writer.close()
+			self._tensorflow_writer = None
+		return(tensorflow_shard)
@@ -30,7 +30,9 @@ import numpy.random as npr
 from datasets.AbstractDataset import AbstractDataset
 from datasets.LandmarkDataset import LandmarkDataset
 from datasets.SimpleFaceDataset import SimpleFaceDataset
+from datasets.SampleWriter import SampleWriter
 from datasets.TensorFlowDataset import TensorFlowDataset
+from datasets.MemmapDataset import MemmapDataset
 from nets.NetworkFactory import NetworkFactory
 
 class SimpleDataset(AbstractDataset):
@@ -42,13 +44,24 @@ class SimpleDataset(AbstractDataset):
 	def __init__(self, network_name='PNet'):	
 		AbstractDataset.__init__(self, network_name)	
 	
-	def _generate_landmark_samples(self, landmark_image_dir, landmark_file_name, minimum_face, target_root_dir):
+	def _generate_landmark_samples(self, landmark_image_dir, landmark_file_name, minimum_face, target_root_dir, sample_format='images', number_of_workers=1, seed=0):
 		landmark_dataset = LandmarkDataset()		
-		return(landmark_dataset.generate(landmark_image_dir, landmark_file_name, minimum_face, target_root_dir))
+		return(landmark_dataset.generate(landmark_image_dir, landmark_file_name, minimum_face, target_root_dir, sample_format, number_of_workers, seed))
 		
-	def _generate_image_samples(self, annotation_image_dir, annotation_file_name, minimum_face, target_root_dir):
+	def _generate_image_samples(self, annotation_image_dir, annotation_file_name, minimum_face, target_root_dir, number_of_workers=1, seed=0, sample_format='images'):
 		wider_dataset = SimpleFaceDataset()		
-		return(wider_dataset.generate_samples(annotation_image_dir, annotation_file_name, minimum_face, target_root_dir))
+		return(wider_dataset.generate_samples(annotation_image_dir, annotation_file_name, minimum_face, target_root_dir, number_of_workers, seed, sample_format))
+
+	def _sample_indices(self, number_of_positive_images, number_of_part_images, number_of_negative_images, base_number_of_images):
+    		if(number_of_negative_images > base_number_of_images * SimpleDataset.__negative_ratio ):
+        		negative_number_of_images = npr.choice(number_of_negative_images, size=base_number_of_images * SimpleDataset.__negative_ratio, replace=True)
+    		else:
+        		negative_number_of_images = npr.choice(number_of_negative_images, size=number_of_negative_images, replace=True)
+
+    		positive_number_of_images = npr.choice(number_of_positive_images, size=base_number_of_images * SimpleDataset.__positive_ratio, replace=True)
+    		part_number_of_images = npr.choice(number_of_part_images, size=base_number_of_images * SimpleDataset.__part_ratio, replace=True)
+
+		return( positive_number_of_images, part_number_of_images, negative_number_of_images )
 
 	def _generate_image_list(self, base_number_of_images, target_root_dir):
 		positive_file = open(SimpleFaceDataset.positive_file_name(target_root_dir), 'r')
@@ -65,13 +78,7 @@ class SimpleDataset(AbstractDataset):
 
 		image_list_file = open(self._image_list_file_name(target_root_dir), 'w')
 
-    		if(len(negative_data) > base_number_of_images * SimpleDataset.__negative_ratio ):
-        		negative_number_of_images = npr.choice(len(negative_data), size=base_number_of_images * SimpleDataset.__negative_ratio, replace=True)
-    		else:
-        		negative_number_of_images = npr.choice(len(negative_data), size=len(negative_data), replace=True)
-
-    		positive_number_of_images = npr.choice(len(positive_data), size=base_number_of_images * SimpleDataset.__positive_ratio, replace=True)
-    		part_number_of_images = npr.choice(len(part_data), size=base_number_of_images * SimpleDataset.__part_ratio, replace=True)
+    		positive_number_of_images, part_number_of_images, negative_number_of_images = self._sample_indices(len(positive_data), len(part_data), len(negative_data), base_number_of_images)
 
     		for i in positive_number_of_images:
         		image_list_file.write(positive_data[i])
@@ -85,14 +92,71 @@ class SimpleDataset(AbstractDataset):
 
 		return(True)
 
-	def _generate_dataset(self, target_root_dir):
+	def _generate_record_list(self, base_number_of_images, target_root_dir, number_of_shards=1, image_encoding='raw', compression_type='none'):
+		tensorflow_dir = TensorFlowDataset.tensorflow_dir(target_root_dir)
+		positive_file_name = TensorFlowDataset.tensorflow_file_name(tensorflow_dir, 'positive')
+		part_file_name = TensorFlowDataset.tensorflow_file_name(tensorflow_dir, 'part')
+		negative_file_name = TensorFlowDataset.tensorflow_file_name(tensorflow_dir, 'negative')
+		landmark_file_name = TensorFlowDataset.tensorflow_file_name(tensorflow_dir, 'landmark')
+
+		positive_number_of_images, part_number_of_images, negative_number_of_images = self._sample_indices(
+			TensorFlowDataset.number_of_records(positive_file_name), TensorFlowDataset.number_of_records(part_file_name), TensorFlowDataset.number_of_records(negative_file_name), base_number_of_images)
+
+		tensorflow_dataset = TensorFlowDataset()
+		tensorflow_sources = [ (positive_file_name, positive_number_of_images), (negative_file_name, negative_number_of_images), (part_file_name, part_number_of_images), (landmark_file_name, None) ]
+		return(tensorflow_dataset.generate_from_tensorflow_files(tensorflow_sources, target_root_dir, 'image_list', number_of_shards, image_encoding, compression_type))
+
+	def _generate_memmap_list(self, base_number_of_images, target_root_dir):
+		memmap_dir = MemmapDataset.memmap_dir(target_root_dir)
+		positive_file_name = MemmapDataset.memmap_file_name(memmap_dir, 'positive')
+		part_file_name = MemmapDataset.memmap_file_name(memmap_dir, 'part')
+		negative_file_name = MemmapDataset.memmap_file_name(memmap_dir, 'negative')
+		landmark_file_name = MemmapDataset.memmap_file_name(memmap_dir, 'landmark')
+
+		positive_number_of_images, part_number_of_images, negative_number_of_images = self._sample_indices(
+			MemmapDataset.number_of_records(positive_file_name), MemmapDataset.number_of_records(part_file_name), MemmapDataset.number_of_records(negative_file_name), base_number_of_images)
+
+		memmap_dataset = MemmapDataset()
+		memmap_sources = [ (positive_file_name, positive_number_of_images), (negative_file_name, negative_number_of_images), (part_file_name, part_number_of_images), (landmark_file_name, None) ]
+		return(memmap_dataset.generate_from_memmap_files(memmap_sources, target_root_dir, 'image_list'))
+
+	def _generate_dataset(self, target_root_dir, number_of_shards=1, number_of_workers=1, image_encoding='raw', compression_type='none'):
 		tensorflow_dataset = TensorFlowDataset()
-		if(not tensorflow_dataset.generate(self._image_list_file_name(target_root_dir), target_root_dir, 'image_list')):
+		if(not tensorflow_dataset.generate(self._image_list_file_name(target_root_dir), target_root_dir, 'image_list', number_of_shards, number_of_workers, image_encoding, compression_type)):
 			return(False) 
 
 		return(True)
 
-	def generate(self, annotation_image_dir, annotation_file_name, landmark_image_dir, landmark_file_name, base_number_of_images, target_root_dir):
+	def _generate_mixed_dataset(self, base_number_of_images, target_root_dir, number_of_workers=1, sample_format='images', number_of_shards=1, image_encoding='raw', compression_type='none'):
+		# Samples written straight into TensorFlow files are mixed from the records, without reading the images back.
+		if(SampleWriter.writes_records(sample_format)):
+			print('Generating TensorFlow dataset.')
+			if(not self._generate_record_list(base_number_of_images, target_root_dir, number_of_shards, image_encoding, compression_type)):
+				print('Error generating TensorFlow dataset.')
+				return(False)
+			print('Generated TensorFlow dataset.')
+			return(True)
+
+		if(SampleWriter.writes_memmap(sample_format)):
+			print('Generating memory-mapped dataset.')
+			if(not self._generate_memmap_list(base_number_of_images, target_root_dir)):
+				print('Error generating memory-mapped dataset.')
+				return(False)
+			print('Generated memory-mapped dataset.')
+			return(True)
+
+		if(not self._generate_image_list(base_number_of_images, target_root_dir)):
+			return(False)
+
+		print('Generating TensorFlow dataset.')
+		if(not self._generate_dataset(target_root_dir, number_of_shards, number_of_workers, image_encoding, compression_type)):
+			print('Error generating TensorFlow dataset.')
+			return(False)
+		print('Generated TensorFlow dataset.')
+
+		return(True)
+
+	def generate(self, annotation_image_dir, annotation_file_name, landmark_image_dir, landmark_file_name, base_number_of_images, target_root_dir, number_of_workers=1, seed=0, sample_format='images', number_of_shards=1, image_encoding='raw', compression_type='none'):
 
 		if(not os.path.isfile(annotation_file_name)):
 			return(False)
@@ -105,33 +169,70 @@ class SimpleDataset(AbstractDataset):
 			return(False)
 
 		target_root_dir = os.path.expanduser(target_root_dir)
-		target_root_dir = os.path.join(target_root_dir, self.network_name())
+		target_root_dir = os.path.join(target_root_dir, NetworkFactory.stage(self.network_name()))
 		if(not os.path.exists(target_root_dir)):
 			os.makedirs(target_root_dir)
 
 		minimum_face = NetworkFactory.network_size(self.network_name())
 
 		print('Generating landmark samples.')
-		if(not self._generate_landmark_samples(landmark_image_dir, landmark_file_name, minimum_face, target_root_dir)):
+		if(not self._generate_landmark_samples(landmark_image_dir, landmark_file_name, minimum_face, target_root_dir, sample_format, number_of_workers, seed)):
 			print('Error generating landmark samples.')
 			return(False)
 		print('Generated landmark samples.')
 
 		print('Generating image samples.')
-		if(not self._generate_image_samples(annotation_image_dir, annotation_file_name, minimum_face, target_root_dir)):
+		if(not self._generate_image_samples(annotation_image_dir, annotation_file_name, minimum_face, target_root_dir, number_of_workers, seed, sample_format)):
 			print('Error generating image samples.')
 			return(False)
 		print('Generated image samples.')
 
-		if(not self._generate_image_list(base_number_of_images, target_root_dir)):
+		return(self._generate_mixed_dataset(base_number_of_images, target_root_dir, number_of_workers, sample_format, number_of_shards, image_encoding, compression_type))
+
+	@classmethod
+	def generate_networks(cls, network_names, annotation_image_dir, annotation_file_name, landmark_image_dir, landmark_file_name, base_number_of_images, target_root_dir, number_of_workers=1, seed=0, sample_format='images', number_of_shards=1, image_encoding='raw', compression_type='none'):
+		# Generates the datasets of several network stages in one pass, each source image is decoded once and its crops are resized for every stage.
+
+		if(not os.path.isfile(annotation_file_name)):
+			return(False)
+		if(not os.path.exists(annotation_image_dir)):
 			return(False)
 
-		print('Generating TensorFlow dataset.')
-		if(not self._generate_dataset(target_root_dir)):
-			print('Error generating TensorFlow dataset.')
+		if(not os.path.isfile(landmark_file_name)):
+			return(False)
+		if(not os.path.exists(landmark_image_dir)):
 			return(False)
-		print('Generated TensorFlow dataset.')
 
-		return(True)
+		target_root_dir = os.path.expanduser(target_root_dir)
+		datasets = []
+		sample_targets = []
+		for network_name in network_names:
+			stage_root_dir = os.path.join(target_root_dir, NetworkFactory.stage(network_name))
+			if( stage_root_dir in [ stage_target_dir for _, stage_target_dir in sample_targets ] ):
+				continue
+			if(not os.path.exists(stage_root_dir)):
+				os.makedirs(stage_root_dir)
+			datasets.append(SimpleDataset(network_name))
+			sample_targets.append((NetworkFactory.network_size(network_name), stage_root_dir))
+
+		print('Generating landmark samples.')
+		landmark_dataset = LandmarkDataset()
+		if(not landmark_dataset.generate_multi_scale(landmark_image_dir, landmark_file_name, sample_targets, sample_format, number_of_workers, seed)):
+			print('Error generating landmark samples.')
+			return(False)
+		print('Generated landmark samples.')
 
+		print('Generating image samples.')
+		wider_dataset = SimpleFaceDataset()
+		if(not wider_dataset.generate_multi_scale_samples(annotation_image_dir, annotation_file_name, sample_targets, number_of_workers, seed, sample_format)):
+			print('Error generating image samples.')
+			return(False)
+		print('Generated image samples.')
+
+		# The samples are shared, while each stage draws its own mix of them.
+		for dataset, (_, stage_root_dir) in zip(datasets, sample_targets):
+			print('Generating ' + dataset.network_name() + ' dataset.')
+			if(not dataset._generate_mixed_dataset(base_number_of_images, stage_root_dir, number_of_workers, sample_format, number_of_shards, image_encoding, compression_type)):
+				return(False)
 
+		return(True)
@@ -25,10 +25,15 @@ from __future__ import division
 from __future__ import print_function
 
 import os
+import multiprocessing
 import numpy as np
 import cv2
-import numpy.random as npr
-from utils.IoU import IoU
+from utils.IoU import IoU_matrix
+
+from datasets.AnnotationIndex import AnnotationIndex
+from datasets.SampleWriter import SampleWriter
+from datasets.TensorFlowDataset import TensorFlowDataset
+from datasets.MemmapDataset import MemmapDataset
 
 class SimpleFaceDataset(object):
 
@@ -74,177 +79,227 @@ class SimpleFaceDataset(object):
 	def data(self):
 		return(self._data)
 
-	def _read_annotation(self, annotation_image_dir, annotation_file_name):
-		
-		if(not os.path.isfile(annotation_file_name)):
-			return(False)
+	def _read_annotation(self, annotation_image_dir, annotation_file_name, number_of_workers=1):
 
 		self._data = dict()
 		self._is_valid = False
 
-		images = []
-		bounding_boxes = []
-		annotation_file = open(annotation_file_name, 'r')
-		while( True ):
-       			image_path = annotation_file.readline().strip('\n')
-       			if( not image_path ):
-       				break			
-
-       			image_path = os.path.join(annotation_image_dir, image_path)
-			image = cv2.imread(image_path)
-			if(image is None):
-				continue
-
-       			images.append(image_path)
-
-       			nums = annotation_file.readline().strip('\n')
-       			one_image_boxes = []
-       			for face_index in range(int(nums)):
-       				bounding_box_info = annotation_file.readline().strip('\n').split(' ')
-
-       				face_box = [float(bounding_box_info[i]) for i in range(4)]
-
-       				xmin = face_box[0]
-       				ymin = face_box[1]
-       				xmax = xmin + face_box[2]
-       				ymax = ymin + face_box[3]
-
-       				one_image_boxes.append([xmin, ymin, xmax, ymax])
-
-       			bounding_boxes.append(one_image_boxes)
+		annotation_index = AnnotationIndex()
+		if(not annotation_index.read(annotation_image_dir, annotation_file_name, number_of_workers)):
+			return(False)
 
-		if(len(images)):			
-			self._data['images'] = images
-			self._data['bboxes'] = bounding_boxes
-			self._is_valid = True
-		else:
-			self._is_valid = False
+		self._data['images'] = annotation_index.image_paths()
+		self._data['bboxes'] = annotation_index.bounding_boxes()
+		self._data['image_sizes'] = annotation_index.image_sizes()
+		self._is_valid = True
 
 		return(self.is_valid())
 
+	def generate_samples(self, annotation_image_dir, annotation_file_name, minimum_face, target_root_dir, number_of_workers=1, seed=0, sample_format='images'):
+		return(self.generate_multi_scale_samples(annotation_image_dir, annotation_file_name, [ (minimum_face, target_root_dir) ], number_of_workers, seed, sample_format))
 
-	def generate_samples(self, annotation_image_dir, annotation_file_name, minimum_face, target_root_dir):
-
-		if(not self._read_annotation(annotation_image_dir, annotation_file_name)):
+	def generate_multi_scale_samples(self, annotation_image_dir, annotation_file_name, sample_targets, number_of_workers=1, seed=0, sample_format='images'):
+		# Each sample target is an image size with the directory its samples are written to, the crops are shared by all of them.
+		if(not self._read_annotation(annotation_image_dir, annotation_file_name, number_of_workers)):
 			return(False)
 
 		image_file_names = self._data['images']
 		ground_truth_boxes = self._data['bboxes']
 
-		positive_dir = os.path.join(target_root_dir, 'positive')
-		part_dir = os.path.join(target_root_dir, 'part')
-		negative_dir = os.path.join(target_root_dir, 'negative')
-
-		if(not os.path.exists(positive_dir)):
-    			os.makedirs(positive_dir)
-		if(not os.path.exists(part_dir)):
-    			os.makedirs(part_dir)
-		if(not os.path.exists(negative_dir)):
-    			os.makedirs(negative_dir)
-
-		positive_file = open(SimpleFaceDataset.positive_file_name(target_root_dir), 'w')
-		part_file = open(os.path.join(target_root_dir, 'part.txt'), 'w')
-		negative_file = open(os.path.join(target_root_dir, 'negative.txt'), 'w')
-
-		positive_images = 0
-		part_images = 0
-		negative_images = 0
-		annotation_number = 0
-
-    		for image_file_path, ground_truth_box in zip(image_file_names, ground_truth_boxes):
-        		bounding_boxes = np.array(ground_truth_box, dtype=np.float32).reshape(-1, 4)			
-
-			current_image = cv2.imread(image_file_path)
-    			height, width, channel = current_image.shape
-
-			neg_num = 0
-			while(neg_num < 50):
-				size = npr.randint(12, min(width, height) / 2)
-			        nx = npr.randint(0, width - size)
-        			ny = npr.randint(0, height - size)
-        
-        			crop_box = np.array([nx, ny, nx + size, ny + size])
-        
-        			current_IoU = IoU(crop_box, bounding_boxes)
-        
-        			cropped_image = current_image[ny : ny + size, nx : nx + size, :]
-        			resized_image = cv2.resize(cropped_image, (minimum_face, minimum_face), interpolation=cv2.INTER_LINEAR)
-				if( np.max(current_IoU) < SimpleFaceDataset.negative_IoU() ):
-					file_path = os.path.join(negative_dir, "%s.jpg"%negative_images)
-					negative_file.write(file_path + ' 0\n')
-					cv2.imwrite(file_path, resized_image)
-            				negative_images += 1
-            				neg_num += 1
-
-			for bounding_box in bounding_boxes:
-				x1, y1, x2, y2 = bounding_box
-				w = x2 - x1 + 1
-				h = y2 - y1 + 1
-
-				if( max(w, h) < 40 or x1 < 0 or y1 < 0 ):
-            				continue
-
-				for i in range(5):
-			            	size = npr.randint(12, min(width, height) / 2)
-            				delta_x = npr.randint(max(-size, -x1), w)
-            				delta_y = npr.randint(max(-size, -y1), h)
-            				nx1 = int(max(0, x1 + delta_x))
-            				ny1 = int(max(0, y1 + delta_y))
-            				if nx1 + size > width or ny1 + size > height:
-                				continue
-            				crop_box = np.array([nx1, ny1, nx1 + size, ny1 + size])
-            				current_IoU = IoU(crop_box, bounding_boxes)
-    
-            				cropped_image = current_image[ny1: ny1 + size, nx1: nx1 + size, :]
-            				resized_image = cv2.resize(cropped_image, (minimum_face, minimum_face), interpolation=cv2.INTER_LINEAR)
-    
-            				if( np.max(current_IoU) < SimpleFaceDataset.negative_IoU() ):
-                				file_path = os.path.join(negative_dir, "%s.jpg" % negative_images)
-                				negative_file.write(file_path + ' 0\n')
-                				cv2.imwrite(file_path, resized_image)
-                				negative_images += 1 
-
-				for i in range(20):
-            				size = npr.randint(int(min(w, h) * 0.8), np.ceil(1.25 * max(w, h)))
-
-            				delta_x = npr.randint(-w * 0.2, w * 0.2)
-            				delta_y = npr.randint(-h * 0.2, h * 0.2)
-
-            				nx1 = int(max(x1 + w / 2 + delta_x - size / 2, 0))
-            				ny1 = int(max(y1 + h / 2 + delta_y - size / 2, 0))
-            				nx2 = nx1 + size
-            				ny2 = ny1 + size
-
-            				if nx2 > width or ny2 > height:
-                				continue 
-            				crop_box = np.array([nx1, ny1, nx2, ny2])
-            				offset_x1 = (x1 - nx1) / float(size)
-					offset_y1 = (y1 - ny1) / float(size)
-            				offset_x2 = (x2 - nx2) / float(size)
-            				offset_y2 = (y2 - ny2) / float(size)
-
-            				cropped_image = current_image[ny1 : ny2, nx1 : nx2, :]
-            				resized_image = cv2.resize(cropped_image, (minimum_face, minimum_face), interpolation=cv2.INTER_LINEAR)
-
-            				box_ = bounding_box.reshape(1, -1)
-            				if( IoU(crop_box, box_) >= SimpleFaceDataset.positive_IoU() ):
-                				file_path = os.path.join(positive_dir, "%s.jpg"%positive_images)
-                				positive_file.write(file_path + ' 1 %.2f %.2f %.2f %.2f\n'%(offset_x1, offset_y1, offset_x2, offset_y2))
-                				cv2.imwrite(file_path, resized_image)
-                				positive_images += 1
-            				elif( IoU(crop_box, box_) >= SimpleFaceDataset.part_IoU() ):
-                				file_path = os.path.join(part_dir, "%s.jpg"%part_images)
-                				part_file.write(file_path + ' -1 %.2f %.2f %.2f %.2f\n'%(offset_x1, offset_y1, offset_x2, offset_y2))
-                				cv2.imwrite(file_path, resized_image)
-                				part_images += 1
-
-				annotation_number += 1        
-				if(annotation_number % 1000 == 0 ):
-					print('%s number of images are done - positive - %s,  part - %s, negative - %s' % (annotation_number, positive_images, part_images, negative_images))
-
-		negative_file.close()
-		part_file.close()
-		positive_file.close()
+		sample_dirs = []
+		for _, target_root_dir in sample_targets:
+			if(SampleWriter.writes_images(sample_format)):
+				sample_dirs += [ os.path.join(target_root_dir, sample_type) for sample_type in _sample_types ] + [ _shard_dir(target_root_dir) ]
+			if(SampleWriter.writes_records(sample_format)):
+				tensorflow_dir = TensorFlowDataset.tensorflow_dir(target_root_dir)
+				sample_dirs.append(tensorflow_dir)
+				for sample_type in _sample_types:
+					TensorFlowDataset.remove_tensorflow_files(TensorFlowDataset.tensorflow_file_name(tensorflow_dir, sample_type))
+			if(SampleWriter.writes_memmap(sample_format)):
+				memmap_dir = MemmapDataset.memmap_dir(target_root_dir)
+				sample_dirs.append(memmap_dir)
+				for sample_type in _sample_types:
+					MemmapDataset.remove_memmap_files(MemmapDataset.memmap_file_name(memmap_dir, sample_type))
+		for sample_dir in sample_dirs:
+			if(not os.path.exists(sample_dir)):
+				os.makedirs(sample_dir)
+
+		# Contiguous shards merged in order give the same files for any number of workers.
+		number_of_shards = min(len(image_file_names), max(1, number_of_workers) * 4)
+		shards = []
+		for shard_index, image_indices in enumerate(np.array_split(np.arange(len(image_file_names)), number_of_shards)):
+			shard_images = [ (image_index, image_file_names[image_index], ground_truth_boxes[image_index]) for image_index in image_indices ]
+			shards.append((shard_index, shard_images, sample_targets, seed, sample_format))
+
+		if( number_of_workers > 1 ):
+			pool = multiprocessing.Pool(number_of_workers)
+			shard_results = pool.imap(_generate_shard, shards)
+		else:
+			pool = None
+			shard_results = ( _generate_shard(shard) for shard in shards )
+
+		sample_counts = dict( (sample_type, 0) for sample_type in _sample_types )
+		tensorflow_shards = [ dict( (sample_type, []) for sample_type in _sample_types ) for _ in sample_targets ]
+		number_of_images = 0
+		number_of_skipped_images = 0
+		for shard_index, (shard_counts, shard_skipped_images, shard_tensorflow_shards) in enumerate(shard_results):
+			number_of_skipped_images += shard_skipped_images
+			for sample_type in _sample_types:
+				sample_counts[sample_type] += shard_counts[sample_type]
+				for target_index in range(len(sample_targets)):
+					tensorflow_shards[target_index][sample_type].append(shard_tensorflow_shards[target_index][sample_type])
+			number_of_images += len(shards[shard_index][1])
+			print('%s number of images are done - positive - %s,  part - %s, negative - %s' % (number_of_images, sample_counts['positive'], sample_counts['part'], sample_counts['negative']))
+
+		if( pool is not None ):
+			pool.close()
+			pool.join()
+		if( number_of_skipped_images > 0 ):
+			print('%s images could not be decoded and were skipped.' % number_of_skipped_images)
+
+		for target_index, (_, target_root_dir) in enumerate(sample_targets):
+			if(SampleWriter.writes_records(sample_format)):
+				tensorflow_dir = TensorFlowDataset.tensorflow_dir(target_root_dir)
+				for sample_type in _sample_types:
+					TensorFlowDataset.write_index(TensorFlowDataset.tensorflow_file_name(tensorflow_dir, sample_type), tensorflow_shards[target_index][sample_type])
+
+			if(not SampleWriter.writes_images(sample_format)):
+				continue
+
+			for sample_type in _sample_types:
+				sample_file = open(os.path.join(target_root_dir, sample_type + '.txt'), 'w')
+				for shard_index in range(number_of_shards):
+					shard_file_name = _shard_file_name(target_root_dir, sample_type, shard_index)
+					shard_file = open(shard_file_name, 'r')
+					sample_file.write(shard_file.read())
+					shard_file.close()
+					os.remove(shard_file_name)
+				sample_file.close()
+			os.rmdir(_shard_dir(target_root_dir))
 
 		return(True)
 
+_sample_types = ['positive', 'part', 'negative']
+
+_negative_batch_size = 64
+_maximum_negative_batches = 100
+
+def _shard_dir(target_root_dir):
+	return(os.path.join(target_root_dir, 'shards'))
+
+def _shard_file_name(target_root_dir, sample_type, shard_index):
+	return(os.path.join(_shard_dir(target_root_dir), '%s-%05d.txt' % (sample_type, shard_index)))
+
+def _random_integers(random_state, low, high):
+	# Uniform integers in [low, high) with per-element bounds, truncated like randint does for scalars.
+	low, high = np.broadcast_arrays(np.trunc(low), np.trunc(high))
+	return( (low + np.floor(random_state.random_sample(low.shape) * (high - low))).astype(np.int64) )
+
+def _generate_image_samples(image_index, image_file_path, ground_truth_box, random_state, sample_writers):
+	bounding_boxes = np.array(ground_truth_box, dtype=np.float32).reshape(-1, 4)
+	sample_counts = dict( (sample_type, 0) for sample_type in _sample_types )
+
+	# None for images whose header was read but which cannot be decoded.
+	current_image = cv2.imread(image_file_path)
+	if(current_image is None):
+		return(None)
+	height, width, channel = current_image.shape
+
+	# Candidate crops are labelled in batches and only the accepted ones are cropped and resized, once per image size.
+	def write_samples(sample_type, label, crop_boxes, offsets=None):
+		for sample_index, (nx1, ny1, nx2, ny2) in enumerate(crop_boxes):
+			cropped_image = current_image[ny1 : ny2, nx1 : nx2, :]
+			roi = None if offsets is None else offsets[sample_index]
+			for image_size, image_sample_writers in sample_writers:
+				resized_image = cv2.resize(cropped_image, (image_size, image_size), interpolation=cv2.INTER_LINEAR)
+				image_sample_writers[sample_type].write(resized_image, label, roi, None, '%d_%d.jpg' % (image_index, sample_counts[sample_type]))
+			sample_counts[sample_type] += 1
+
+	maximum_size = min(width, height) / 2
+	number_of_negatives = 0
+	for _ in range(_maximum_negative_batches):
+		if( (number_of_negatives >= 50) or (maximum_size <= 12) ):
+			break
+		size = _random_integers(random_state, 12, np.full(_negative_batch_size, maximum_size))
+		nx = _random_integers(random_state, 0, width - size)
+		ny = _random_integers(random_state, 0, height - size)
+		crop_boxes = np.stack([nx, ny, nx + size, ny + size], axis=1)
+
+		is_negative = IoU_matrix(crop_boxes, bounding_boxes).max(axis=1, initial=0.0) < SimpleFaceDataset.negative_IoU()
+		crop_boxes = crop_boxes[is_negative][:50 - number_of_negatives]
+		write_samples('negative', 0, crop_boxes)
+		number_of_negatives += len(crop_boxes)
+
+	x1, y1, x2, y2 = bounding_boxes.T
+	w = x2 - x1 + 1
+	h = y2 - y1 + 1
+	face_indices = np.flatnonzero( (np.maximum(w, h) >= 40) & (x1 >= 0) & (y1 >= 0) )
+	if( (face_indices.size == 0) or (maximum_size <= 12) ):
+		return(sample_counts)
+
+	# Negatives around each face.
+	indices = np.repeat(face_indices, 5)
+	size = _random_integers(random_state, 12, np.full(indices.size, maximum_size))
+	delta_x = _random_integers(random_state, np.maximum(-size, -x1[indices]), w[indices])
+	delta_y = _random_integers(random_state, np.maximum(-size, -y1[indices]), h[indices])
+	nx1 = np.maximum(0, x1[indices] + delta_x).astype(np.int64)
+	ny1 = np.maximum(0, y1[indices] + delta_y).astype(np.int64)
+	crop_boxes = np.stack([nx1, ny1, nx1 + size, ny1 + size], axis=1)
+	crop_boxes = crop_boxes[ (crop_boxes[:, 2] <= width) & (crop_boxes[:, 3] <= height) ]
+
+	is_negative = IoU_matrix(crop_boxes, bounding_boxes).max(axis=1, initial=0.0) < SimpleFaceDataset.negative_IoU()
+	write_samples('negative', 0, crop_boxes[is_negative])
+
+	# Positive and part crops are labelled by their IoU with the face they were drawn around.
+	indices = np.repeat(face_indices, 20)
+	size = _random_integers(random_state, np.minimum(w[indices], h[indices]) * 0.8, np.ceil(1.25 * np.maximum(w[indices], h[indices])))
+	delta_x = _random_integers(random_state, -w[indices] * 0.2, w[indices] * 0.2)
+	delta_y = _random_integers(random_state, -h[indices] * 0.2, h[indices] * 0.2)
+	nx1 = np.maximum(x1[indices] + w[indices] / 2 + delta_x - size / 2, 0).astype(np.int64)
+	ny1 = np.maximum(y1[indices] + h[indices] / 2 + delta_y - size / 2, 0).astype(np.int64)
+	crop_boxes = np.stack([nx1, ny1, nx1 + size, ny1 + size], axis=1)
+
+	is_inside = (crop_boxes[:, 2] <= width) & (crop_boxes[:, 3] <= height)
+	crop_boxes, indices, size = crop_boxes[is_inside], indices[is_inside], size[is_inside]
+
+	current_IoU = IoU_matrix(crop_boxes, bounding_boxes)[np.arange(indices.size), indices]
+	offsets = (bounding_boxes[indices] - crop_boxes) / size[:, np.newaxis].astype(np.float64)
+
+	is_positive = current_IoU >= SimpleFaceDataset.positive_IoU()
+	is_part = (current_IoU >= SimpleFaceDataset.part_IoU()) & (~is_positive)
+	write_samples('positive', 1, crop_boxes[is_positive], offsets[is_positive])
+	write_samples('part', -1, crop_boxes[is_part], offsets[is_part])
+
+	return(sample_counts)
+
+def _generate_shard(shard):
+	shard_index, shard_images, sample_targets, seed, sample_format = shard
+
+	sample_writers = []
+	for image_size, target_root_dir in sample_targets:
+		image_sample_writers = dict()
+		for sample_type in _sample_types:
+			image_dir, list_file_name, tensorflow_file_name, memmap_file_name = None, None, None, None
+			if(SampleWriter.writes_images(sample_format)):
+				image_dir = os.path.join(target_root_dir, sample_type)
+				list_file_name = _shard_file_name(target_root_dir, sample_type, shard_index)
+			if(SampleWriter.writes_records(sample_format)):
+				tensorflow_file_name = TensorFlowDataset.tensorflow_shard_file_name(TensorFlowDataset.tensorflow_dir(target_root_dir), sample_type, shard_index)
+			if(SampleWriter.writes_memmap(sample_format)):
+				memmap_file_name = MemmapDataset.memmap_shard_file_name(MemmapDataset.memmap_dir(target_root_dir), sample_type, shard_index)
+			image_sample_writers[sample_type] = SampleWriter(image_dir, list_file_name, tensorflow_file_name, memmap_file_name)
+		sample_writers.append((image_size, image_sample_writers))
+	sample_counts = dict( (sample_type, 0) for sample_type in _sample_types )
+	number_of_skipped_images = 0
+	for image_index, image_file_path, ground_truth_box in shard_images:
+		# Seeded by the image index, so the samples do not depend on the shard layout.
+		random_state = np.random.RandomState([seed, image_index])
+		image_counts = _generate_image_samples(image_index, image_file_path, ground_truth_box, random_state, sample_writers)
+		if(image_counts is None):
+			number_of_skipped_images += 1
+			continue
+		for sample_type in _sample_types:
+			sample_counts[sample_type] += image_counts[sample_type]
+
+	tensorflow_shards = [ dict( (sample_type, sample_writer.close()) for sample_type, sample_writer in image_sample_writers.items() ) for _, image_sample_writers in sample_writers ]
+	return(sample_counts, number_of_skipped_images, tensorflow_shards)
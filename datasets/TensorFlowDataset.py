@@ -26,10 +26,17 @@ from __future__ import print_function
 
 import os
 import sys
+import glob
+import json
+import struct
 import random
+import multiprocessing
 import cv2
+import numpy as np
 import tensorflow as tf
 
+from datasets.TensorFlowRecordWriter import TensorFlowRecordWriter
+
 def _int64_feature(value):
     if not isinstance(value, list):
         value = [value]
@@ -47,14 +54,7 @@ def _bytes_feature(value):
         value = [value]
     return tf.train.Feature(bytes_list=tf.train.BytesList(value=value))
 
-def _convert_to_example_simple(image_example, image_buffer):
-    class_label = image_example['label']
-    bbox = image_example['bbox']
-    roi = [bbox['xmin'],bbox['ymin'],bbox['xmax'],bbox['ymax']]
-    landmark = [bbox['xlefteye'],bbox['ylefteye'],bbox['xrighteye'],bbox['yrighteye'],bbox['xnose'],bbox['ynose'],
-                bbox['xleftmouth'],bbox['yleftmouth'],bbox['xrightmouth'],bbox['yrightmouth']]
-                
-      
+def _convert_to_example(image_buffer, class_label, roi, landmark):
     example = tf.train.Example(features=tf.train.Features(feature={
         'image/encoded': _bytes_feature(image_buffer),
         'image/label': _int64_feature(class_label),
@@ -63,6 +63,14 @@ def _convert_to_example_simple(image_example, image_buffer):
     }))
     return example
 
+def _convert_to_example_simple(image_example, image_buffer):
+    class_label = image_example['label']
+    bbox = image_example['bbox']
+    roi = [bbox['xmin'],bbox['ymin'],bbox['xmax'],bbox['ymax']]
+    landmark = [bbox['xlefteye'],bbox['ylefteye'],bbox['xrighteye'],bbox['yrighteye'],bbox['xnose'],bbox['ynose'],
+                bbox['xleftmouth'],bbox['yleftmouth'],bbox['xrightmouth'],bbox['yrightmouth']]
+    return _convert_to_example(image_buffer, class_label, roi, landmark)
+
 def _process_image_withoutcoder(filename):
     image = cv2.imread(filename)
     image_data = image.tostring()
@@ -72,8 +80,45 @@ def _process_image_withoutcoder(filename):
     assert image.shape[2] == 3
     return image_data, height, width
 
+def _encode_image(image, image_encoding):
+    if image_encoding == 'raw':
+        return image.tostring()
+    return cv2.imencode('.' + image_encoding, image)[1].tostring()
+
+def _decode_image(image_buffer, image_encoding):
+    image_data = np.frombuffer(image_buffer, dtype=np.uint8)
+    if image_encoding == 'raw':
+        image_size = int(round(np.sqrt(image_data.size / 3)))
+        return image_data.reshape(image_size, image_size, 3)
+    return cv2.imdecode(image_data, cv2.IMREAD_COLOR)
+
+def _add_to_tfrecord(filename, image_example, tfrecord_writer, image_encoding='raw'):
+    if image_encoding == 'raw':
+        image_data, height, width = _process_image_withoutcoder(filename)
+    elif image_encoding == 'jpeg' and os.path.splitext(filename)[1].lower() in ['.jpg', '.jpeg']:
+        # JPEG samples are stored as they are, without decoding and encoding them again.
+        with open(filename, 'rb') as image_file:
+            image_data = image_file.read()
+    else:
+        image_data = _encode_image(cv2.imread(filename), image_encoding)
+    example = _convert_to_example_simple(image_example, image_data)
+    tfrecord_writer.write(example.SerializeToString(), image_example['label'])
+
+def _record_label(record):
+    return tf.train.Example.FromString(record).features.feature['image/label'].int64_list.value[0]
+
+def _generate_shard(shard):
+    tensorflow_file_name, image_examples, image_encoding, compression_type = shard
+    tfrecord_writer = TensorFlowRecordWriter(tensorflow_file_name, compression_type)
+    for image_example in image_examples:
+        _add_to_tfrecord(image_example['filename'], image_example, tfrecord_writer, image_encoding)
+    return tfrecord_writer.close()
+
 class TensorFlowDataset(object):
 
+	__image_encodings = ['raw', 'jpeg', 'png']
+	__chunk_size = 4096
+
 	def __init__(self):
 		self._is_valid = False
 		self._dataset = []
@@ -90,6 +135,181 @@ class TensorFlowDataset(object):
 		file_name = os.path.join(target_dir, target_name)
 		return(file_name)
 
+	@classmethod
+	def image_encodings(cls):
+		return(TensorFlowDataset.__image_encodings)
+
+	@classmethod
+	def compression_types(cls):
+		return(TensorFlowRecordWriter.compression_types())
+
+	@classmethod
+	def tensorflow_dir(cls, target_root_dir):
+		return(os.path.join(target_root_dir, 'tensorflow'))
+
+	@classmethod
+	def tensorflow_shard_file_name(cls, target_dir, target_name, shard_index):
+		return(TensorFlowDataset.tensorflow_file_name(target_dir, target_name) + '-%05d' % shard_index)
+
+	@classmethod
+	def tensorflow_output_file_names(cls, target_dir, target_name, number_of_shards):
+		if(number_of_shards > 1):
+			return([ TensorFlowDataset.tensorflow_shard_file_name(target_dir, target_name, shard_index) for shard_index in range(number_of_shards) ])
+		return([ TensorFlowDataset.tensorflow_file_name(target_dir, target_name) ])
+
+	@classmethod
+	def index_file_name(cls, tensorflow_file_name):
+		return(tensorflow_file_name + '.json')
+
+	@classmethod
+	def record_index_file_name(cls, tensorflow_file_name):
+		return(tensorflow_file_name + '.npy')
+
+	@classmethod
+	def tensorflow_file_names(cls, tensorflow_file_name):
+		# A dataset is either a single file or the shards written next to its name.
+		if(os.path.isfile(tensorflow_file_name)):
+			return([tensorflow_file_name])
+		return(sorted(glob.glob(tensorflow_file_name + '-[0-9]*')))
+
+	@classmethod
+	def remove_tensorflow_files(cls, tensorflow_file_name):
+		for file_name in TensorFlowDataset.tensorflow_file_names(tensorflow_file_name):
+			os.remove(file_name)
+		for file_name in [ TensorFlowDataset.index_file_name(tensorflow_file_name), TensorFlowDataset.record_index_file_name(tensorflow_file_name) ]:
+			if(os.path.isfile(file_name)):
+				os.remove(file_name)
+
+	@classmethod
+	def write_index(cls, tensorflow_file_name, shards, image_encoding='raw', compression_type='none'):
+		# The sidecar index keeps the record counts and label histograms, and the shard, byte offset and label of every record.
+		def histogram(labels):
+			labels, counts = np.unique(np.array(labels, dtype=np.int64), return_counts=True)
+			return(dict( (str(label), int(count)) for label, count in zip(labels, counts) ))
+
+		records = [ np.zeros((0, 3), dtype=np.int64) ]
+		for shard_index, shard in enumerate(shards):
+			records.append(np.stack([ np.full(len(shard['offsets']), shard_index, dtype=np.int64), np.array(shard['offsets'], dtype=np.int64), np.array(shard['labels'], dtype=np.int64) ], axis=1))
+		records = np.concatenate(records, axis=0)
+
+		index = {
+			'image_encoding': image_encoding,
+			'compression_type': compression_type,
+			'number_of_records': len(records),
+			'labels': histogram(records[:, 2]),
+			'shards': [ { 'file_name': shard['file_name'], 'size': shard['size'], 'number_of_records': len(shard['offsets']), 'labels': histogram(shard['labels']) } for shard in shards ]
+			}
+		with open(TensorFlowDataset.index_file_name(tensorflow_file_name), 'w') as index_file:
+			json.dump(index, index_file, indent=1, sort_keys=True)
+		np.save(TensorFlowDataset.record_index_file_name(tensorflow_file_name), records)
+
+	@classmethod
+	def read_index(cls, tensorflow_file_name):
+		index_file_name = TensorFlowDataset.index_file_name(tensorflow_file_name)
+		if(not os.path.isfile(index_file_name)):
+			return(None)
+		with open(index_file_name, 'r') as index_file:
+			index = json.load(index_file)
+
+		# An index that does not describe the files on disk is ignored.
+		file_names = TensorFlowDataset.tensorflow_file_names(tensorflow_file_name)
+		if(not ([ os.path.basename(file_name) for file_name in file_names ] == [ shard['file_name'] for shard in index['shards'] ])):
+			return(None)
+		if(not ([ os.path.getsize(file_name) for file_name in file_names ] == [ shard['size'] for shard in index['shards'] ])):
+			return(None)
+		return(index)
+
+	@classmethod
+	def read_record_index(cls, tensorflow_file_name):
+		if(TensorFlowDataset.read_index(tensorflow_file_name) is None):
+			return(None)
+		return(np.load(TensorFlowDataset.record_index_file_name(tensorflow_file_name)))
+
+	@classmethod
+	def dataset_options(cls, tensorflow_file_name):
+		# Files without an index are raw and uncompressed, as written before the options existed.
+		index = TensorFlowDataset.read_index(tensorflow_file_name)
+		if(index is None):
+			return( 'raw', 'none' )
+		return( index.get('image_encoding', 'raw'), index.get('compression_type', 'none') )
+
+	@classmethod
+	def number_of_records(cls, tensorflow_file_name):
+		index = TensorFlowDataset.read_index(tensorflow_file_name)
+		if(index is not None):
+			return(index['number_of_records'])
+		return(sum(1 for file_name in TensorFlowDataset.tensorflow_file_names(tensorflow_file_name) for _ in tf.python_io.tf_record_iterator(file_name)))
+
+	@classmethod
+	def label_histogram(cls, tensorflow_file_name):
+		index = TensorFlowDataset.read_index(tensorflow_file_name)
+		if(index is None):
+			return(None)
+		return(dict( (int(label), count) for label, count in index['labels'].items() ))
+
+	@classmethod
+	def read_records(cls, tensorflow_file_name, record_indices=None, record_index=None):
+		# Yields the record index and the serialized record, seeking to the selected records when the index is available.
+		file_names = TensorFlowDataset.tensorflow_file_names(tensorflow_file_name)
+		image_encoding, compression_type = TensorFlowDataset.dataset_options(tensorflow_file_name)
+		if( (record_index is None) and (record_indices is not None) ):
+			record_index = TensorFlowDataset.read_record_index(tensorflow_file_name)
+
+		# Offsets only address uncompressed files, compressed ones are read through.
+		if( (record_index is None) or not (compression_type == 'none') ):
+			selected = None if record_indices is None else set(record_indices)
+			current_index = 0
+			for file_name in file_names:
+				for record in tf.python_io.tf_record_iterator(file_name, options=TensorFlowRecordWriter.record_options(compression_type)):
+					if( (selected is None) or (current_index in selected) ):
+						yield(current_index, record)
+					current_index = current_index + 1
+			return
+
+		shard_files = dict()
+		for current_index in np.unique(record_indices):
+			shard_index, offset, label = record_index[current_index]
+			if(shard_index not in shard_files):
+				shard_files[shard_index] = open(file_names[shard_index], 'rb')
+			shard_file = shard_files[shard_index]
+			shard_file.seek(offset)
+			length, = struct.unpack('<Q', shard_file.read(8))
+			shard_file.seek(4, os.SEEK_CUR)
+			yield(int(current_index), shard_file.read(length))
+		for shard_file in shard_files.values():
+			shard_file.close()
+
+	@classmethod
+	def is_seekable(cls, tensorflow_file_name):
+		# Offsets only address uncompressed files with an index.
+		return( (TensorFlowDataset.read_record_index(tensorflow_file_name) is not None) and (TensorFlowDataset.dataset_options(tensorflow_file_name)[1] == 'none') )
+
+	@classmethod
+	def _converted_records(cls, tensorflow_file_name, record_indices, record_index, image_encoding):
+		# Yields the record index, the record in the given image encoding and its label.
+		source_image_encoding, _ = TensorFlowDataset.dataset_options(tensorflow_file_name)
+		for current_index, record in TensorFlowDataset.read_records(tensorflow_file_name, record_indices, record_index):
+			label = _record_label(record) if record_index is None else record_index[current_index, 2]
+			if(not (source_image_encoding == image_encoding)):
+				image, label, roi, landmark = TensorFlowDataset.parse_sample(record, source_image_encoding)
+				record = TensorFlowDataset.serialize_sample(image, label, roi, landmark, image_encoding)
+			yield(current_index, record, label)
+
+	@classmethod
+	def serialize_sample(cls, image, label, roi=None, landmark=None, image_encoding='raw'):
+		if(roi is None):
+			roi = [0.0] * 4
+		if(landmark is None):
+			landmark = [0.0] * 10
+		example = _convert_to_example(_encode_image(image, image_encoding), int(label), [ float(value) for value in roi ], [ float(value) for value in landmark ])
+		return(example.SerializeToString())
+
+	@classmethod
+	def parse_sample(cls, record, image_encoding='raw'):
+		feature = tf.train.Example.FromString(record).features.feature
+		image = _decode_image(feature['image/encoded'].bytes_list.value[0], image_encoding)
+		return( image, feature['image/label'].int64_list.value[0], list(feature['image/roi'].float_list.value), list(feature['image/landmark'].float_list.value) )
+
 	def _read_dataset(self, input_file_name): 
    	
 		self._is_valid = False
@@ -143,15 +363,14 @@ class TensorFlowDataset(object):
 
     		return(self._is_valid)
 
-	def _add_to_tfrecord(self, filename, image_example, tfrecord_writer): 
-    		image_data, height, width = _process_image_withoutcoder(filename)
-    		example = _convert_to_example_simple(image_example, image_data)
-    		tfrecord_writer.write(example.SerializeToString())
+	def read_tensorflow_file(self, tensorflow_file_name, batch_size, image_size, image_encoding=None, compression_type=None):
+		dataset_image_encoding, dataset_compression_type = TensorFlowDataset.dataset_options(tensorflow_file_name)
+		image_encoding = image_encoding or dataset_image_encoding
+		compression_type = compression_type or dataset_compression_type
 
-	def read_tensorflow_file(self, tensorflow_file_name, batch_size, image_size):
-    		filename_queue = tf.train.string_input_producer([tensorflow_file_name], shuffle=True)
+    		filename_queue = tf.train.string_input_producer(TensorFlowDataset.tensorflow_file_names(tensorflow_file_name), shuffle=True)
 
-    		reader = tf.TFRecordReader()
+    		reader = tf.TFRecordReader(options=TensorFlowRecordWriter.record_options(compression_type))
     		_, serialized_example = reader.read(filename_queue)
     		image_features = tf.parse_single_example(
         			serialized_example,
@@ -163,7 +382,12 @@ class TensorFlowDataset(object):
         					}
     				)
 
-    		image = tf.decode_raw(image_features['image/encoded'], tf.uint8)
+		if(image_encoding == 'jpeg'):
+			image = tf.image.decode_jpeg(image_features['image/encoded'], channels=3)
+		elif(image_encoding == 'png'):
+			image = tf.image.decode_png(image_features['image/encoded'], channels=3)
+		else:
+    			image = tf.decode_raw(image_features['image/encoded'], tf.uint8)
     		image = tf.reshape(image, [image_size, image_size, 3])
     		image = (tf.cast(image, tf.float32)-127.5) / 128
     
@@ -198,26 +422,120 @@ class TensorFlowDataset(object):
 
     		return( images, labels, rois, landmarks )
 
-	def generate(self, input_file_name, target_root_dir, target_name):
-		tensorflow_dir = os.path.join(target_root_dir, 'tensorflow')
+	def generate(self, input_file_name, target_root_dir, target_name, number_of_shards=1, number_of_workers=1, image_encoding='raw', compression_type='none'):
+		tensorflow_dir = TensorFlowDataset.tensorflow_dir(target_root_dir)
 		if(not os.path.exists(tensorflow_dir)):
 			os.makedirs(tensorflow_dir)
 
     		tensorflow_filename = TensorFlowDataset.tensorflow_file_name(tensorflow_dir, target_name)
+		TensorFlowDataset.remove_tensorflow_files(tensorflow_filename)
 		if(not self._read_dataset(input_file_name)):
 			return(False)
 
+		# Contiguous slices of the shuffled samples are written to the shards in parallel.
+		shard_file_names = TensorFlowDataset.tensorflow_output_file_names(tensorflow_dir, target_name, number_of_shards)
+		shard_examples = np.array_split(np.arange(len(self._dataset)), len(shard_file_names))
+		shards = [ (shard_file_name, [ self._dataset[i] for i in example_indices ], image_encoding, compression_type) for shard_file_name, example_indices in zip(shard_file_names, shard_examples) ]
+
+		if( number_of_workers > 1 ):
+			pool = multiprocessing.Pool(number_of_workers)
+			shard_results = pool.imap(_generate_shard, shards)
+		else:
+			pool = None
+			shard_results = ( _generate_shard(shard) for shard in shards )
+
 		total_number_of_samples = len(self._dataset)
 		number_of_samples = 0
-    		with tf.python_io.TFRecordWriter(tensorflow_filename) as tfrecord_writer:
-        		for i, image_example in enumerate(self._dataset):
-            			filename = image_example['filename']
-            			self._add_to_tfrecord(filename, image_example, tfrecord_writer)
-				number_of_samples = number_of_samples + 1
-				if( number_of_samples % 10000 == 0):
-					print('Processed ( %s / %s ) image samples.' % ( number_of_samples, total_number_of_samples ) )
+		tensorflow_shards = []
+		for tensorflow_shard in shard_results:
+			tensorflow_shards.append(tensorflow_shard)
+			number_of_samples = number_of_samples + len(tensorflow_shard['offsets'])
+			print('Processed ( %s / %s ) image samples.' % ( number_of_samples, total_number_of_samples ) )
 
+		if( pool is not None ):
+			pool.close()
+			pool.join()
+
+		TensorFlowDataset.write_index(tensorflow_filename, tensorflow_shards, image_encoding, compression_type)
 		return(True)
 
+	def generate_from_tensorflow_files(self, tensorflow_sources, target_root_dir, target_name, number_of_shards=1, image_encoding='raw', compression_type='none', shuffle=True):
+		# Each source is a TensorFlow file name with the indices of the records to copy, or None for every record.
+		source_file_names = []
+		source_indices = []
+		record_indices = []
+		for tensorflow_file_name, indices in tensorflow_sources:
+			if( not TensorFlowDataset.tensorflow_file_names(tensorflow_file_name) ):
+				continue
+			if( indices is None ):
+				indices = np.arange(TensorFlowDataset.number_of_records(tensorflow_file_name))
+			source_file_names.append(tensorflow_file_name)
+			source_indices.append(np.full(len(indices), len(source_file_names) - 1, dtype=np.int64))
+			record_indices.append(np.asarray(indices, dtype=np.int64))
+
+		if( not len(source_file_names) ):
+			return(False)
+		source_indices = np.concatenate(source_indices)
+		record_indices = np.concatenate(record_indices)
+		if( not len(record_indices) ):
+			return(False)
 
+		tensorflow_dir = TensorFlowDataset.tensorflow_dir(target_root_dir)
+		if(not os.path.exists(tensorflow_dir)):
+			os.makedirs(tensorflow_dir)
+		tensorflow_filename = TensorFlowDataset.tensorflow_file_name(tensorflow_dir, target_name)
+		TensorFlowDataset.remove_tensorflow_files(tensorflow_filename)
+
+		shard_file_names = TensorFlowDataset.tensorflow_output_file_names(tensorflow_dir, target_name, number_of_shards)
+		shard_ends = np.cumsum([ len(positions) for positions in np.array_split(record_indices, len(shard_file_names)) ])
+		tfrecord_writers = [ TensorFlowRecordWriter(shard_file_name, compression_type) for shard_file_name in shard_file_names ]
+
+		if( not shuffle ):
+			# Records are copied in source order, with a single pass over every source.
+			position = 0
+			for source_index, tensorflow_file_name in enumerate(source_file_names):
+				selected_records = record_indices[source_indices == source_index]
+				record_counts = np.bincount(selected_records)
+				for current_index, record, label in TensorFlowDataset._converted_records(tensorflow_file_name, np.unique(selected_records), TensorFlowDataset.read_record_index(tensorflow_file_name), image_encoding):
+					for _ in range(record_counts[current_index]):
+						tfrecord_writers[np.searchsorted(shard_ends, position, side='right')].write(record, label)
+						position = position + 1
+		else:
+			# Sources that can not be seeked are copied once to an uncompressed staging file, so every source is read through its offsets.
+			staging_file_names = []
+			for source_index, tensorflow_file_name in enumerate(source_file_names):
+				if( TensorFlowDataset.is_seekable(tensorflow_file_name) ):
+					continue
+				positions = np.flatnonzero(source_indices == source_index)
+				selected_records, record_indices[positions] = np.unique(record_indices[positions], return_inverse=True)
+				staging_file_name = TensorFlowDataset.tensorflow_file_name(tensorflow_dir, '%s_staging%d' % (target_name, source_index))
+				TensorFlowDataset.remove_tensorflow_files(staging_file_name)
+				staging_writer = TensorFlowRecordWriter(staging_file_name)
+				for _, record, label in TensorFlowDataset._converted_records(tensorflow_file_name, selected_records, TensorFlowDataset.read_record_index(tensorflow_file_name), image_encoding):
+					staging_writer.write(record, label)
+				TensorFlowDataset.write_index(staging_file_name, [ staging_writer.close() ], image_encoding)
+				source_file_names[source_index] = staging_file_name
+				staging_file_names.append(staging_file_name)
+			source_record_indices = [ TensorFlowDataset.read_record_index(tensorflow_file_name) for tensorflow_file_name in source_file_names ]
+
+			# Only the (source, record) pairs are shuffled, the records are read a chunk at a time.
+			permutation = np.random.permutation(len(record_indices))
+			for start in range(0, len(permutation), TensorFlowDataset.__chunk_size):
+				chunk = permutation[start : start + TensorFlowDataset.__chunk_size]
+				chunk_sources, chunk_records = source_indices[chunk], record_indices[chunk]
+				records = dict()
+				for source_index, tensorflow_file_name in enumerate(source_file_names):
+					positions = np.flatnonzero(chunk_sources == source_index)
+					if( len(positions) ):
+						for current_index, record, label in TensorFlowDataset._converted_records(tensorflow_file_name, np.unique(chunk_records[positions]), source_record_indices[source_index], image_encoding):
+							records[(source_index, current_index)] = (record, label)
+				for position, (source_index, current_index) in enumerate(zip(chunk_sources, chunk_records)):
+					tfrecord_writers[np.searchsorted(shard_ends, start + position, side='right')].write(*records[(source_index, current_index)])
+
+			for staging_file_name in staging_file_names:
+				TensorFlowDataset.remove_tensorflow_files(staging_file_name)
+
+		tensorflow_shards = [ tfrecord_writer.close() for tfrecord_writer in tfrecord_writers ]
+		TensorFlowDataset.write_index(tensorflow_filename, tensorflow_shards, image_encoding, compression_type)
+		return(True)
 
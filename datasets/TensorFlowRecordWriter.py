@@ -0,0 +1,77 @@
+# MIT License
+# 
+# Copyright (c) 2018
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import tensorflow as tf
+
+class TensorFlowRecordWriter(object):
+
+	# Each record is framed by an 8 byte length, and 4 byte CRCs of the length and of the data.
+	__record_overhead = 16
+
+	__compression_types = {
+		'none': tf.python_io.TFRecordCompressionType.NONE,
+		'zlib': tf.python_io.TFRecordCompressionType.ZLIB,
+		'gzip': tf.python_io.TFRecordCompressionType.GZIP
+		}
+
+	def __init__(self, file_name, compression_type='none'):
+		self._file_name = file_name
+		self._writer = tf.python_io.TFRecordWriter(file_name, options=TensorFlowRecordWriter.record_options(compression_type))
+		self._offsets = []
+		self._labels = []
+		self._size = 0
+
+	@classmethod
+	def compression_types(cls):
+		return(sorted(TensorFlowRecordWriter.__compression_types.keys()))
+
+	@classmethod
+	def record_options(cls, compression_type):
+		return(tf.python_io.TFRecordOptions(TensorFlowRecordWriter.__compression_types[compression_type]))
+
+	def file_name(self):
+		return(self._file_name)
+
+	def number_of_records(self):
+		return(len(self._offsets))
+
+	def write(self, record, label):
+		self._writer.write(record)
+		self._offsets.append(self._size)
+		self._labels.append(int(label))
+		self._size += len(record) + TensorFlowRecordWriter.__record_overhead
+
+	def close(self):
+		if( self._writer is not None ):
+			self._writer.close()
+			self._writer = None
+		return(self.shard())
+
+	def shard(self):
+		# Offsets are positions in the uncompressed stream, the size is the one on disk.
+		size = os.path.getsize(self._file_name) if self._writer is None else self._size
+		return({ 'file_name': os.path.basename(self._file_name), 'size': size, 'offsets': self._offsets, 'labels': self._labels })
@@ -0,0 +1,244 @@
+# MIT License
+# 
+# Copyright (c) 2018
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+r"""Detects faces in a video file.
+
+Frames are decoded in a separate process into shared memory and detection worker
+processes run the batched cascade over micro-batches of frames. Model weights are
+loaded once and shared with the forked workers. Detections of all frames are
+written to a columnar NumPy archive.
+
+Usage:
+```shell
+
+$ python detect_video.py \
+	--video_file_name=./data/videos/input.mp4 \
+	--output_file_name=./data/videos/input.npz
+
+$ python detect_video.py \
+	--video_file_name=./data/videos/input.mp4 \
+	--output_file_name=./data/videos/input.npz \
+	--number_of_workers=4 \
+	--batch_size=8 \
+	--frame_stride=3 \
+	--detection_resolution=1280 \
+	--data_format=auto
+
+$ python detect_video.py \
+	--video_file_name=./data/videos/input.mp4 \
+	--output_file_name=./data/videos/input.npz \
+	--number_of_workers=16 \
+	--cores_per_worker=4 \
+	--auto_configure_threads
+
+$ python detect_video.py \
+	--video_file_name=./data/videos/input.mp4 \
+	--output_file_name=./data/videos/input.npz \
+	--model_root_dir=./models/mtcnn/deploy/mtcnn.weights
+```
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+
+import cv2
+import numpy as np
+
+from nets.FaceDetector import FaceDetector
+from nets.FaceDetectorSupervisor import FaceDetectorSupervisor
+from nets.NetworkFactory import NetworkFactory
+from utils.FrameRingBuffer import FrameRingBuffer
+from utils.IoU import IoU
+
+def decode_frames(video_file_name, ring_buffer, number_of_frames, frame_stride, number_of_workers):
+	video = cv2.VideoCapture(video_file_name)
+	frame_index = 0
+	while True:
+		if( frame_index % frame_stride ):
+			if( not video.grab() ):
+				break
+			frame_index = frame_index + 1
+			continue
+
+		status, frame = video.read()
+		if( not status ):
+			break
+
+		ring_buffer.put(frame, frame_index)
+		frame_index = frame_index + 1
+
+	video.release()
+	number_of_frames.value = frame_index
+	ring_buffer.close(number_of_workers)
+
+def interpolate_detections(detections, number_of_frames, minimum_IoU=0.3):
+	key_frames = sorted(detections.keys())
+	interpolated = dict()
+	for frame_index in key_frames:
+		boxes_c, landmarks = detections[frame_index]
+		interpolated[frame_index] = (boxes_c, landmarks, False)
+
+	for current_frame, next_frame in zip(key_frames[:-1], key_frames[1:]):
+		current_boxes, current_landmarks = detections[current_frame]
+		next_boxes, next_landmarks = detections[next_frame]
+
+		# Greedily match the faces of both key frames by IoU.
+		matches = []
+		is_matched = np.zeros(next_boxes.shape[0], dtype=bool)
+		for index in np.argsort(-current_boxes[:, 4]):
+			if( next_boxes.shape[0] == 0 ):
+				break
+			current_IoU = IoU(current_boxes[index], next_boxes)
+			current_IoU[is_matched] = 0
+			match = int(np.argmax(current_IoU))
+			if( current_IoU[match] >= minimum_IoU ):
+				is_matched[match] = True
+				matches.append((index, match))
+
+		matched_current = set([ index for index, _ in matches ])
+		for frame_index in range(current_frame + 1, next_frame):
+			ratio = (frame_index - current_frame) / float(next_frame - current_frame)
+			boxes_c = [ (1 - ratio) * current_boxes[i] + ratio * next_boxes[j] for i, j in matches ]
+			landmarks = [ (1 - ratio) * current_landmarks[i] + ratio * next_landmarks[j] for i, j in matches ]
+
+			# Unmatched faces are held until the midpoint between the key frames.
+			if( ratio < 0.5 ):
+				unmatched = [ i for i in range(current_boxes.shape[0]) if not (i in matched_current) ]
+				boxes_c += [ current_boxes[i] for i in unmatched ]
+				landmarks += [ current_landmarks[i] for i in unmatched ]
+			else:
+				unmatched = np.where(~is_matched)[0]
+				boxes_c += [ next_boxes[j] for j in unmatched ]
+				landmarks += [ next_landmarks[j] for j in unmatched ]
+
+			interpolated[frame_index] = (np.array(boxes_c).reshape(-1, 5), np.array(landmarks).reshape(-1, 10), True)
+
+	if( len(key_frames) ):
+		boxes_c, landmarks = detections[key_frames[-1]]
+		for frame_index in range(key_frames[-1] + 1, number_of_frames):
+			interpolated[frame_index] = (boxes_c, landmarks, True)
+
+	return(interpolated)
+
+def write_detections(output_file_name, detections):
+	# Empty arrays keep the archive well formed when no frame was processed.
+	frame_indexes = [ np.zeros(0, dtype=np.int32) ]
+	boxes = [ np.zeros((0, 5)) ]
+	landmarks = [ np.zeros((0, 10)) ]
+	is_interpolated = [ np.zeros(0, dtype=bool) ]
+	for frame_index in sorted(detections.keys()):
+		boxes_c, landmark, interpolated = detections[frame_index]
+		frame_indexes.append(np.full(boxes_c.shape[0], frame_index, dtype=np.int32))
+		boxes.append(boxes_c.reshape(-1, 5))
+		landmarks.append(landmark.reshape(-1, 10))
+		is_interpolated.append(np.full(boxes_c.shape[0], interpolated, dtype=bool))
+
+	boxes = np.concatenate(boxes, axis=0).astype(np.float32)
+	np.savez_compressed(output_file_name,
+		frame_index=np.concatenate(frame_indexes),
+		x1=boxes[:, 0], y1=boxes[:, 1], x2=boxes[:, 2], y2=boxes[:, 3], score=boxes[:, 4],
+		landmarks=np.concatenate(landmarks, axis=0).astype(np.float32),
+		interpolated=np.concatenate(is_interpolated))
+
+def parse_arguments(argv):
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--video_file_name', type=str, help='Input video file.', default=None)
+	parser.add_argument('--output_file_name', type=str, help='Output NumPy archive where per-frame detections are saved.', default=None)
+	parser.add_argument('--model_root_dir', type=str, help='Input model root directory where model weights are saved, or a weight file.', default=None)
+	parser.add_argument('--network_names', type=str, help='Comma separated PNet, RNet and ONet stage network names, PNet,RNet,ONet by default.', default=None)
+	parser.add_argument('--data_format', type=str, choices=['NHWC', 'NCHW', 'auto'], help='Optimize the inference graphs with the given data layout.', default=None)
+	parser.add_argument('--thread_pools', type=str, help='Intra-op and inter-op threads as intra:inter for all networks, or for PNet, RNet and ONet e.g. 4:1,2:1,2:1.', default=None)
+	parser.add_argument('--cores_per_worker', type=int, help='Pin each detection worker to this many cores, 0 to not pin.', default=0)
+	parser.add_argument('--auto_configure_threads', action='store_true', help='Benchmark a few thread pool sizes per network on startup and keep the fastest.')
+	parser.add_argument('--number_of_workers', type=int, help='Number of detection worker processes.', default=2)
+	parser.add_argument('--batch_size', type=int, help='Maximum number of frames in a detection micro-batch.', default=4)
+	parser.add_argument('--frame_stride', type=int, help='Detect every n-th frame and interpolate the detections in between.', default=1)
+	parser.add_argument('--detection_resolution', type=int, help='Longest image side used by PNet and RNet, 0 for the native resolution.', default=0)
+	return(parser.parse_args(argv))
+
+def main(args):
+	if(not args.video_file_name):
+		raise ValueError('You must supply input video file with --video_file_name.')
+	if(not args.output_file_name):
+		raise ValueError('You must supply output file with --output_file_name.')
+	if(args.frame_stride < 1):
+		raise ValueError('The frame stride should be at least 1.')
+
+	if(args.model_root_dir):
+		model_root_dir = args.model_root_dir
+	else:
+		model_root_dir = NetworkFactory.model_deploy_dir()
+	network_names = NetworkFactory.cascade_network_names(args.network_names)
+	thread_pools = FaceDetector.parse_thread_pools(args.thread_pools) if args.thread_pools else None
+
+	video = cv2.VideoCapture(args.video_file_name)
+	if(not video.isOpened()):
+		raise ValueError('Error opening the video ' + args.video_file_name + '.')
+	width = int(video.get(cv2.CAP_PROP_FRAME_WIDTH))
+	height = int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
+	frames_per_second = video.get(cv2.CAP_PROP_FPS)
+	video.release()
+
+	number_of_slots = 2 * args.number_of_workers * args.batch_size
+	ring_buffer = FrameRingBuffer(number_of_slots, height, width)
+	number_of_frames = multiprocessing.Value('i', 0)
+
+	start_time = time.time()
+	decoder = multiprocessing.Process(target=decode_frames, args=(args.video_file_name, ring_buffer, number_of_frames, args.frame_stride, args.number_of_workers))
+	supervisor = FaceDetectorSupervisor(ring_buffer, model_root_dir, args.number_of_workers, args.batch_size, args.detection_resolution, network_names, args.data_format)
+	supervisor.set_thread_pools(thread_pools, args.cores_per_worker, args.auto_configure_threads)
+	decoder.start()
+	if( not supervisor.start() ):
+		raise ValueError('Error loading the models from ' + model_root_dir + '.')
+	supervisor.print_statistics()
+
+	detections = dict()
+	number_of_finished_workers = 0
+	while( number_of_finished_workers < args.number_of_workers ):
+		result = ring_buffer.get_result()
+		if( result is None ):
+			number_of_finished_workers = number_of_finished_workers + 1
+			continue
+		frame_index, _, boxes_c, landmarks = result
+		detections[frame_index] = (boxes_c, landmarks)
+
+	decoder.join()
+	supervisor.join()
+
+	detections = interpolate_detections(detections, number_of_frames.value)
+	write_detections(args.output_file_name, detections)
+
+	duration = time.time() - start_time
+	print('Processed %d frames in %.2f seconds - %.2f fps.' % (number_of_frames.value, duration, number_of_frames.value / duration))
+	if( frames_per_second > 0 ):
+		print('%.2fx real-time.' % (number_of_frames.value / duration / frames_per_second))
+
+if __name__ == '__main__':
+	os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3' 
+	main(parse_arguments(sys.argv[1:]))
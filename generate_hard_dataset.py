@@ -41,6 +41,17 @@ $ python generate_hard_dataset.py \
 	--annotation_file_name=./data/WIDER_Face/WIDER_train/wider_face_train_bbx_gt.txt \
 	--landmark_image_dir=./data/LFW_Landmark \
 	--landmark_file_name=./data/LFW_Landmark/trainImageList.txt \
+	--image_encoding=png \
+	--target_root_dir=./data/datasets/mtcnn 
+
+$ python generate_hard_dataset.py \
+	--network_name=ONetLite \
+	--network_names=PNetLite,RNetLite,ONet \
+	--train_root_dir=./data/models/mtcnn/train \
+	--annotation_image_dir=./data/WIDER_Face/WIDER_train/images \
+	--annotation_file_name=./data/WIDER_Face/WIDER_train/wider_face_train_bbx_gt.txt \
+	--landmark_image_dir=./data/LFW_Landmark \
+	--landmark_file_name=./data/LFW_Landmark/trainImageList.txt \
 	--target_root_dir=./data/datasets/mtcnn 
 ```
 """
@@ -54,10 +65,14 @@ import os
 import argparse
 
 from datasets.HardDataset import HardDataset
+from datasets.SampleWriter import SampleWriter
+from datasets.TensorFlowDataset import TensorFlowDataset
+from nets.NetworkFactory import NetworkFactory
 
 def parse_arguments(argv):
 	parser = argparse.ArgumentParser()
 	parser.add_argument('--network_name', type=str, help='The name of the network.', default='ONet')    
+	parser.add_argument('--network_names', type=str, help='Comma separated PNet, RNet and ONet stage network names used to detect the hard samples, PNet,RNet,ONet by default.', default=None)
 	parser.add_argument('--train_root_dir', type=str, help='Input train root directory where model weights are saved.', default=None)
 
 	parser.add_argument('--annotation_file_name', type=str, help='Input WIDER face dataset annotations file.', default=None)
@@ -66,6 +81,14 @@ def parse_arguments(argv):
 	parser.add_argument('--landmark_image_dir', type=str, help='Input landmark dataset training image directory.', default=None)
 	parser.add_argument('--landmark_file_name', type=str, help='Input landmark dataset annotation file.', default=None)
 
+	parser.add_argument('--number_of_shards', type=int, help='Number of TensorFlow files each sample type is split into.', default=1)
+	parser.add_argument('--number_of_workers', type=int, help='Number of processes indexing the annotations, generating the landmark samples and writing the TensorFlow files.', default=1)
+	parser.add_argument('--image_encoding', type=str, choices=TensorFlowDataset.image_encodings(), help='Storage of the sample images in the TensorFlow files.', default='raw')
+	parser.add_argument('--compression_type', type=str, choices=TensorFlowDataset.compression_types(), help='Record compression of the TensorFlow files.', default='none')
+	parser.add_argument('--sample_format', type=str, choices=SampleWriter.sample_formats(), help='Write samples straight into TensorFlow files (records), as JPEG images and lists converted afterwards (images), both for debugging, or into memory-mapped arrays (memmap).', default='records')
+
+	parser.add_argument('--reuse_landmark_samples', action='store_true', help='Keep the landmark samples already generated for the network stage, e.g. by generate_simple_dataset.py with --network_names.')
+
 	parser.add_argument('--target_root_dir', type=str, help='Output directory where output images and TensorFlow data files are saved.', default=None)
 	return(parser.parse_args(argv))
 
@@ -84,11 +107,12 @@ def main(args):
 	if(not args.target_root_dir):
 		raise ValueError('You must supply output directory for storing output images and TensorFlow data files with --target_root_dir.')
 	
-	if( not (args.network_name in ['RNet', 'ONet']) ):
-		raise ValueError('The network name should be either RNet or ONet.')
+	if( not (args.network_name in NetworkFactory.network_names()) or not (NetworkFactory.stage(args.network_name) in ['RNet', 'ONet']) ):
+		raise ValueError('The network name should be an RNet or ONet stage network.')
+	network_names = NetworkFactory.cascade_network_names(args.network_names)
 
 	hard_dataset = HardDataset(args.network_name)
-	status = hard_dataset.generate(args.annotation_image_dir, args.annotation_file_name, args.landmark_image_dir, args.landmark_file_name, args.train_root_dir, args.target_root_dir)
+	status = hard_dataset.generate(args.annotation_image_dir, args.annotation_file_name, args.landmark_image_dir, args.landmark_file_name, args.train_root_dir, args.target_root_dir, network_names, args.sample_format, args.number_of_shards, args.number_of_workers, args.image_encoding, args.compression_type, args.reuse_landmark_samples)
 	if(status):
 		print(args.network_name + ' network dataset is generated at ' + args.target_root_dir)
 	else:
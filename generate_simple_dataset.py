@@ -20,7 +20,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-r"""Generates a basic dataset i.e. PNet dataset.
+r"""Generates a basic dataset i.e. PNet dataset, or the basic datasets of several network stages in one pass over the source images.
 
 Usage:
 ```shell
@@ -38,6 +38,33 @@ $ python generate_simple_dataset.py \
 	--landmark_image_dir=./data/LFW_Landmark \
 	--landmark_file_name=./data/LFW_Landmark/trainImageList.txt \
 	--base_number_of_images=250000 \
+	--number_of_workers=32 \
+	--number_of_shards=32 \
+	--target_root_dir=./data/datasets/mtcnn 
+
+$ python generate_simple_dataset.py \
+	--annotation_image_dir=./data/WIDER_Face/WIDER_train/images \ 
+	--annotation_file_name=./data/WIDER_Face/WIDER_train/wider_face_train_bbx_gt.txt \
+	--landmark_image_dir=./data/LFW_Landmark \
+	--landmark_file_name=./data/LFW_Landmark/trainImageList.txt \
+	--sample_format=both \
+	--target_root_dir=./data/datasets/mtcnn 
+
+$ python generate_simple_dataset.py \
+	--annotation_image_dir=./data/WIDER_Face/WIDER_train/images \ 
+	--annotation_file_name=./data/WIDER_Face/WIDER_train/wider_face_train_bbx_gt.txt \
+	--landmark_image_dir=./data/LFW_Landmark \
+	--landmark_file_name=./data/LFW_Landmark/trainImageList.txt \
+	--compression_type=zlib \
+	--target_root_dir=./data/datasets/mtcnn 
+
+$ python generate_simple_dataset.py \
+	--network_names=PNet,RNet,ONet \
+	--annotation_image_dir=./data/WIDER_Face/WIDER_train/images \ 
+	--annotation_file_name=./data/WIDER_Face/WIDER_train/wider_face_train_bbx_gt.txt \
+	--landmark_image_dir=./data/LFW_Landmark \
+	--landmark_file_name=./data/LFW_Landmark/trainImageList.txt \
+	--number_of_workers=32 \
 	--target_root_dir=./data/datasets/mtcnn 
 ```
 """
@@ -50,9 +77,14 @@ import sys
 import argparse
 
 from datasets.SimpleDataset import SimpleDataset
+from datasets.SampleWriter import SampleWriter
+from datasets.TensorFlowDataset import TensorFlowDataset
+from nets.NetworkFactory import NetworkFactory
 
 def parse_arguments(argv):
 	parser = argparse.ArgumentParser()
+	parser.add_argument('--network_name', type=str, help='The name of the PNet stage network.', default='PNet')
+	parser.add_argument('--network_names', type=str, help='Comma separated network names whose stage datasets are generated in one pass over the source images, e.g. PNet,RNet,ONet.', default=None)
 	parser.add_argument('--annotation_image_dir', type=str, help='Input WIDER face dataset training image directory.', default=None)
 	parser.add_argument('--annotation_file_name', type=str, help='Input WIDER face dataset annotation file.', default=None)
 
@@ -61,6 +93,13 @@ def parse_arguments(argv):
 
 	parser.add_argument('--base_number_of_images', type=int, help='Input base number of images.', default=25000)
 
+	parser.add_argument('--number_of_workers', type=int, help='Number of processes generating the image and landmark samples.', default=1)
+	parser.add_argument('--seed', type=int, help='Random seed of the image and landmark samples, combined with the image index.', default=0)
+	parser.add_argument('--number_of_shards', type=int, help='Number of TensorFlow files the image list is split into.', default=1)
+	parser.add_argument('--image_encoding', type=str, choices=TensorFlowDataset.image_encodings(), help='Storage of the sample images in the TensorFlow files.', default='raw')
+	parser.add_argument('--compression_type', type=str, choices=TensorFlowDataset.compression_types(), help='Record compression of the TensorFlow files.', default='none')
+	parser.add_argument('--sample_format', type=str, choices=SampleWriter.sample_formats(), help='Write samples straight into TensorFlow files (records), as JPEG images and lists converted afterwards (images), both for debugging, or into memory-mapped arrays (memmap).', default='records')
+
 	parser.add_argument('--target_root_dir', type=str, help='Output directory where output images and TensorFlow data files are saved.', default=None)
 	return(parser.parse_args(argv))
 
@@ -79,8 +118,23 @@ def main(args):
 	if(not args.target_root_dir):
 		raise ValueError('You must supply output directory for storing output images and TensorFlow data files with --target_root_dir.')
 
-	simple_dataset = SimpleDataset()
-	status = simple_dataset.generate(args.annotation_image_dir, args.annotation_file_name, args.landmark_image_dir, args.landmark_file_name, args.base_number_of_images, args.target_root_dir)
+	if(args.network_names):
+		network_names = [ network_name.strip() for network_name in args.network_names.split(',') ]
+		if( not all( network_name in NetworkFactory.network_names() for network_name in network_names ) ):
+			raise ValueError('The network names should be among ' + ', '.join(NetworkFactory.network_names()) + '.')
+
+		status = SimpleDataset.generate_networks(network_names, args.annotation_image_dir, args.annotation_file_name, args.landmark_image_dir, args.landmark_file_name, args.base_number_of_images, args.target_root_dir, args.number_of_workers, args.seed, args.sample_format, args.number_of_shards, args.image_encoding, args.compression_type)
+		if(status):
+			print('Basic datasets are generated at ' + args.target_root_dir)
+		else:
+			print('Error generating basic datasets.')
+		return
+
+	if( not (args.network_name in NetworkFactory.network_names()) or not (NetworkFactory.stage(args.network_name) == 'PNet') ):
+		raise ValueError('The network name should be a PNet stage network.')
+
+	simple_dataset = SimpleDataset(args.network_name)
+	status = simple_dataset.generate(args.annotation_image_dir, args.annotation_file_name, args.landmark_image_dir, args.landmark_file_name, args.base_number_of_images, args.target_root_dir, args.number_of_workers, args.seed, args.sample_format, args.number_of_shards, args.image_encoding, args.compression_type)
 	if(status):
 		print('Basic dataset is generated at ' + args.target_root_dir)
 	else:
@@ -0,0 +1,44 @@
+# MIT License
+# 
+# Copyright (c) 2018
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import tensorflow as tf
+
+def distillation_loss(cls_prob,bbox_pred,landmark_pred,teacher_cls_prob,teacher_bbox_pred,teacher_landmark_pred,label):
+    #soft class targets for all samples
+    cls_loss = -tf.reduce_sum(teacher_cls_prob*tf.log(tf.clip_by_value(cls_prob,1e-10,1.0)),axis=1)
+    cls_loss = tf.reduce_mean(cls_loss)
+
+    #teacher boxes for positive and part samples, teacher landmarks for positive and landmark samples
+    ones = tf.ones_like(label,dtype=tf.float32)
+    zeros = tf.zeros_like(label,dtype=tf.float32)
+    bbox_inds = tf.where(tf.equal(tf.abs(label),1),ones,zeros)
+    landmark_inds = tf.where(tf.logical_or(tf.equal(label,1),tf.equal(label,-2)),ones,zeros)
+
+    bbox_error = tf.reduce_sum(tf.square(bbox_pred-teacher_bbox_pred),axis=1)
+    bbox_loss = tf.reduce_sum(bbox_error*bbox_inds)/tf.maximum(tf.reduce_sum(bbox_inds),1.0)
+    landmark_error = tf.reduce_sum(tf.square(landmark_pred-teacher_landmark_pred),axis=1)
+    landmark_loss = tf.reduce_sum(landmark_error*landmark_inds)/tf.maximum(tf.reduce_sum(landmark_inds),1.0)
+    return cls_loss,bbox_loss,landmark_loss
@@ -24,7 +24,14 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import os
+import time
+import numpy as np
 import tensorflow as tf
+from tensorflow.contrib import slim
+from tensorflow.tools.graph_transforms import TransformGraph
+
+from utils.prelu import prelu, fused_prelu
 
 class AbstractFaceDetector(object):
 
@@ -34,6 +41,13 @@ class AbstractFaceDetector(object):
 		self._end_points = {}
 		self._session = None
 		self._is_model_loaded = False
+		self._missing_variables = []
+		self._width_layers = []
+		self._widths = []
+		self._separable = False
+		self._data_format = 'NHWC'
+		self._fused_weights = None
+		self._thread_pool = (0, 0)
 
 	def network_size(self):
 		return(self._network_size)
@@ -44,20 +58,286 @@ class AbstractFaceDetector(object):
 	def model_path(self):
 		return(self._model_path)
 
+	def missing_variables(self):
+		return(self._missing_variables)
+
+	def widths(self):
+		return(self._widths)
+
+	def width_layers(self):
+		return(self._width_layers)
+
+	def separable(self):
+		return(self._separable)
+
+	def data_format(self):
+		return(self._data_format)
+
+	def thread_pool(self):
+		return(self._thread_pool)
+
+	@classmethod
+	def use_session_thread_pools(cls):
+		# TensorFlow shares one intra-op thread pool per process unless this is set before the first session is created.
+		os.environ['TF_OVERRIDE_GLOBAL_THREADPOOL'] = '1'
+
+	def _session_config(self):
+		intra_op_threads, inter_op_threads = self._thread_pool
+		return(tf.ConfigProto(allow_soft_placement=True, gpu_options=tf.GPUOptions(allow_growth=True),
+					intra_op_parallelism_threads=intra_op_threads, inter_op_parallelism_threads=inter_op_threads,
+					use_per_session_threads=(inter_op_threads > 0)))
+
+	def set_thread_pool(self, intra_op_threads, inter_op_threads=1):
+		self._thread_pool = (intra_op_threads, inter_op_threads)
+		if( self._session is None ):
+			return(True)
+
+		# Thread pools are fixed at session creation, so the session is recreated with the loaded weights.
+		graph = self._session.graph
+		model_weights = self._session_weights()
+		self._session.close()
+		self._session = tf.Session(graph=graph, config=self._session_config())
+		with graph.as_default():
+			for variable in tf.global_variables():
+				variable.load(model_weights[variable.op.name], self._session)
+		return(True)
+
+	def auto_configure_thread_pool(self, thread_pools, number_of_runs=3):
+		detection_times = {}
+		for thread_pool in thread_pools:
+			self.set_thread_pool(*thread_pool)
+			detection_times[thread_pool] = self._detection_time(number_of_runs)
+
+		thread_pool = min(detection_times, key=detection_times.get)
+		self.set_thread_pool(*thread_pool)
+		return(thread_pool)
+
+	def number_of_graph_nodes(self):
+		return(len(self._session.graph.as_graph_def().node))
+
+	def _prelu(self, inputs):
+		if( self._fused_weights is None ):
+			return(prelu(inputs))
+
+		alphas = self._fused_weights[tf.get_variable_scope().name + '/alphas']
+		if( (self._data_format == 'NCHW') and (inputs.get_shape().ndims == 4) ):
+			alphas = np.reshape(alphas, [-1, 1, 1])
+		return(fused_prelu(inputs, alphas))
+
+	def _network_layout(self, inputs):
+		if( self._data_format == 'NCHW' ):
+			return(tf.transpose(inputs, [0, 3, 1, 2]))
+		return(inputs)
+
+	def _output_layout(self, inputs):
+		if( self._data_format == 'NCHW' ):
+			return(tf.transpose(inputs, [0, 2, 3, 1]))
+		return(inputs)
+
+	def _conv2d(self, inputs, num_outputs, kernel_size, scope):
+		if( self._separable ):
+			return(slim.separable_conv2d(inputs, num_outputs=num_outputs, kernel_size=kernel_size, depth_multiplier=1, stride=1, scope=scope))
+		else:
+			return(slim.conv2d(inputs, num_outputs=num_outputs, kernel_size=kernel_size, stride=1, scope=scope))
+
+	def _scale_widths(self, widths, width_multiplier=1.0, fc_units=None):
+		widths = [ max(1, int(round(width * width_multiplier))) for width in widths ]
+		if( fc_units and self._width_layers[-1].startswith('fc') ):
+			widths[-1] = fc_units
+		return(widths)
+
+	def load_widths(self, checkpoint_path):
+		# Layer widths follow the bias shapes, so pruned models load with their own widths.
+		if( isinstance(checkpoint_path, dict) ):
+			variable_shapes = dict( (variable_name, value.shape) for variable_name, value in checkpoint_path.items() )
+		else:
+			model_path = self.checkpoint_file(checkpoint_path)
+			if( (not model_path) or (not tf.train.checkpoint_exists(model_path)) ):
+				return(False)
+			variable_shapes = tf.train.NewCheckpointReader(model_path).get_variable_to_shape_map()
+
+		bias_names = [ layer + '/biases' for layer in self._width_layers ]
+		if( not all( bias_name in variable_shapes for bias_name in bias_names ) ):
+			return(False)
+		self._widths = [ int(variable_shapes[bias_name][0]) for bias_name in bias_names ]
+		return(True)
+
+	def complexity(self, height=0, width=0):
+		graph = tf.Graph()
+		with graph.as_default():
+			inputs = tf.placeholder(tf.float32, shape=[1, height or self._network_size, width or self._network_size, 3])
+			self._setup_basic_network(inputs)
+			options = tf.profiler.ProfileOptionBuilder(tf.profiler.ProfileOptionBuilder.float_operation()).with_empty_output().build()
+			number_of_flops = tf.profiler.profile(graph, options=options).total_float_ops
+			number_of_parameters = sum( int(np.prod(variable.get_shape().as_list())) for variable in tf.trainable_variables() )
+		self._end_points = {}
+		return(number_of_flops, number_of_parameters)
+
+	def latency(self, height=0, width=0, batch_size=1, number_of_runs=10):
+		graph = tf.Graph()
+		with graph.as_default():
+			input_shape = [batch_size, height or self._network_size, width or self._network_size, 3]
+			inputs = tf.placeholder(tf.float32, shape=input_shape)
+			outputs = self._setup_basic_network(inputs)
+			with tf.Session() as session:
+				session.run(tf.global_variables_initializer())
+				feed_dict = { inputs: np.random.uniform(-1.0, 1.0, input_shape).astype(np.float32) }
+				session.run(outputs, feed_dict=feed_dict)
+
+				start_time = time.time()
+				for _ in range(number_of_runs):
+					session.run(outputs, feed_dict=feed_dict)
+				duration = time.time() - start_time
+		self._end_points = {}
+		return(duration / number_of_runs)
+
 	def _setup_basic_network(self, inputs):
 		raise NotImplementedError('Must be implemented by the subclass.')
 
 	def setup_training_network(self, inputs):
 		raise NotImplementedError('Must be implemented by the subclass.')
 
+	def _setup_inference_graph(self):
+		raise NotImplementedError('Must be implemented by the subclass.')
+
 	def setup_inference_network(self, checkpoint_path):
 		raise NotImplementedError('Must be implemented by the subclass.')
 
-	def load_model(self, session, checkpoint_path):
+	def _sample_input(self):
+		raise NotImplementedError('Must be implemented by the subclass.')
+
+	def _session_weights(self):
+		with self._session.graph.as_default():
+			variables = tf.global_variables()
+		return(dict(zip([ variable.op.name for variable in variables ], self._session.run(variables))))
+
+	def _optimized_graph(self, model_weights, landmarks, data_format):
+		self._data_format = data_format
+		self._fused_weights = model_weights
+		graph = tf.Graph()
+		with graph.as_default():
+			outputs = self._setup_inference_graph()
+			if( not landmarks ):
+				outputs = outputs[:2]
+			output_names = [ output.op.name for output in outputs ]
+			with tf.Session() as session:
+				for variable in tf.global_variables():
+					variable.load(model_weights[variable.op.name], session)
+				graph_def = tf.graph_util.convert_variables_to_constants(session, graph.as_graph_def(), output_names)
+		self._fused_weights = None
+		self._end_points = {}
+
+		input_names = [ node.name for node in graph_def.node if node.op == 'Placeholder' ]
+		graph_def = TransformGraph(graph_def, input_names, output_names, ['remove_nodes(op=Identity)', 'fold_constants(ignore_errors=true)', 'sort_by_execution_order'])
+
+		optimized_graph = tf.Graph()
+		with optimized_graph.as_default():
+			tf.import_graph_def(graph_def, name='')
+		return(optimized_graph)
+
+	def _bind_optimized_graph(self, graph):
+		for attribute_name in ['_input_batch', '_image_width', '_image_height', '_output_class_probability', '_output_bounding_box', '_output_landmarks']:
+			tensor = getattr(self, attribute_name, None)
+			if( tensor is None ):
+				continue
+			try:
+				setattr(self, attribute_name, graph.get_tensor_by_name(tensor.name))
+			except KeyError:
+				setattr(self, attribute_name, None)
+
+		if( self._session ):
+			self._session.close()
+		self._session = tf.Session(graph=graph, config=self._session_config())
+
+	def _detection_time(self, number_of_runs=5):
+		data_batch = self._sample_input()
+		self.detect(data_batch)
+		start_time = time.time()
+		for _ in range(number_of_runs):
+			self.detect(data_batch)
+		return( (time.time() - start_time) / number_of_runs )
+
+	def optimize_inference_network(self, landmarks=True, data_format='NHWC'):
+		# Rebuilds the loaded network as a frozen graph with fused PReLU activations and folded constants.
+		if( not self._is_model_loaded ):
+			return(False)
+		if( data_format not in ['NHWC', 'NCHW', 'auto'] ):
+			raise ValueError('The data format should be one of NHWC, NCHW or auto.')
+
+		model_weights = self._session_weights()
+		if( data_format != 'auto' ):
+			self._bind_optimized_graph(self._optimized_graph(model_weights, landmarks, data_format))
+			return(True)
+
+		# Not every host supports both layouts, for example TensorFlow CPU kernels run NCHW convolutions only with MKL.
+		detection_times = {}
+		for candidate_format in ['NHWC', 'NCHW']:
+			self._bind_optimized_graph(self._optimized_graph(model_weights, landmarks, candidate_format))
+			try:
+				detection_times[candidate_format] = self._detection_time()
+			except (tf.errors.InvalidArgumentError, tf.errors.UnimplementedError):
+				continue
 
+		data_format = min(detection_times, key=detection_times.get)
+		if( data_format != self._data_format ):
+			self._bind_optimized_graph(self._optimized_graph(model_weights, landmarks, data_format))
+		return(True)
+
+	@classmethod
+	def checkpoint_file(cls, checkpoint_path):
+		if( tf.gfile.IsDirectory(checkpoint_path) ):
+			return(tf.train.latest_checkpoint(checkpoint_path))
+		else:
+			return(checkpoint_path)
+
+	@classmethod
+	def load_weights(cls, checkpoint_path):
+		model_path = cls.checkpoint_file(checkpoint_path)
+		if(not model_path):
+			return(None)
+
+		reader = tf.train.NewCheckpointReader(model_path)
+		model_weights = {}
+		for variable_name in reader.get_variable_to_shape_map():
+			if( variable_name.endswith('/Momentum') or ('/' not in variable_name) ):
+				continue
+			model_weights[variable_name] = reader.get_tensor(variable_name)
+		return(model_weights)
+
+	def save_model(self, network_weights, model_path):
+		graph = tf.Graph()
+		with graph.as_default():
+			inputs = tf.placeholder(tf.float32, shape=[1, self._network_size, self._network_size, 3])
+			self._setup_basic_network(inputs)
+			with tf.Session() as session:
+				for variable in tf.global_variables():
+					variable.load(network_weights[variable.op.name], session)
+				saver = tf.train.Saver(save_relative_paths=True)
+				saver.save(session, model_path)
+		self._end_points = {}
+		return(True)
+
+	def load_model_weights(self, session, model_weights):
 		if(self._is_model_loaded):
 			return(True)
 
+		for variable in tf.global_variables():
+			if( variable.op.name not in model_weights ):
+				return(False)
+			variable.load(model_weights[variable.op.name], session)
+
+		self._model_path = ''
+		self._is_model_loaded = True
+		return(self._is_model_loaded)
+
+	def load_model(self, session, checkpoint_path, allow_missing=False):
+
+		if(self._is_model_loaded):
+			return(True)
+
+		if( isinstance(checkpoint_path, dict) ):
+			return(self.load_model_weights(session, checkpoint_path))
+
   		if( tf.gfile.IsDirectory(checkpoint_path) ):
     			self._model_path = tf.train.latest_checkpoint(checkpoint_path)
   		else:
@@ -66,7 +346,12 @@ class AbstractFaceDetector(object):
 		if(not self._model_path):
 			self._is_model_loaded = False			
 		else:
-			saver = tf.train.Saver()
+			if( allow_missing ):
+				checkpoint_variables = tf.train.NewCheckpointReader(self._model_path).get_variable_to_shape_map()
+				self._missing_variables = [ variable.op.name for variable in tf.global_variables() if variable.op.name not in checkpoint_variables ]
+				saver = tf.train.Saver([ variable for variable in tf.global_variables() if variable.op.name in checkpoint_variables ])
+			else:
+				saver = tf.train.Saver()
       			saver.restore(session, self._model_path)
 			self._is_model_loaded = True
 
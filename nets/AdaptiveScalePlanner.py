@@ -0,0 +1,98 @@
+# MIT License
+# 
+# Copyright (c) 2018
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+
+class AdaptiveScalePlanner(object):
+
+	__bins_per_octave = 4
+	__number_of_octaves = 9
+
+	def __init__(self, face_detector, full_scan_interval=50, margin=1.5, decay=0.98, minimum_observations=3.0, coverage=0.98):
+		self._face_detector = face_detector
+		self._full_scan_interval = full_scan_interval
+		self._margin = margin
+		self._decay = decay
+		self._minimum_observations = minimum_observations
+		self._coverage = coverage
+
+		self._full_range = face_detector.face_size_range()
+		number_of_bins = AdaptiveScalePlanner.__bins_per_octave * AdaptiveScalePlanner.__number_of_octaves
+		self._bin_edges = self._full_range[0] * np.power(2.0, np.arange(number_of_bins + 1) / float(AdaptiveScalePlanner.__bins_per_octave))
+
+		self.reset()
+
+	def reset(self):
+		self._histogram = np.zeros(len(self._bin_edges) - 1)
+		# Advanced at the start of every frame, so the first frame is frame 0.
+		self._frame_index = -1
+
+	def histogram(self):
+		return(self._histogram, self._bin_edges)
+
+	def face_size_range(self):
+		if( (self._frame_index % self._full_scan_interval == 0) or (self._histogram.sum() < self._minimum_observations) ):
+			return(self._full_range)
+
+		cumulative = np.cumsum(self._histogram) / self._histogram.sum()
+		tail = (1.0 - self._coverage) / 2
+		lower_bin = int(np.searchsorted(cumulative, tail, side='right'))
+		upper_bin = int(np.searchsorted(cumulative, 1.0 - tail, side='left'))
+		upper_bin = min(upper_bin, len(self._histogram) - 1)
+
+		min_face_size = max(self._full_range[0], self._bin_edges[lower_bin] / self._margin)
+		max_face_size = self._bin_edges[upper_bin + 1] * self._margin
+		if( self._full_range[1] ):
+			max_face_size = min(max_face_size, self._full_range[1])
+
+		return(min_face_size, max_face_size)
+
+	def next_frame(self):
+		self._histogram = self._histogram * self._decay
+		self._frame_index = self._frame_index + 1
+
+	def update(self, boxes):
+		if( boxes.size == 0 ):
+			return
+
+		face_sizes = np.maximum(boxes[:, 2] - boxes[:, 0] + 1, boxes[:, 3] - boxes[:, 1] + 1)
+		face_sizes = np.clip(face_sizes, self._bin_edges[0], self._bin_edges[-1] - 1)
+		bins = np.searchsorted(self._bin_edges, face_sizes, side='right') - 1
+		self._histogram = self._histogram + np.bincount(bins, minlength=len(self._histogram))
+
+	def detect(self, image, last_network='ONet', new_frame=True):
+		# Further searches within the same frame, such as motion regions, pass new_frame=False.
+		if( new_frame ):
+			self.next_frame()
+
+		min_face_size, max_face_size = self.face_size_range()
+		self._face_detector.set_face_size_range(min_face_size, max_face_size)
+
+		boxes_c, landmarks = self._face_detector.detect(image, last_network)
+
+		self._face_detector.set_face_size_range(self._full_range[0], self._full_range[1])
+		self.update(boxes_c)
+		return( boxes_c, landmarks )
@@ -28,41 +28,217 @@ import os
 import time
 import cv2
 import numpy as np
+from multiprocessing.pool import ThreadPool
 
 from utils.nms import py_nms
 from utils.convert_to_square import convert_to_square
+from utils.WeightFile import WeightFile
+from utils.cpu_affinity import available_cores
 
+from nets.AbstractFaceDetector import AbstractFaceDetector
 from nets.NetworkFactory import NetworkFactory
+from nets.QuantizedNetwork import QuantizedNetwork
 
 class FaceDetector(object):
 
-	def __init__(self, model_root_dir=None):
+	# Approximate float32 PNet activation footprint per input pixel.
+	__pnet_bytes_per_pixel = 320
+
+	__batch_size = 256
+
+	def __init__(self, model_root_dir=None, model_weights=None, network_names=None, thread_pools=None):
 	    	if( not model_root_dir ):
 	        	self._model_root_dir = NetworkFactory.model_deploy_dir()
 		else:
 			self._model_root_dir = model_root_dir
 
+		if( not network_names ):
+			network_names = ['PNet', 'RNet', 'ONet']
+		if( (not model_weights) and os.path.isfile(self._model_root_dir) ):
+			model_weights = FaceDetector.load_weights(self._model_root_dir, network_names)
+
 		self._min_face_size = 24
+		self._max_face_size = 0
 		self._threshold = [0.9, 0.6, 0.7]
 		self._scale_factor = 0.79
 
+		self._proposal_memory_limit = 0
+		self._tile_pool = None
+
+		self._detection_resolution = 0
+		self._output_resolution = 0
+
+		if( thread_pools ):
+			AbstractFaceDetector.use_session_thread_pools()
+		else:
+			thread_pools = [(0, 0)] * 3
+
 		status_ok = True
-		self._pnet = NetworkFactory.network('PNet')
-		pnet_model_path = os.path.join(self._model_root_dir, self._pnet.network_name())
+		self._pnet = NetworkFactory.network(network_names[0])
+		self._pnet.set_thread_pool(*thread_pools[0])
+		if( model_weights ):
+			pnet_model_path = model_weights[self._pnet.network_name()]
+		else:
+			pnet_model_path = os.path.join(self._model_root_dir, self._pnet.network_name())
 		status_ok = self._pnet.setup_inference_network(pnet_model_path) and status_ok
 
-		self._rnet = NetworkFactory.network('RNet')
-		rnet_model_path = os.path.join(self._model_root_dir, self._rnet.network_name())
+		self._rnet = NetworkFactory.network(network_names[1], FaceDetector.__batch_size)
+		self._rnet.set_thread_pool(*thread_pools[1])
+		if( model_weights ):
+			rnet_model_path = model_weights[self._rnet.network_name()]
+		else:
+			rnet_model_path = os.path.join(self._model_root_dir, self._rnet.network_name())
 		status_ok = self._rnet.setup_inference_network(rnet_model_path) and status_ok
 
-		self._onet = NetworkFactory.network('ONet')
-		onet_model_path = os.path.join(self._model_root_dir, self._onet.network_name())
+		self._onet = NetworkFactory.network(network_names[2], FaceDetector.__batch_size)
+		self._onet.set_thread_pool(*thread_pools[2])
+		if( model_weights ):
+			onet_model_path = model_weights[self._onet.network_name()]
+		else:
+			onet_model_path = os.path.join(self._model_root_dir, self._onet.network_name())
 		status_ok = self._onet.setup_inference_network(onet_model_path) and status_ok
 
 		if(not status_ok):
 			raise SystemExit		
 
-    	def _generate_bbox(self, cls_map, reg, scale, threshold):
+	@classmethod
+	def load_weights(cls, model_root_dir=None, network_names=None):
+		if( not model_root_dir ):
+			model_root_dir = NetworkFactory.model_deploy_dir()
+		if( not network_names ):
+			network_names = ['PNet', 'RNet', 'ONet']
+
+		if( os.path.isfile(model_root_dir) ):
+			weight_file = WeightFile(model_root_dir)
+			if( not all( network_name in weight_file.network_names() for network_name in network_names ) ):
+				return(None)
+			return(dict( (network_name, weight_file.network_weights(network_name)) for network_name in network_names ))
+
+		model_weights = {}
+		for network_name in network_names:
+			network_weights = AbstractFaceDetector.load_weights(os.path.join(model_root_dir, network_name))
+			if( not network_weights ):
+				return(None)
+			model_weights[network_name] = network_weights
+		return(model_weights)
+
+	def networks(self):
+		return(self._pnet, self._rnet, self._onet)
+
+	@classmethod
+	def parse_thread_pools(cls, thread_pools):
+		# Intra-op and inter-op thread counts as intra:inter, either once for all networks or for PNet, RNet and ONet.
+		try:
+			thread_pools = [ tuple( int(value) for value in thread_pool.split(':') ) for thread_pool in thread_pools.split(',') ]
+		except ValueError:
+			raise ValueError('The thread pools should be given as intra:inter, e.g. 4:1 or 4:1,2:1,2:1.')
+		if( (len(thread_pools) not in [1, 3]) or any( (len(thread_pool) != 2) or (min(thread_pool) < 0) for thread_pool in thread_pools ) ):
+			raise ValueError('The thread pools should be given as intra:inter, e.g. 4:1 or 4:1,2:1,2:1.')
+		if( len(thread_pools) == 1 ):
+			thread_pools = thread_pools * 3
+		return(thread_pools)
+
+	def thread_pools(self):
+		return([ network.thread_pool() for network in self.networks() if isinstance(network, AbstractFaceDetector) ])
+
+	def set_thread_pools(self, thread_pools):
+		status_ok = True
+		for network, thread_pool in zip(self.networks(), thread_pools):
+			if( isinstance(network, AbstractFaceDetector) ):
+				status_ok = network.set_thread_pool(*thread_pool) and status_ok
+		return(status_ok)
+
+	def auto_configure_thread_pools(self, maximum_threads=0, number_of_runs=3):
+		# Per-network thread pools only take effect when use_session_thread_pools was called before the first session.
+		if( maximum_threads <= 0 ):
+			maximum_threads = len(available_cores())
+
+		intra_op_threads = [ threads for threads in [1, 2, 4, 8, 16, 32, 64] if threads < maximum_threads ] + [ maximum_threads ]
+		thread_pools = [ (threads, 1) for threads in intra_op_threads ]
+		if( maximum_threads > 1 ):
+			thread_pools.append((maximum_threads, 2))
+
+		for network in self.networks():
+			if( isinstance(network, AbstractFaceDetector) ):
+				network.auto_configure_thread_pool(thread_pools, number_of_runs)
+		return(self.thread_pools())
+
+	def face_size_range(self):
+		return(self._min_face_size, self._max_face_size)
+
+	def set_face_size_range(self, min_face_size, max_face_size=0):
+		self._min_face_size = min_face_size
+		self._max_face_size = max_face_size
+
+	def set_proposal_memory_limit(self, memory_limit, number_of_threads=1):
+		self._proposal_memory_limit = memory_limit
+
+		if( self._tile_pool ):
+			self._tile_pool.close()
+			self._tile_pool = None
+		if( number_of_threads > 1 ):
+			self._tile_pool = ThreadPool(number_of_threads)
+
+	def set_quantized_networks(self, quantized_model_dir, data_type='uint8'):
+		networks = []
+		for network_name in [ network.network_name() for network in self.networks() ]:
+			model_file_name = os.path.join(quantized_model_dir, QuantizedNetwork.model_file_name(network_name, data_type))
+			if( not os.path.isfile(model_file_name) ):
+				return(False)
+			networks.append(QuantizedNetwork(network_name, model_file_name, FaceDetector.__batch_size))
+
+		self._pnet, self._rnet, self._onet = networks
+		return(True)
+
+	def optimize_networks(self, data_format='NHWC'):
+		# Landmarks of the PNet and RNet stages are not used by the cascade.
+		status_ok = True
+		for network, landmarks in [(self._pnet, False), (self._rnet, False), (self._onet, True)]:
+			if( isinstance(network, AbstractFaceDetector) ):
+				status_ok = network.optimize_inference_network(landmarks, data_format) and status_ok
+		return(status_ok)
+
+	def calibration_inputs(self, image):
+		# Network inputs of the float cascade, used to calibrate the quantized networks.
+		h, w, c = image.shape
+		inputs = { 'PNet': [], 'RNet': None, 'ONet': None }
+		for current_scale in self._pyramid_scales(h, w):
+			inputs['PNet'].append(self._processed_image(self._resized_image(image, current_scale)))
+
+		_, boxes_c, _ = self._propose_faces(image)
+		if boxes_c is None:
+			return( inputs )
+		dets, inputs['RNet'] = self._cropped_faces(image, boxes_c, self._rnet.network_size())
+
+		_, boxes_c, _ = self._refined_faces(dets, *self._rnet.detect(inputs['RNet']))
+		if boxes_c is None:
+			return( inputs )
+		_, inputs['ONet'] = self._cropped_faces(image, boxes_c, self._onet.network_size())
+
+		return( inputs )
+
+	def set_detection_resolution(self, detection_resolution, output_resolution=0):
+		self._detection_resolution = detection_resolution
+		self._output_resolution = output_resolution
+
+	def _scaled_image(self, image, resolution):
+		height, width, channels = image.shape
+		if( (not resolution) or (max(height, width) <= resolution) ):
+			return( image, 1.0 )
+
+		scale = float(resolution) / max(height, width)
+		new_shape = (int(round(width * scale)), int(round(height * scale)))
+		scaled_image = cv2.resize(image, new_shape, interpolation = cv2.INTER_AREA)
+		return( scaled_image, scale )
+
+	def _scaled_boxes(self, boxes, scale):
+		if( scale == 1.0 ):
+			return( boxes )
+		scaled_boxes = boxes.copy()
+		scaled_boxes[:, 0:4] = scaled_boxes[:, 0:4] * scale
+		return( scaled_boxes )
+
+    	def _generate_bbox(self, cls_map, reg, scale, threshold, row_offset=0, column_offset=0):
  
         	stride = 2
         	#stride = 4
@@ -79,23 +255,28 @@ class FaceDetector(object):
 
         	reg = np.array([dx1, dy1, dx2, dy2])
         	score = cls_map[t_index[0], t_index[1]]
-        	boundingbox = np.vstack([np.round((stride * t_index[1]) / scale),
-                                 np.round((stride * t_index[0]) / scale),
-                                 np.round((stride * t_index[1] + cellsize) / scale),
-                                 np.round((stride * t_index[0] + cellsize) / scale),
+        	rows = t_index[0] + row_offset
+        	columns = t_index[1] + column_offset
+        	boundingbox = np.vstack([np.round((stride * columns) / scale),
+                                 np.round((stride * rows) / scale),
+                                 np.round((stride * columns + cellsize) / scale),
+                                 np.round((stride * rows + cellsize) / scale),
                                  score,
                                  reg])
 
         	return( boundingbox.T )
 
-	def _processed_image(self, image, scale):
-	        height, width, channels = image.shape
-	        new_height = int(height * scale)
-	        new_width = int(width * scale)
-	        new_shape = (new_width, new_height)
-	        resized_image = cv2.resize(image, new_shape, interpolation = cv2.INTER_LINEAR)
-	        resized_image = (resized_image - 127.5) / 128
-	        return( resized_image )
+	def _resized_image(self, image, scale):
+		height, width, channels = image.shape
+		new_height = int(height * scale)
+		new_width = int(width * scale)
+		new_shape = (new_width, new_height)
+		resized_image = cv2.resize(image, new_shape, interpolation = cv2.INTER_LINEAR)
+		return( resized_image )
+
+	def _processed_image(self, image):
+		processed_image = (image.astype(np.float32) - 127.5) / 128
+		return( processed_image )
 
     	def _pad(self, bboxes, w, h):
  
@@ -139,28 +320,72 @@ class FaceDetector(object):
         	bbox_c[:, 0:4] = bbox_c[:, 0:4] + aug
         	return bbox_c
 
+	def _pyramid_scales(self, height, width):
+		net_size = self._pnet.network_size()
+
+		scales = []
+		current_scale = float(net_size) / self._min_face_size
+		while( min(int(height * current_scale), int(width * current_scale)) > net_size ):
+			if( self._max_face_size and (net_size / current_scale > self._max_face_size) ):
+				break
+			scales.append(current_scale)
+			current_scale *= self._scale_factor
+
+		return( scales )
+
+	def _proposal_tiles(self, height, width):
+		stride = 2
+		cellsize = 12
+
+		map_height = int(np.ceil((height - 2) / 2.0)) - 4
+		map_width = int(np.ceil((width - 2) / 2.0)) - 4
+
+		if( self._proposal_memory_limit > 0 ):
+			tile_size = int(np.sqrt(self._proposal_memory_limit / FaceDetector.__pnet_bytes_per_pixel))
+			tile_cells = max(1, (tile_size - cellsize + stride) // stride)
+		else:
+			tile_cells = max(map_height, map_width)
+
+		# Each tile owns a disjoint block of PNet output cells and reads the input span covering their receptive fields.
+		tiles = []
+		for row in range(0, map_height, tile_cells):
+			y_top = stride * row
+			y_bottom = min(stride * (row + tile_cells) + cellsize - stride, height)
+			for column in range(0, map_width, tile_cells):
+				x_left = stride * column
+				x_right = min(stride * (column + tile_cells) + cellsize - stride, width)
+				tiles.append((row, column, y_top, y_bottom, x_left, x_right))
+
+		return( tiles )
+
+	def _propose_tile_faces(self, resized_image, scale, tile):
+		row, column, y_top, y_bottom, x_left, x_right = tile
+		processed_image = self._processed_image(resized_image[y_top:y_bottom, x_left:x_right, :])
+		cls_cls_map, reg = self._pnet.detect(processed_image)
+		boxes = self._generate_bbox(cls_cls_map[:, :,1], reg, scale, self._threshold[0], row, column)
+		return( boxes )
+
 	def _propose_faces(self, image):
-        	h, w, c = image.shape
-        	net_size = self._pnet.network_size()
-        
-        	current_scale = float(net_size) / self._min_face_size
-        	resized_image = self._processed_image(image, current_scale)
-        	current_height, current_width, _ = resized_image.shape
-        	
-        	all_boxes = list()
-        	while min(current_height, current_width) > net_size:
-            		cls_cls_map, reg = self._pnet.detect(resized_image)
-            		boxes = self._generate_bbox(cls_cls_map[:, :,1], reg, current_scale, self._threshold[0])
-
-            		current_scale *= self._scale_factor
-            		resized_image = self._processed_image(image, current_scale)
-            		current_height, current_width, _ = resized_image.shape
-
-            		if boxes.size == 0:
-                		continue
-            		keep = py_nms(boxes[:, :5], 0.5, 'Union')
-            		boxes = boxes[keep]
-            		all_boxes.append(boxes)
+		h, w, c = image.shape
+
+		all_boxes = list()
+		for current_scale in self._pyramid_scales(h, w):
+			resized_image = self._resized_image(image, current_scale)
+			current_height, current_width, _ = resized_image.shape
+
+			tiles = self._proposal_tiles(current_height, current_width)
+			if( self._tile_pool and (len(tiles) > 1) ):
+				tile_boxes = self._tile_pool.map(lambda tile: self._propose_tile_faces(resized_image, current_scale, tile), tiles)
+			else:
+				tile_boxes = [ self._propose_tile_faces(resized_image, current_scale, tile) for tile in tiles ]
+
+			tile_boxes = [ boxes for boxes in tile_boxes if boxes.size ]
+			if len(tile_boxes) == 0:
+				continue
+			boxes = np.vstack(tile_boxes)
+			keep = py_nms(boxes[:, :5], 0.5, 'Union')
+			boxes = boxes[keep]
+			all_boxes.append(boxes)
 
         	if len(all_boxes) == 0:
             		return None, None, None
@@ -185,99 +410,147 @@ class FaceDetector(object):
 
         	return( boxes, boxes_c, None )
 
+	def _cropped_faces(self, im, dets, size):
+		h, w, c = im.shape
+		dets = convert_to_square(dets)
+		dets[:, 0:4] = np.round(dets[:, 0:4])
+
+		[dy, edy, dx, edx, y, ey, x, ex, tmpw, tmph] = self._pad(dets, w, h)
+		num_boxes = dets.shape[0]
+		cropped_ims = np.zeros((num_boxes, size, size, 3), dtype=np.float32)
+		for i in range(num_boxes):
+			tmp = np.zeros((tmph[i], tmpw[i], 3), dtype=np.uint8)
+			tmp[dy[i]:edy[i] + 1, dx[i]:edx[i] + 1, :] = im[y[i]:ey[i] + 1, x[i]:ex[i] + 1, :]
+			cropped_ims[i, :, :, :] = (cv2.resize(tmp, (size, size))-127.5) / 128
+
+		return( dets, cropped_ims )
+
+	def _refined_faces(self, dets, cls_scores, reg, landmark):
+		cls_scores = cls_scores[:,1]
+		keep_inds = np.where(cls_scores > self._threshold[1])[0]
+		if len(keep_inds) > 0:
+			boxes = dets[keep_inds]
+			boxes[:, 4] = cls_scores[keep_inds]
+			reg = reg[keep_inds]
+		else:
+			return( None, None, None )        
+
+		keep = py_nms(boxes, 0.6)
+		boxes = boxes[keep]
+		boxes_c = self._calibrate_box(boxes, reg[keep])
+		return( boxes, boxes_c, None )
+
+	def _output_faces(self, dets, cls_scores, reg, landmark):
+		cls_scores = cls_scores[:,1]        
+		keep_inds = np.where(cls_scores > self._threshold[2])[0]        
+		if len(keep_inds) > 0:
+			boxes = dets[keep_inds]
+			boxes[:, 4] = cls_scores[keep_inds]
+			reg = reg[keep_inds]
+			landmark = landmark[keep_inds]
+		else:
+			return( None, None, None )
+
+		w = boxes[:,2] - boxes[:,0] + 1
+		h = boxes[:,3] - boxes[:,1] + 1
+
+		landmark[:,0::2] = (np.tile(w,(5,1)) * landmark[:,0::2].T + np.tile(boxes[:,0],(5,1)) - 1).T
+		landmark[:,1::2] = (np.tile(h,(5,1)) * landmark[:,1::2].T + np.tile(boxes[:,1],(5,1)) - 1).T        
+		boxes_c = self._calibrate_box(boxes, reg)
+
+		boxes = boxes[py_nms(boxes, 0.6, "Minimum")]
+		keep = py_nms(boxes_c, 0.6, "Minimum")
+		boxes_c = boxes_c[keep]
+		landmark = landmark[keep]
+		return( boxes, boxes_c,landmark )
+
 	def _refine_faces(self, im, dets):
-        	h, w, c = im.shape
-        	dets = convert_to_square(dets)
-        	dets[:, 0:4] = np.round(dets[:, 0:4])
-
-        	[dy, edy, dx, edx, y, ey, x, ex, tmpw, tmph] = self._pad(dets, w, h)
-        	num_boxes = dets.shape[0]
-        	cropped_ims = np.zeros((num_boxes, 24, 24, 3), dtype=np.float32)
-        	for i in range(num_boxes):
-            		tmp = np.zeros((tmph[i], tmpw[i], 3), dtype=np.uint8)
-            		tmp[dy[i]:edy[i] + 1, dx[i]:edx[i] + 1, :] = im[y[i]:ey[i] + 1, x[i]:ex[i] + 1, :]
-            		cropped_ims[i, :, :, :] = (cv2.resize(tmp, (24, 24))-127.5) / 128
-	        cls_scores, reg, _ = self._rnet.detect(cropped_ims)
-        	cls_scores = cls_scores[:,1]
-        	keep_inds = np.where(cls_scores > self._threshold[1])[0]
-        	if len(keep_inds) > 0:
-            		boxes = dets[keep_inds]
-            		boxes[:, 4] = cls_scores[keep_inds]
-            		reg = reg[keep_inds]
-            		#landmark = landmark[keep_inds]
-        	else:
-            		return( None, None, None )        
-        
-        	keep = py_nms(boxes, 0.6)
-        	boxes = boxes[keep]
-        	boxes_c = self._calibrate_box(boxes, reg[keep])
-        	return( boxes, boxes_c, None )
+		dets, cropped_ims = self._cropped_faces(im, dets, self._rnet.network_size())
+		cls_scores, reg, landmark = self._rnet.detect(cropped_ims)
+		return( self._refined_faces(dets, cls_scores, reg, landmark) )
 
 	def _outpute_faces(self, im, dets):
-        	h, w, c = im.shape
-        	dets = convert_to_square(dets)
-        	dets[:, 0:4] = np.round(dets[:, 0:4])
-        	[dy, edy, dx, edx, y, ey, x, ex, tmpw, tmph] = self._pad(dets, w, h)
-        	num_boxes = dets.shape[0]
-        	cropped_ims = np.zeros((num_boxes, 48, 48, 3), dtype=np.float32)
-        	for i in range(num_boxes):
-            		tmp = np.zeros((tmph[i], tmpw[i], 3), dtype=np.uint8)
-            		tmp[dy[i]:edy[i] + 1, dx[i]:edx[i] + 1, :] = im[y[i]:ey[i] + 1, x[i]:ex[i] + 1, :]
-            		cropped_ims[i, :, :, :] = (cv2.resize(tmp, (48, 48))-127.5) / 128
-            
-        	cls_scores, reg,landmark = self._onet.detect(cropped_ims)
-        	cls_scores = cls_scores[:,1]        
-        	keep_inds = np.where(cls_scores > self._threshold[2])[0]        
-        	if len(keep_inds) > 0:
-            		boxes = dets[keep_inds]
-            		boxes[:, 4] = cls_scores[keep_inds]
-            		reg = reg[keep_inds]
-            		landmark = landmark[keep_inds]
-        	else:
-            		return( None, None, None )
-        
-        	w = boxes[:,2] - boxes[:,0] + 1
-        	h = boxes[:,3] - boxes[:,1] + 1
-
-        	landmark[:,0::2] = (np.tile(w,(5,1)) * landmark[:,0::2].T + np.tile(boxes[:,0],(5,1)) - 1).T
-        	landmark[:,1::2] = (np.tile(h,(5,1)) * landmark[:,1::2].T + np.tile(boxes[:,1],(5,1)) - 1).T        
-        	boxes_c = self._calibrate_box(boxes, reg)
-        
-        
-        	boxes = boxes[py_nms(boxes, 0.6, "Minimum")]
-        	keep = py_nms(boxes_c, 0.6, "Minimum")
-        	boxes_c = boxes_c[keep]
-        	landmark = landmark[keep]
-        	return( boxes, boxes_c,landmark )		
+		dets, cropped_ims = self._cropped_faces(im, dets, self._onet.network_size())
+		cls_scores, reg, landmark = self._onet.detect(cropped_ims)
+		return( self._output_faces(dets, cls_scores, reg, landmark) )
+
+	def _batch_faces(self, network, images, all_boxes_c, select_faces):
+		# Crops of all images go through the network in one call.
+		indices = []
+		all_dets = []
+		all_cropped_ims = []
+		for index, (image, boxes_c) in enumerate(zip(images, all_boxes_c)):
+			if boxes_c is None:
+				continue
+			dets, cropped_ims = self._cropped_faces(image, boxes_c, network.network_size())
+			indices.append(index)
+			all_dets.append(dets)
+			all_cropped_ims.append(cropped_ims)
+
+		all_boxes_c = [ None ] * len(images)
+		all_landmarks = [ None ] * len(images)
+		if( len(indices) == 0 ):
+			return( all_boxes_c, all_landmarks )
+
+		cls_scores, reg, landmark = network.detect(np.concatenate(all_cropped_ims, axis=0))
+
+		start = 0
+		for index, dets in zip(indices, all_dets):
+			end = start + dets.shape[0]
+			landmarks = landmark[start:end] if landmark is not None else None
+			_, all_boxes_c[index], all_landmarks[index] = select_faces(dets, cls_scores[start:end], reg[start:end], landmarks)
+			start = end
+
+		return( all_boxes_c, all_landmarks )
+
+	def detect_batch(self, images, last_network='ONet'):
+		number_of_images = len(images)
+		all_boxes_c = [ None ] * number_of_images
+		all_landmarks = [ None ] * number_of_images
+
+		detection_images = []
+		detection_scales = []
+		for image in images:
+			detection_image, detection_scale = self._scaled_image(image, self._detection_resolution)
+			detection_images.append(detection_image)
+			detection_scales.append(detection_scale)
+
+		if( (last_network in ['PNet', 'RNet', 'ONet'] ) and self._pnet ):
+			for index, detection_image in enumerate(detection_images):
+				_, all_boxes_c[index], _ = self._propose_faces(detection_image)
+
+		if ( (last_network in ['RNet', 'ONet'] ) and self._rnet ):
+			all_boxes_c, _ = self._batch_faces(self._rnet, detection_images, all_boxes_c, self._refined_faces)
+
+		if ( (last_network in ['ONet'] ) and self._onet ):
+			output_images = []
+			output_scales = []
+			for index, image in enumerate(images):
+				output_image, output_scale = self._scaled_image(image, self._output_resolution)
+				output_images.append(output_image)
+				output_scales.append(output_scale)
+				if( all_boxes_c[index] is not None ):
+					all_boxes_c[index] = self._scaled_boxes(all_boxes_c[index], output_scale / detection_scales[index])
+
+			all_boxes_c, all_landmarks = self._batch_faces(self._onet, output_images, all_boxes_c, self._output_faces)
+		else:
+			output_scales = detection_scales
+
+		results = []
+		for boxes_c, landmark, output_scale in zip(all_boxes_c, all_landmarks, output_scales):
+			if boxes_c is None:
+				results.append( (np.array([]), np.array([])) )
+				continue
+
+			boxes_c = self._scaled_boxes(boxes_c, 1.0 / output_scale)
+			if( landmark is not None ):
+				landmark = landmark / output_scale
+			results.append( (boxes_c, landmark) )
+
+		return( results )
 
 	def detect(self, image, last_network='ONet'):
-		boxes = boxes_c = landmark = None 
-
-		start_time = time.time()
-		pnet_time = 0
-        	if( (last_network in ['PNet', 'RNet', 'ONet'] ) and self._pnet ):
-            		boxes, boxes_c, _ = self._propose_faces(image)
-            		if boxes_c is None:
-                		return( np.array([]), np.array([]) )    
-            		pnet_time = time.time() - start_time
-
-		start_time = time.time()
-		rnet_time = 0
-        	if ( (last_network in ['RNet', 'ONet'] ) and self._rnet ):
-            		boxes, boxes_c, _ = self._refine_faces(image, boxes_c)
-            		if boxes_c is None:
-                		return( np.array([]),np.array([]) )    
-            		rnet_time = time.time() - start_time
-
-            	start_time = time.time()
-		onet_time = 0
-        	if ( (last_network in ['ONet'] ) and self._onet ):
-            		boxes, boxes_c, landmark = self._outpute_faces(image, boxes_c)
-            		if boxes_c is None:
-                		return( np.array([]),np.array([]) )    
-            		onet_time = time.time() - start_time
-
-		return(boxes_c, landmark)
+		return( self.detect_batch([image], last_network)[0] )
 
 	def detect_face(self, data_batch, last_network):
         	all_boxes_c = []
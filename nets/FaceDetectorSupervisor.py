@@ -0,0 +1,128 @@
+# MIT License
+# 
+# Copyright (c) 2018
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import time
+import multiprocessing
+
+try:
+	from Queue import Empty
+except ImportError:
+	from queue import Empty
+
+from utils.cpu_affinity import worker_cores
+from nets.FaceDetector import FaceDetector
+from nets.FaceDetectorWorker import FaceDetectorWorker
+from nets.FaceDetectorWorker import memory_usage
+
+class FaceDetectorSupervisor(object):
+
+	# Seconds between checks that the workers still loading their networks are alive.
+	__status_poll_interval = 1.0
+
+	def __init__(self, ring_buffer, model_root_dir=None, number_of_workers=1, batch_size=1, detection_resolution=0, network_names=None, data_format=None):
+		self._ring_buffer = ring_buffer
+		self._model_root_dir = model_root_dir
+		self._network_names = network_names
+		self._data_format = data_format
+		self._number_of_workers = number_of_workers
+		self._batch_size = batch_size
+		self._detection_resolution = detection_resolution
+
+		self._thread_pools = None
+		self._cores_per_worker = 0
+		self._auto_configure = False
+
+		self._workers = []
+		self._worker_statistics = []
+		self._load_time = 0
+		self._memory_usage = (0, 0)
+
+	def number_of_workers(self):
+		return(self._number_of_workers)
+
+	def workers(self):
+		return(self._workers)
+
+	def worker_statistics(self):
+		return(self._worker_statistics)
+
+	def set_thread_pools(self, thread_pools=None, cores_per_worker=0, auto_configure=False):
+		self._thread_pools = thread_pools
+		self._cores_per_worker = cores_per_worker
+		self._auto_configure = auto_configure
+
+	def start(self):
+		# Weights are read once here and inherited copy-on-write by the forked workers.
+		start_time = time.time()
+		model_weights = FaceDetector.load_weights(self._model_root_dir, self._network_names)
+		if( not model_weights ):
+			return(False)
+		self._load_time = time.time() - start_time
+		self._memory_usage = memory_usage()
+
+		status_queue = multiprocessing.Queue()
+		start_times = {}
+		for worker_index in range(self._number_of_workers):
+			cpu_cores = worker_cores(worker_index, self._cores_per_worker)
+			worker = FaceDetectorWorker(self._ring_buffer, self._model_root_dir, self._batch_size, self._detection_resolution, model_weights, status_queue, self._network_names, self._data_format,
+							self._thread_pools, cpu_cores, self._auto_configure)
+			start_times[worker.name] = time.time()
+			worker.start()
+			self._workers.append(worker)
+
+		self._worker_statistics = []
+		while( len(self._worker_statistics) < self._number_of_workers ):
+			try:
+				worker_name, process_id, ready_time, (resident_memory, proportional_memory), thread_pools, cpu_cores = status_queue.get(timeout=FaceDetectorSupervisor.__status_poll_interval)
+			except Empty:
+				# A worker that exits before reporting failed to build its detector, for example on mismatched weights.
+				ready_workers = set( statistics[0] for statistics in self._worker_statistics )
+				if( any( (worker.name not in ready_workers) and (not worker.is_alive()) for worker in self._workers ) ):
+					self.terminate()
+					return(False)
+				continue
+			self._worker_statistics.append((worker_name, process_id, ready_time - start_times[worker_name], resident_memory, proportional_memory, thread_pools, cpu_cores))
+		self._worker_statistics.sort(key=lambda statistics: statistics[1])
+
+		return(True)
+
+	def print_statistics(self):
+		megabyte = 1024.0 * 1024.0
+		print('Supervisor - weights loaded in %.3f s, RSS %.1f MB, PSS %.1f MB.' % (self._load_time, self._memory_usage[0] / megabyte, self._memory_usage[1] / megabyte))
+		for worker_name, process_id, spawn_time, resident_memory, proportional_memory, thread_pools, cpu_cores in self._worker_statistics:
+			print('%s (pid %d) - spawned in %.3f s, RSS %.1f MB, PSS %.1f MB, thread pools %s, cores %s.' % (worker_name, process_id, spawn_time, resident_memory / megabyte, proportional_memory / megabyte, thread_pools, cpu_cores or 'not pinned'))
+
+	def terminate(self):
+		for worker in self._workers:
+			if( worker.is_alive() ):
+				worker.terminate()
+			worker.join()
+		self._workers = []
+
+	def join(self):
+		for worker in self._workers:
+			worker.join()
+		self._workers = []
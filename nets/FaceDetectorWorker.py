@@ -0,0 +1,94 @@
+# MIT License
+# 
+# Copyright (c) 2018
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import time
+import multiprocessing
+import numpy as np
+
+from utils.cpu_affinity import set_cpu_affinity
+from nets.AbstractFaceDetector import AbstractFaceDetector
+from nets.FaceDetector import FaceDetector
+
+def _memory_field(file_name, field_name):
+	if( not os.path.isfile(file_name) ):
+		return(0)
+	with open(file_name) as memory_file:
+		for line in memory_file:
+			if( line.startswith(field_name + ':') ):
+				return(int(line.split()[1]) * 1024)
+	return(0)
+
+def memory_usage():
+	# Resident set size and proportional set size, the latter splits copy-on-write pages shared with the supervisor.
+	return(_memory_field('/proc/self/status', 'VmRSS'), _memory_field('/proc/self/smaps_rollup', 'Pss'))
+
+class FaceDetectorWorker(multiprocessing.Process):
+
+	def __init__(self, ring_buffer, model_root_dir=None, batch_size=1, detection_resolution=0, model_weights=None, status_queue=None, network_names=None, data_format=None, thread_pools=None, cpu_cores=None, auto_configure=False):
+		multiprocessing.Process.__init__(self)
+		self.daemon = True
+		self._ring_buffer = ring_buffer
+		self._model_root_dir = model_root_dir
+		self._model_weights = model_weights
+		self._network_names = network_names
+		self._data_format = data_format
+		self._thread_pools = thread_pools
+		self._cpu_cores = cpu_cores
+		self._auto_configure = auto_configure
+		self._status_queue = status_queue
+		self._batch_size = batch_size
+		self._detection_resolution = detection_resolution
+
+	def run(self):
+		# Cores the worker is actually pinned to, empty when pinning was not requested or not possible.
+		cpu_cores = set_cpu_affinity(self._cpu_cores) if self._cpu_cores else []
+		if( self._auto_configure ):
+			AbstractFaceDetector.use_session_thread_pools()
+
+		face_detector = FaceDetector(self._model_root_dir, self._model_weights, self._network_names, self._thread_pools)
+		if( self._data_format ):
+			face_detector.optimize_networks(self._data_format)
+		if( self._auto_configure ):
+			face_detector.auto_configure_thread_pools(len(cpu_cores))
+		face_detector.set_detection_resolution(self._detection_resolution)
+		if( self._status_queue ):
+			self._status_queue.put((self.name, os.getpid(), time.time(), memory_usage(), face_detector.thread_pools(), cpu_cores))
+
+		is_closed = False
+		while( not is_closed ):
+			batch, is_closed = self._ring_buffer.get_batch(self._batch_size)
+			if( len(batch) == 0 ):
+				continue
+
+			detections = face_detector.detect_batch([ self._ring_buffer.frame(slot) for slot, _, _ in batch ])
+			for (slot, frame_index, timestamp), (boxes_c, landmarks) in zip(batch, detections):
+				self._ring_buffer.release(slot)
+				if( boxes_c.size == 0 ):
+					boxes_c, landmarks = np.zeros((0, 5)), np.zeros((0, 10))
+				self._ring_buffer.put_result((frame_index, timestamp, boxes_c, landmarks))
+
+		self._ring_buffer.put_result(None)
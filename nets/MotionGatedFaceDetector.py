@@ -0,0 +1,164 @@
+# MIT License
+# 
+# Copyright (c) 2018
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import cv2
+import numpy as np
+
+from utils.nms import py_nms
+from nets.AdaptiveScalePlanner import AdaptiveScalePlanner
+
+class MotionGatedFaceDetector(object):
+
+	def __init__(self, face_detector, refresh_interval=30, motion_scale=0.25, motion_threshold=20, region_margin=0.5, minimum_region_size=64):
+		# A refresh interval of 0 never forces a full detection after the first frame.
+		if( refresh_interval < 0 ):
+			raise ValueError('The refresh interval should not be negative.')
+
+		self._face_detector = face_detector
+		self._refresh_interval = refresh_interval
+		self._motion_scale = motion_scale
+		self._motion_threshold = motion_threshold
+		self._region_margin = region_margin
+		self._minimum_region_size = minimum_region_size
+
+		self.reset()
+
+	def reset(self):
+		self._reference_frame = None
+		self._boxes = np.zeros((0, 5))
+		self._landmarks = np.zeros((0, 10))
+		self._frame_index = 0
+		self._regions = []
+
+	def regions(self):
+		return(self._regions)
+
+	def _motion_frame(self, image):
+		motion_frame = cv2.resize(image, None, fx=self._motion_scale, fy=self._motion_scale, interpolation=cv2.INTER_AREA)
+		motion_frame = cv2.cvtColor(motion_frame, cv2.COLOR_BGR2GRAY)
+		motion_frame = cv2.GaussianBlur(motion_frame, (5, 5), 0)
+		return(motion_frame)
+
+	def _motion_regions(self, motion_frame):
+		difference = cv2.absdiff(motion_frame, self._reference_frame)
+		_, mask = cv2.threshold(difference, self._motion_threshold, 255, cv2.THRESH_BINARY)
+		mask = cv2.dilate(mask, None, iterations=2)
+
+		number_of_labels, _, statistics, _ = cv2.connectedComponentsWithStats(mask)
+		regions = statistics[1:number_of_labels, :4].astype(np.float32) / self._motion_scale
+		regions[:, 2:4] = regions[:, 0:2] + regions[:, 2:4] - 1
+		return(regions)
+
+	def _detection_regions(self, motion_regions, height, width):
+		regions = []
+		for x1, y1, x2, y2 in motion_regions:
+			# Drop the previous detections touching the region and grow it to cover them entirely.
+			touched = (self._boxes[:, 0] <= x2) & (self._boxes[:, 2] >= x1) & (self._boxes[:, 1] <= y2) & (self._boxes[:, 3] >= y1)
+			if( np.any(touched) ):
+				x1 = min(x1, self._boxes[touched, 0].min())
+				y1 = min(y1, self._boxes[touched, 1].min())
+				x2 = max(x2, self._boxes[touched, 2].max())
+				y2 = max(y2, self._boxes[touched, 3].max())
+
+			margin = max(self._region_margin * max(x2 - x1 + 1, y2 - y1 + 1), self._minimum_region_size / 2.0)
+			regions.append([max(0, x1 - margin), max(0, y1 - margin), min(width - 1, x2 + margin), min(height - 1, y2 + margin)])
+
+		# Merge overlapping regions so that every face is searched in one region only.
+		merged = True
+		while( merged ):
+			merged = False
+			for i in range(len(regions)):
+				for j in range(i + 1, len(regions)):
+					a, b = regions[i], regions[j]
+					if( (a[0] <= b[2]) and (b[0] <= a[2]) and (a[1] <= b[3]) and (b[1] <= a[3]) ):
+						regions[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+						del regions[j]
+						merged = True
+						break
+				if( merged ):
+					break
+
+		return([ [int(x1), int(y1), int(x2), int(y2)] for x1, y1, x2, y2 in regions ])
+
+	def _detect(self, image, new_frame=True):
+		# Only the first search of a frame advances an adaptive scale planner.
+		if( isinstance(self._face_detector, AdaptiveScalePlanner) ):
+			boxes, landmarks = self._face_detector.detect(image, new_frame=new_frame)
+		else:
+			boxes, landmarks = self._face_detector.detect(image)
+		if( boxes.size == 0 ):
+			return( np.zeros((0, 5)), np.zeros((0, 10)) )
+		return( boxes, landmarks )
+
+	def _detect_regions(self, image, regions):
+		outside = np.ones(self._boxes.shape[0], dtype=bool)
+		all_boxes = []
+		all_landmarks = []
+		for region_index, (x1, y1, x2, y2) in enumerate(regions):
+			inside = (self._boxes[:, 0] >= x1) & (self._boxes[:, 2] <= x2) & (self._boxes[:, 1] >= y1) & (self._boxes[:, 3] <= y2)
+			outside = outside & (~inside)
+
+			boxes, landmarks = self._detect(image[y1:y2 + 1, x1:x2 + 1, :], new_frame=(region_index == 0))
+			boxes[:, [0, 2]] += x1
+			boxes[:, [1, 3]] += y1
+			landmarks[:, 0::2] += x1
+			landmarks[:, 1::2] += y1
+			all_boxes.append(boxes)
+			all_landmarks.append(landmarks)
+
+		all_boxes.append(self._boxes[outside])
+		all_landmarks.append(self._landmarks[outside])
+		boxes = np.vstack(all_boxes)
+		landmarks = np.vstack(all_landmarks)
+
+		if( boxes.shape[0] > 1 ):
+			keep = py_nms(boxes, 0.6, "Minimum")
+			boxes = boxes[keep]
+			landmarks = landmarks[keep]
+		return( boxes, landmarks )
+
+	def detect(self, image):
+		height, width, _ = image.shape
+		motion_frame = self._motion_frame(image)
+
+		if( (self._reference_frame is None) or (self._reference_frame.shape != motion_frame.shape) or ( (self._refresh_interval > 0) and (self._frame_index % self._refresh_interval == 0) ) ):
+			self._boxes, self._landmarks = self._detect(image)
+			self._reference_frame = motion_frame
+			self._regions = [ [0, 0, width - 1, height - 1] ]
+		else:
+			motion_regions = self._motion_regions(motion_frame)
+			self._regions = self._detection_regions(motion_regions, height, width)
+			if( len(self._regions) ):
+				self._boxes, self._landmarks = self._detect_regions(image, self._regions)
+
+				# Only the searched regions are refreshed in the reference frame, so slow motion elsewhere keeps accumulating.
+				for x1, y1, x2, y2 in self._regions:
+					top, bottom = int(y1 * self._motion_scale), int(np.ceil((y2 + 1) * self._motion_scale))
+					left, right = int(x1 * self._motion_scale), int(np.ceil((x2 + 1) * self._motion_scale))
+					self._reference_frame[top:bottom, left:right] = motion_frame[top:bottom, left:right]
+
+		self._frame_index = self._frame_index + 1
+		return( self._boxes.copy(), self._landmarks.copy() )
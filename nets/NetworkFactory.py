@@ -32,33 +32,94 @@ from nets.ONet import ONet
 
 class NetworkFactory(object):
 
+	# Network name to cascade stage and architecture options.
+	__networks = {
+		'PNet': ('PNet', {}),
+		'RNet': ('RNet', {}),
+		'ONet': ('ONet', {}),
+		'PNetStudent': ('PNet', { 'widths': [8, 16, 24], 'separable': True }),
+		'RNetStudent': ('RNet', { 'widths': [28, 48, 64, 64], 'separable': True }),
+		'ONetStudent': ('ONet', { 'widths': [32, 64, 64, 128, 128], 'separable': True }),
+		'PNetLite': ('PNet', { 'width_multiplier': 0.5 }),
+		'RNetLite': ('RNet', { 'width_multiplier': 0.5, 'fc_units': 64 }),
+		'ONetLite': ('ONet', { 'width_multiplier': 0.5, 'fc_units': 128 }),
+		'PNetSeparable': ('PNet', { 'separable': True }),
+		'RNetSeparable': ('RNet', { 'separable': True }),
+		'ONetSeparable': ('ONet', { 'separable': True })
+	}
+
 	def __init__(self):	
 		pass
 
 	@classmethod
-	def network(cls, network_name='PNet'):
-		if (network_name == 'PNet'): 
+	def network_names(cls):
+		return(sorted(cls.__networks.keys()))
+
+	@classmethod
+	def register(cls, network_name, stage, width_multiplier=1.0, separable=False, fc_units=None, widths=None):
+		if( stage not in ['PNet', 'RNet', 'ONet'] ):
+			raise ValueError('The network stage should be one of PNet, RNet or ONet.')
+		if( width_multiplier <= 0 ):
+			raise ValueError('The width multiplier should be positive.')
+
+		options = { 'width_multiplier': width_multiplier, 'separable': separable, 'fc_units': fc_units }
+		if( widths ):
+			options['widths'] = list(widths)
+		cls.__networks[network_name] = (stage, options)
+
+	@classmethod
+	def network_options(cls, network_name='PNet'):
+		if (network_name in cls.__networks):
+			_, options = cls.__networks[network_name]
+			return(dict(options))
+		else:
+			return({})
+
+	@classmethod
+	def stage(cls, network_name='PNet'):
+		if (network_name in cls.__networks):
+			stage, _ = cls.__networks[network_name]
+			return(stage)
+		else:
+			return('PNet')
+
+	@classmethod
+	def cascade_network_names(cls, network_names=None):
+		if( not network_names ):
+			return(['PNet', 'RNet', 'ONet'])
+		if( not isinstance(network_names, list) ):
+			network_names = [ network_name.strip() for network_name in network_names.split(',') ]
+
+		if( not all( network_name in cls.__networks for network_name in network_names ) ):
+			raise ValueError('The network names should be among ' + ', '.join(cls.network_names()) + '.')
+		if( [ cls.stage(network_name) for network_name in network_names ] != ['PNet', 'RNet', 'ONet'] ):
+			raise ValueError('The network names should be a PNet, an RNet and an ONet stage network in order.')
+		return(network_names)
+
+	@classmethod
+	def network(cls, network_name='PNet', batch_size=1):
+		if (network_name not in cls.__networks):
 			network_object = PNet()
 			return(network_object)
-		elif (network_name == 'RNet'): 
-			network_object = RNet()
+
+		stage, options = cls.__networks[network_name]
+		if (stage == 'RNet'): 
+			network_object = RNet(batch_size, network_name=network_name, **options)
 			return(network_object)
-		elif (network_name == 'ONet'): 
-			network_object = ONet()
+		elif (stage == 'ONet'): 
+			network_object = ONet(batch_size, network_name=network_name, **options)
 			return(network_object)
 		else:
-			network_object = PNet()
+			network_object = PNet(network_name=network_name, **options)
 			return(network_object)
 
 	@classmethod
 	def network_size(cls, network_name='PNet'):
-		if (network_name == 'PNet'): 			
-			network_size  = 12
-			return(network_size)
-		elif (network_name == 'RNet'): 
+		stage = cls.stage(network_name)
+		if (stage == 'RNet'): 
 			network_size  = 24
 			return(network_size)
-		elif (network_name == 'ONet'): 
+		elif (stage == 'ONet'): 
 			network_size  = 48
 			return(network_size)
 		else:
@@ -67,10 +128,11 @@ class NetworkFactory(object):
 
 	@classmethod
 	def previous_network(cls, network_name='PNet'):
-		if(network_name == 'ONet'):
+		stage = cls.stage(network_name)
+		if(stage == 'ONet'):
 			previous_network = 'RNet'
 			return(previous_network)
-		elif (network_name == 'RNet'):
+		elif (stage == 'RNet'):
 			previous_network = 'PNet'
 			return(previous_network)
 		else:
@@ -91,6 +153,7 @@ class NetworkFactory(object):
 
 	@classmethod
 	def loss_ratio(cls, network_name):
+		network_name = cls.stage(network_name)
 		if (network_name == 'PNet'): 
 			class_loss_ratio = 1.0
 			bbox_loss_ratio = 0.5
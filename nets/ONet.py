@@ -29,57 +29,60 @@ import tensorflow as tf
 from tensorflow.contrib import slim
 
 from nets.RNet import RNet
-from utils.prelu import prelu
 
 class ONet(RNet):
 
-	def __init__(self, batch_size = 1):
-		RNet.__init__(self, batch_size)
+	__default_widths = [32, 64, 64, 128, 256]
+
+	def __init__(self, batch_size = 1, widths=None, separable=False, network_name='ONet', width_multiplier=1.0, fc_units=None):
+		RNet.__init__(self, batch_size, separable=separable, network_name=network_name)
 		self._network_size = 48
-		self._network_name = 'ONet'
+		self._width_layers = ['conv1', 'conv2', 'conv3', 'conv4', 'fc1']
+		self._widths = self._scale_widths(widths or ONet.__default_widths, width_multiplier, fc_units)
 
 	def _setup_basic_network(self, inputs):
 		self._end_points = {}
 
-    		with slim.arg_scope([slim.conv2d],
-                        		activation_fn = prelu,
+    		with slim.arg_scope([slim.conv2d, slim.separable_conv2d],
+                        		activation_fn = self._prelu,
+                        		data_format = self._data_format,
                         		weights_initializer=slim.xavier_initializer(),
                         		biases_initializer=tf.zeros_initializer(),
                         		weights_regularizer=slim.l2_regularizer(0.0005),                        
                         		padding='valid'):
 
 			end_point = 'conv1'
-        		net = slim.conv2d(inputs, num_outputs=32, kernel_size=[3,3], stride=1, scope=end_point)
+        		net = slim.conv2d(self._network_layout(inputs), num_outputs=self._widths[0], kernel_size=[3,3], stride=1, scope=end_point)
 			self._end_points[end_point] = net
 
 			end_point = 'pool1'
-        		net = slim.max_pool2d(net, kernel_size=[3, 3], stride=2, scope=end_point, padding='SAME')
+        		net = slim.max_pool2d(net, kernel_size=[3, 3], stride=2, scope=end_point, padding='SAME', data_format=self._data_format)
 			self._end_points[end_point] = net
 
 			end_point = 'conv2'
-        		net = slim.conv2d(net, num_outputs=64, kernel_size=[3,3], stride=1, scope=end_point)
+        		net = self._conv2d(net, num_outputs=self._widths[1], kernel_size=[3,3], scope=end_point)
 			self._end_points[end_point] = net
 		
 			end_point = 'pool2'
-        		net = slim.max_pool2d(net, kernel_size=[3, 3], stride=2, scope=end_point)
+        		net = slim.max_pool2d(net, kernel_size=[3, 3], stride=2, scope=end_point, data_format=self._data_format)
 			self._end_points[end_point] = net
 
 			end_point = 'conv3'
-        		net = slim.conv2d(net, num_outputs=64, kernel_size=[3,3], stride=1, scope=end_point)
+        		net = self._conv2d(net, num_outputs=self._widths[2], kernel_size=[3,3], scope=end_point)
 			self._end_points[end_point] = net
 
 			end_point = 'pool3'
-        		net = slim.max_pool2d(net, kernel_size=[2, 2], stride=2, scope=end_point, padding='SAME')
+        		net = slim.max_pool2d(net, kernel_size=[2, 2], stride=2, scope=end_point, padding='SAME', data_format=self._data_format)
 			self._end_points[end_point] = net
 
 			end_point = 'conv4'
-        		net = slim.conv2d(net, num_outputs=128, kernel_size=[2,2], stride=1, scope=end_point)
+        		net = self._conv2d(net, num_outputs=self._widths[3], kernel_size=[2,2], scope=end_point)
 			self._end_points[end_point] = net
 
-        		fc_flatten = slim.flatten(net)
+        		fc_flatten = slim.flatten(self._output_layout(net))
 
 			end_point = 'fc1'
-        		fc1 = slim.fully_connected(fc_flatten, num_outputs=256, scope=end_point, activation_fn=prelu)
+        		fc1 = slim.fully_connected(fc_flatten, num_outputs=self._widths[4], scope=end_point, activation_fn=self._prelu)
 			self._end_points[end_point] = fc1
 
         		#batch*2
@@ -29,55 +29,61 @@ import tensorflow as tf
 from tensorflow.contrib import slim
 
 from nets.AbstractFaceDetector import AbstractFaceDetector
-from utils.prelu import prelu
 
 class PNet(AbstractFaceDetector):
 
-	def __init__(self):	
+	__default_widths = [10, 16, 32]
+
+	def __init__(self, widths=None, separable=False, network_name='PNet', width_multiplier=1.0, fc_units=None):	
 		AbstractFaceDetector.__init__(self)	
 		self._network_size = 12
-		self._network_name = 'PNet'	
+		self._network_name = network_name
+		self._separable = separable
+		self._width_layers = ['conv1', 'conv2', 'conv3']
+		self._widths = self._scale_widths(widths or PNet.__default_widths, width_multiplier, fc_units)
 
 	def _setup_basic_network(self, inputs):	
 		self._end_points = {}
 	
-    		with slim.arg_scope([slim.conv2d],
-                        	activation_fn = prelu,
+    		with slim.arg_scope([slim.conv2d, slim.separable_conv2d],
+                        	activation_fn = self._prelu,
+                        	data_format = self._data_format,
                         	weights_initializer = slim.xavier_initializer(),
                         	biases_initializer = tf.zeros_initializer(),
                         	weights_regularizer = slim.l2_regularizer(0.0005), 
                         	padding='valid'):
 
 			end_point = 'conv1'
-        		net = slim.conv2d(inputs, 10, 3, stride=1, scope=end_point)
+        		net = slim.conv2d(self._network_layout(inputs), self._widths[0], 3, stride=1, scope=end_point)
 			self._end_points[end_point] = net
 
 			end_point = 'pool1'
-        		net = slim.max_pool2d(net, kernel_size=[2,2], stride=2, scope=end_point, padding='SAME')
+        		net = slim.max_pool2d(net, kernel_size=[2,2], stride=2, scope=end_point, padding='SAME', data_format=self._data_format)
 			self._end_points[end_point] = net
 
 			end_point = 'conv2'
-        		net = slim.conv2d(net, num_outputs=16, kernel_size=[3,3], stride=1, scope=end_point)
+        		net = self._conv2d(net, num_outputs=self._widths[1], kernel_size=[3,3], scope=end_point)
 			self._end_points[end_point] = net
 
 			end_point = 'conv3'
-        		net = slim.conv2d(net, num_outputs=32, kernel_size=[3,3], stride=1, scope=end_point)
+        		net = self._conv2d(net, num_outputs=self._widths[2], kernel_size=[3,3], scope=end_point)
 			self._end_points[end_point] = net
+			net = self._output_layout(net)
 
         		#batch*H*W*2
 			end_point = 'conv4_1'
-        		conv4_1 = slim.conv2d(net, num_outputs=2, kernel_size=[1,1], stride=1, scope=end_point, activation_fn=tf.nn.softmax)
+        		conv4_1 = slim.conv2d(net, num_outputs=2, kernel_size=[1,1], stride=1, scope=end_point, activation_fn=tf.nn.softmax, data_format='NHWC')
         		#conv4_1 = slim.conv2d(net, num_outputs=1, kernel_size=[1,1], stride=1, scope=end_point, activation_fn=tf.nn.sigmoid)
 			self._end_points[end_point] = conv4_1        
 
         		#batch*H*W*4
 			end_point = 'conv4_2'
-        		bounding_box_predictions = slim.conv2d(net, num_outputs=4, kernel_size=[1,1], stride=1, scope=end_point, activation_fn=None)
+        		bounding_box_predictions = slim.conv2d(net, num_outputs=4, kernel_size=[1,1], stride=1, scope=end_point, activation_fn=None, data_format='NHWC')
 			self._end_points[end_point] = bounding_box_predictions
 
         		#batch*H*W*10
 			end_point = 'conv4_3'
-        		landmark_predictions = slim.conv2d(net, num_outputs=10, kernel_size=[1,1], stride=1, scope=end_point, activation_fn=None)
+        		landmark_predictions = slim.conv2d(net, num_outputs=10, kernel_size=[1,1], stride=1, scope=end_point, activation_fn=None, data_format='NHWC')
 			self._end_points[end_point] = landmark_predictions
 
 			return(conv4_1, bounding_box_predictions, landmark_predictions)
@@ -92,23 +98,31 @@ class PNet(AbstractFaceDetector):
 		return(output_class_probability, output_bounding_box, output_landmarks)
 
 
+	def _setup_inference_graph(self):
+            	self._input_batch = tf.placeholder(tf.float32, name='input_batch')
+            	self._image_width = tf.placeholder(tf.int32, name='image_width')
+            	self._image_height = tf.placeholder(tf.int32, name='image_height')
+            	image_reshape = tf.reshape(self._input_batch, [1, self._image_height, self._image_width, 3])
+
+		convolution_output, bounding_box_predictions, landmark_predictions = self._setup_basic_network(image_reshape)
+
+       		self._output_class_probability = tf.squeeze(convolution_output, axis=0)
+       		self._output_bounding_box = tf.squeeze(bounding_box_predictions, axis=0)
+       		self._output_landmarks = tf.squeeze(landmark_predictions, axis=0)
+		return([self._output_class_probability, self._output_bounding_box, self._output_landmarks])
+
 	def setup_inference_network(self, checkpoint_path):
+		self.load_widths(checkpoint_path)
         	graph = tf.Graph()
         	with graph.as_default():
-            		self._input_batch = tf.placeholder(tf.float32, name='input_batch')
-            		self._image_width = tf.placeholder(tf.int32, name='image_width')
-            		self._image_height = tf.placeholder(tf.int32, name='image_height')
-            		image_reshape = tf.reshape(self._input_batch, [1, self._image_height, self._image_width, 3])
+			self._setup_inference_graph()
 
-			convolution_output, bounding_box_predictions, landmark_predictions = self._setup_basic_network(image_reshape)
-
-       			self._output_class_probability = tf.squeeze(convolution_output, axis=0)
-       			self._output_bounding_box = tf.squeeze(bounding_box_predictions, axis=0)
-       			self._output_landmarks = tf.squeeze(landmark_predictions, axis=0)
-
-			self._session = tf.Session(config=tf.ConfigProto(allow_soft_placement=True, gpu_options=tf.GPUOptions(allow_growth=True)))			
+			self._session = tf.Session(config=self._session_config())			
 			return(self.load_model(self._session, checkpoint_path))
 
+	def _sample_input(self):
+		return(np.zeros((480, 640, 3), dtype=np.float32))
+
 	def detect(self, input_batch):
         	image_height, image_width, _ = input_batch.shape
         	class_probabilities, bounding_boxes = self._session.run([self._output_class_probability, self._output_bounding_box],
@@ -0,0 +1,263 @@
+# MIT License
+# 
+# Copyright (c) 2018
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.core.framework import graph_pb2
+
+from nets.NetworkFactory import NetworkFactory
+
+class QuantizedNetwork(object):
+
+	__data_types = ['uint8', 'int8', 'float16']
+	__output_names = ['class_probability', 'bounding_box_predictions', 'landmark_predictions']
+
+	# Operations whose outputs keep the range of their input, or have a range fixed by the converter.
+	__range_preserving_types = ['Const', 'Placeholder', 'Identity', 'MaxPool', 'Reshape', 'Squeeze', 'Transpose', 'Softmax', 'FakeQuantWithMinMaxVars', 'FakeQuantWithMinMaxArgs']
+	# PReLU as relu(x) + (-alpha) * relu(-x) is fused by the converter, so its inner operations get no range.
+	__prelu_types = ['Relu', 'Neg', 'Mul']
+
+	__maximum_interpreters = 32
+
+	def __init__(self, network_name, model_file_name, batch_size=1):
+		self._network_name = network_name
+		self._network_size = NetworkFactory.network_size(network_name)
+		self._batch_size = batch_size
+
+		with open(model_file_name, 'rb') as model_file:
+			self._model_content = model_file.read()
+
+		# The interpreters are not thread safe, e.g. for tiled proposals on a thread pool.
+		self._lock = threading.Lock()
+		interpreter = tf.lite.Interpreter(model_content=self._model_content)
+		interpreter.allocate_tensors()
+		input_details = interpreter.get_input_details()[0]
+		self._input_index = input_details['index']
+		self._input_type = input_details['dtype']
+		self._input_quantization = input_details['quantization']
+		self._interpreters = OrderedDict([ (tuple(input_details['shape']), interpreter) ])
+
+		output_details = dict( (output_details['name'], output_details) for output_details in interpreter.get_output_details() )
+		self._output_details = [ output_details[output_name] for output_name in QuantizedNetwork.__output_names ]
+
+	@classmethod
+	def data_types(cls):
+		return(cls.__data_types)
+
+	@classmethod
+	def model_file_name(cls, network_name, data_type):
+		return(network_name + '-' + data_type + '.tflite')
+
+	@classmethod
+	def _prelu_input(cls, operation):
+		if( operation.type not in ['Add', 'AddV2'] ):
+			return(None)
+		positive_part = operation.inputs[0].op
+		if( positive_part.type.startswith('FakeQuant') ):
+			positive_part = positive_part.inputs[0].op
+		if( positive_part.type != 'Relu' ):
+			return(None)
+		return(positive_part.inputs[0].op.name)
+
+	@classmethod
+	def _calibrated_graph_def(cls, graph_def, calibration_inputs):
+		# Fake quantization learned inside or after PReLU would prevent the fusion, and the fused PReLU keeps the range of its input.
+		graph = tf.Graph()
+		with graph.as_default():
+			tf.import_graph_def(graph_def, name='')
+		bypassed_nodes = dict( (operation.name, operation.inputs[0].op.name) for operation in graph.get_operations() if operation.type.startswith('FakeQuant') and ( (operation.inputs[0].op.type in cls.__prelu_types) or cls._prelu_input(operation.inputs[0].op) ) )
+		if( bypassed_nodes ):
+			bypassed_graph_def = graph_pb2.GraphDef()
+			bypassed_graph_def.versions.CopyFrom(graph_def.versions)
+			for node in graph_def.node:
+				if( node.name in bypassed_nodes ):
+					continue
+				bypassed_node = bypassed_graph_def.node.add()
+				bypassed_node.CopyFrom(node)
+				bypassed_node.input[:] = [ bypassed_nodes.get(input_name, input_name) for input_name in node.input ]
+			graph_def = tf.graph_util.extract_sub_graph(bypassed_graph_def, cls.__output_names)
+
+		graph = tf.Graph()
+		with graph.as_default():
+			tf.import_graph_def(graph_def, name='')
+
+		# Activations without fake quantization, e.g. all of them after float training, are quantized with calibrated ranges.
+		activations = []
+		for operation in graph.get_operations():
+			if( (operation.type in cls.__range_preserving_types + cls.__prelu_types) or (len(operation.outputs) != 1) or (operation.outputs[0].dtype != tf.float32) ):
+				continue
+			consumer_types = [ consumer.type for consumer in operation.outputs[0].consumers() ]
+			if( consumer_types and all( consumer_type == 'BiasAdd' for consumer_type in consumer_types ) ):
+				continue
+			if( any( consumer_type.startswith('FakeQuant') for consumer_type in consumer_types ) ):
+				continue
+			activations.append(operation.outputs[0])
+
+		with tf.Session(graph=graph) as session:
+			minimum_values = np.zeros(len(activations))
+			maximum_values = np.zeros(len(activations))
+			for calibration_input in calibration_inputs:
+				values = session.run(activations, feed_dict={'input_batch:0': np.expand_dims(calibration_input, 0)})
+				minimum_values = np.minimum(minimum_values, [ value.min() for value in values ])
+				maximum_values = np.maximum(maximum_values, [ value.max() for value in values ])
+		ranges = dict( (activation.op.name, (minimum_value, maximum_value)) for activation, minimum_value, maximum_value in zip(activations, minimum_values, maximum_values) )
+		for operation in graph.get_operations():
+			prelu_input = cls._prelu_input(operation)
+			if( prelu_input in ranges ):
+				ranges[operation.name] = ranges[prelu_input]
+
+		calibrated_graph_def = graph_pb2.GraphDef()
+		calibrated_graph_def.versions.CopyFrom(graph_def.versions)
+		for node in graph_def.node:
+			calibrated_node = calibrated_graph_def.node.add()
+			calibrated_node.CopyFrom(node)
+			calibrated_node.input[:] = [ (input_name + '/calibrated_quant' if input_name in ranges else input_name) for input_name in node.input ]
+		for name, (minimum_value, maximum_value) in ranges.items():
+			node = calibrated_graph_def.node.add()
+			node.name = name + '/calibrated_quant'
+			node.op = 'FakeQuantWithMinMaxArgs'
+			node.input.append(name)
+			node.attr['min'].f = float(minimum_value)
+			node.attr['max'].f = float(maximum_value)
+			node.attr['num_bits'].i = 8
+		return(calibrated_graph_def)
+
+	@classmethod
+	def _convert_fake_quantized(cls, network_name, network_weights, calibration_inputs, quantization_aware):
+		input_shape = (1,) + calibration_inputs[0].shape
+		network = NetworkFactory.network(network_name)
+		network.load_widths(network_weights)
+		graph = tf.Graph()
+		with graph.as_default():
+			input_batch = tf.placeholder(tf.float32, shape=input_shape, name='input_batch')
+			outputs = network._setup_basic_network(input_batch)
+			outputs = [ tf.identity(output, name=output_name) for output, output_name in zip(outputs, cls.__output_names) ]
+			# The evaluation graph has the fake quantization of the training graph, with the ranges learned in the weights.
+			if( quantization_aware ):
+				tf.contrib.quantize.experimental_create_eval_graph(input_graph=graph)
+
+			with tf.Session() as session:
+				if( not network.load_model_weights(session, network_weights) ):
+					return(None)
+				graph_def = tf.graph_util.convert_variables_to_constants(session, graph.as_graph_def(), cls.__output_names)
+
+		graph_def = cls._calibrated_graph_def(graph_def, calibration_inputs)
+		graph = tf.Graph()
+		with graph.as_default():
+			tf.import_graph_def(graph_def, name='')
+			with tf.Session() as session:
+				converter = tf.lite.TFLiteConverter.from_session(session, [ graph.get_tensor_by_name('input_batch:0') ], [ graph.get_tensor_by_name(output_name + ':0') for output_name in cls.__output_names ])
+				converter.inference_type = tf.uint8
+				# Network inputs are (pixel - 127.5) / 128.
+				converter.quantized_input_stats = { 'input_batch': (127.5, 128.0) }
+				return(converter.convert())
+
+	@classmethod
+	def convert(cls, network_name, network_weights, data_type, calibration_inputs, quantization_aware=False):
+		if( data_type not in cls.__data_types ):
+			return(None)
+
+		# Inputs are converted with the calibration shape, and resized to the actual shape at inference time.
+		if( data_type == 'uint8' ):
+			return(cls._convert_fake_quantized(network_name, network_weights, calibration_inputs, quantization_aware))
+
+		input_shape = (1,) + calibration_inputs[0].shape
+		network = NetworkFactory.network(network_name)
+		network.load_widths(network_weights)
+		graph = tf.Graph()
+		with graph.as_default():
+			input_batch = tf.placeholder(tf.float32, shape=input_shape, name='input_batch')
+			outputs = network._setup_basic_network(input_batch)
+			outputs = [ tf.identity(output, name=output_name) for output, output_name in zip(outputs, cls.__output_names) ]
+
+			with tf.Session() as session:
+				if( not network.load_model_weights(session, network_weights) ):
+					return(None)
+
+				converter = tf.lite.TFLiteConverter.from_session(session, [ input_batch ], outputs)
+				converter.optimizations = [ tf.lite.Optimize.DEFAULT ]
+				if( data_type == 'float16' ):
+					converter.target_spec.supported_types = [ tf.lite.constants.FLOAT16 ]
+				else:
+					converter.representative_dataset = lambda: ( [ np.expand_dims(calibration_input, 0).astype(np.float32) ] for calibration_input in calibration_inputs )
+				return(converter.convert())
+
+	def network_size(self):
+		return(self._network_size)
+
+	def network_name(self):
+		return(self._network_name)
+
+	def batch_size(self):
+		return(self._batch_size)
+
+	def _interpreter(self, input_shape):
+		# One interpreter per input shape, so that the pyramid levels of a stream do not reallocate tensors on every call.
+		if( input_shape in self._interpreters ):
+			interpreter = self._interpreters.pop(input_shape)
+		else:
+			interpreter = tf.lite.Interpreter(model_content=self._model_content)
+			interpreter.resize_tensor_input(self._input_index, input_shape)
+			interpreter.allocate_tensors()
+			if( len(self._interpreters) >= QuantizedNetwork.__maximum_interpreters ):
+				self._interpreters.popitem(last=False)
+		self._interpreters[input_shape] = interpreter
+		return(interpreter)
+
+	def _invoke(self, input_batch):
+		if( self._input_type == np.uint8 ):
+			scale, zero_point = self._input_quantization
+			input_batch = np.clip(np.floor(input_batch / scale + zero_point + 0.5), 0, 255).astype(np.uint8)
+		else:
+			input_batch = input_batch.astype(np.float32)
+
+		with self._lock:
+			interpreter = self._interpreter(input_batch.shape)
+			interpreter.set_tensor(self._input_index, input_batch)
+			interpreter.invoke()
+			outputs = [ interpreter.get_tensor(output_details['index']) for output_details in self._output_details ]
+
+		for index, output_details in enumerate(self._output_details):
+			if( output_details['dtype'] == np.uint8 ):
+				scale, zero_point = output_details['quantization']
+				outputs[index] = (outputs[index].astype(np.float32) - zero_point) * scale
+		return(outputs)
+
+	def predict(self, input_batch):
+		outputs = [ [], [], [] ]
+		for start in range(0, input_batch.shape[0], self._batch_size):
+			for output_list, output in zip(outputs, self._invoke(input_batch[start:start + self._batch_size])):
+				output_list.append(output.reshape(output.shape[0], -1))
+		return( [ np.concatenate(output_list, axis=0) for output_list in outputs ] )
+
+	def detect(self, input_batch):
+		if( NetworkFactory.stage(self._network_name) == 'PNet' ):
+			class_probabilities, bounding_boxes, _ = self._invoke(np.expand_dims(input_batch, 0))
+			return( class_probabilities[0], bounding_boxes[0] )
+		else:
+			return( tuple(self.predict(input_batch)) )
@@ -29,15 +29,19 @@ import tensorflow as tf
 from tensorflow.contrib import slim
 
 from nets.AbstractFaceDetector import AbstractFaceDetector
-from utils.prelu import prelu
 
 class RNet(AbstractFaceDetector):
 
-	def __init__(self, batch_size = 1):
+	__default_widths = [28, 48, 64, 128]
+
+	def __init__(self, batch_size = 1, widths=None, separable=False, network_name='RNet', width_multiplier=1.0, fc_units=None):
 		AbstractFaceDetector.__init__(self)
 		self._network_size = 24
-		self._network_name = 'RNet'
+		self._network_name = network_name
+		self._separable = separable
 		self._batch_size = batch_size
+		self._width_layers = ['conv1', 'conv2', 'conv3', 'fc1']
+		self._widths = self._scale_widths(widths or RNet.__default_widths, width_multiplier, fc_units)
 
 	def batch_size(self):
 		return(self._batch_size)
@@ -45,37 +49,38 @@ class RNet(AbstractFaceDetector):
 	def _setup_basic_network(self, inputs):
 		self._end_points = {}
 
-		with slim.arg_scope([slim.conv2d],
-                        	activation_fn = prelu,
+		with slim.arg_scope([slim.conv2d, slim.separable_conv2d],
+                        	activation_fn = self._prelu,
+                        	data_format = self._data_format,
                         	weights_initializer=slim.xavier_initializer(),
                         	biases_initializer=tf.zeros_initializer(),
                         	weights_regularizer=slim.l2_regularizer(0.0005),                        
                         	padding='valid'):
 
 			end_point = 'conv1'
-        		net = slim.conv2d(inputs, num_outputs=28, kernel_size=[3,3], stride=1, scope=end_point)
+        		net = slim.conv2d(self._network_layout(inputs), num_outputs=self._widths[0], kernel_size=[3,3], stride=1, scope=end_point)
 			self._end_points[end_point] = net
 
 			end_point = 'pool1'
-        		net = slim.max_pool2d(net, kernel_size=[3, 3], stride=2, scope=end_point, padding='SAME')
+        		net = slim.max_pool2d(net, kernel_size=[3, 3], stride=2, scope=end_point, padding='SAME', data_format=self._data_format)
 			self._end_points[end_point] = net
 
 			end_point = 'conv2'
-        		net = slim.conv2d(net, num_outputs=48, kernel_size=[3,3], stride=1, scope=end_point)
+        		net = self._conv2d(net, num_outputs=self._widths[1], kernel_size=[3,3], scope=end_point)
 			self._end_points[end_point] = net
 
 			end_point = 'pool2'
-        		net = slim.max_pool2d(net, kernel_size=[3,3], stride=2, scope=end_point)
+        		net = slim.max_pool2d(net, kernel_size=[3,3], stride=2, scope=end_point, data_format=self._data_format)
 			self._end_points[end_point] = net
 
 			end_point = 'conv3'
-        		net = slim.conv2d(net, num_outputs=64, kernel_size=[2,2], stride=1, scope=end_point)
+        		net = self._conv2d(net, num_outputs=self._widths[2], kernel_size=[2,2], scope=end_point)
 			self._end_points[end_point] = net
 
-        		fc_flatten = slim.flatten(net)
+        		fc_flatten = slim.flatten(self._output_layout(net))
 
 			end_point = 'fc1'
-        		fc1 = slim.fully_connected(fc_flatten, num_outputs=128, scope=end_point, activation_fn=prelu)
+        		fc1 = slim.fully_connected(fc_flatten, num_outputs=self._widths[3], scope=end_point, activation_fn=self._prelu)
 			self._end_points[end_point] = fc1
 
         		#batch*2
@@ -98,51 +103,36 @@ class RNet(AbstractFaceDetector):
 	def setup_training_network(self, inputs):
 		return(self._setup_basic_network(inputs))
 
+	def _setup_inference_graph(self):
+            	self._input_batch = tf.placeholder(tf.float32, shape=[None, self.network_size(), self.network_size(), 3], name='input_batch')            		
+            	self._output_class_probability, self._output_bounding_box, self._output_landmarks = self._setup_basic_network(self._input_batch)
+		return([self._output_class_probability, self._output_bounding_box, self._output_landmarks])
+
 	def setup_inference_network(self, checkpoint_path):
+		self.load_widths(checkpoint_path)
         	graph = tf.Graph()
         	with graph.as_default():
-            		self._input_batch = tf.placeholder(tf.float32, shape=[self.batch_size(), self.network_size(), self.network_size(), 3], name='input_batch')            		
-            		self._output_class_probability, self._output_bounding_box, self._output_landmarks = self._setup_basic_network(self._input_batch)
+			self._setup_inference_graph()
 
-            		self._session = tf.Session(config=tf.ConfigProto(allow_soft_placement=True, gpu_options=tf.GPUOptions(allow_growth=True)))
+            		self._session = tf.Session(config=self._session_config())
 			return(self.load_model(self._session, checkpoint_path))
 
+	def _sample_input(self):
+		return(np.zeros((self.batch_size(), self.network_size(), self.network_size(), 3), dtype=np.float32))
+
 	def detect(self, data_batch):
-        	scores = []
-        	batch_size = self.batch_size()
-
-        	minibatch = []
-        	cur = 0
-
-	        n = data_batch.shape[0]
-	        while cur < n:
-	            minibatch.append(data_batch[cur:min(cur + batch_size, n), :, :, :])
-	            cur += batch_size
-
-	        class_probability_list = []
-	        bounding_box_list = []
-	        landmark_list = []
-	        for idx, data in enumerate(minibatch):
-	            m = data.shape[0]
-	            real_size = self.batch_size()
-
-	            if m < batch_size:
-	                keep_inds = np.arange(m)
-
-	                gap = self.batch_size() - m
-	                while gap >= len(keep_inds):
-	                    gap -= len(keep_inds)
-	                    keep_inds = np.concatenate((keep_inds, keep_inds))
-	                if gap != 0:
-	                    keep_inds = np.concatenate((keep_inds, keep_inds[:gap]))
-	                data = data[keep_inds]
-	                real_size = m
-
-	            class_probabilities, bounding_boxes, landmarks = self._session.run([self._output_class_probability, self._output_bounding_box, self._output_landmarks], feed_dict={self._input_batch: data})
-
-	            class_probability_list.append(class_probabilities[:real_size])
-	            bounding_box_list.append(bounding_boxes[:real_size])
-	            landmark_list.append(landmarks[:real_size])
-
-	        return( np.concatenate(class_probability_list, axis=0), np.concatenate(bounding_box_list, axis=0), np.concatenate(landmark_list, axis=0) )
+		batch_size = self.batch_size()
+
+		# The landmark head is stripped from optimized networks that do not use it.
+		outputs = [ output for output in [self._output_class_probability, self._output_bounding_box, self._output_landmarks] if output is not None ]
+		output_lists = [ [] for _ in outputs ]
+		for start in range(0, data_batch.shape[0], batch_size):
+			data = data_batch[start:start + batch_size, :, :, :]
+			for output_list, output in zip(output_lists, self._session.run(outputs, feed_dict={self._input_batch: data})):
+				output_list.append(output)
+
+		results = [ np.concatenate(output_list, axis=0) for output_list in output_lists ]
+		if( self._output_landmarks is None ):
+			results.append(None)
+		return( tuple(results) )
 	
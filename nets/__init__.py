@@ -22,3 +22,5 @@
 
 from nets.NetworkFactory import NetworkFactory
 from nets.FaceDetector import FaceDetector
+from nets.MotionGatedFaceDetector import MotionGatedFaceDetector
+from nets.AdaptiveScalePlanner import AdaptiveScalePlanner
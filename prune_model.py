@@ -0,0 +1,169 @@
+# MIT License
+# 
+# Copyright (c) 2018
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+r"""Prunes the channels of PNet, RNet or ONet.
+
+Channels of every hidden layer are ranked by the L1 norm of their filters and the
+weakest channels are removed. A model directory with the pruned network and the
+unchanged remaining networks is written, so that it can be evaluated with
+compare_models.py and fine-tuned with train_model.py.
+
+Usage:
+```shell
+
+$ python prune_model.py \
+	--network_name=PNet \
+	--pruning_ratio=0.5 \
+	--output_dir=./models/mtcnn/pruned
+
+$ python prune_model.py \
+	--network_name=PNet \
+	--widths=6,12,24 \
+	--output_dir=./models/mtcnn/pruned \
+	--evaluation_image_dir=./data/evaluation
+
+$ python train_model.py \
+	--network_name=PNet \
+	--train_root_dir=./models/mtcnn/pruned \
+	--dataset_root_dir=./data/datasets/mtcnn \
+	--base_learning_rate=0.001 \
+	--max_number_of_epoch=5
+```
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import sys
+import argparse
+
+import numpy as np
+
+from compare_models import read_images, print_comparison
+from nets.FaceDetector import FaceDetector
+from nets.NetworkFactory import NetworkFactory
+
+def _input_slice(weights, keep, previous_weights):
+	if( weights.ndim == 4 ):
+		return(weights[:, :, keep, :])
+	if( previous_weights.ndim == 4 ):
+		# Flattened convolution outputs are ordered by position, then channel.
+		number_of_channels = previous_weights.shape[-1]
+		weights = weights.reshape(-1, number_of_channels, weights.shape[-1])
+		return(weights[:, keep, :].reshape(-1, weights.shape[-1]))
+	return(weights[keep, :])
+
+def prune_weights(network, network_weights, widths):
+	pruned_weights = dict(network_weights)
+	layers = network.width_layers()
+	head_layers = sorted(set( variable_name.split('/')[0] for variable_name in network_weights ) - set(layers))
+
+	for index, (layer, width) in enumerate(zip(layers, widths)):
+		weights = pruned_weights[layer + '/weights']
+		channel_norms = np.sum(np.abs(weights.reshape(-1, weights.shape[-1])), axis=0)
+		keep = np.sort(np.argsort(-channel_norms)[:width])
+
+		pruned_weights[layer + '/weights'] = weights[..., keep]
+		pruned_weights[layer + '/biases'] = pruned_weights[layer + '/biases'][keep]
+		pruned_weights[layer + '/alphas'] = pruned_weights[layer + '/alphas'][keep]
+
+		next_layers = [ layers[index + 1] ] if index + 1 < len(layers) else head_layers
+		for next_layer in next_layers:
+			pruned_weights[next_layer + '/weights'] = _input_slice(pruned_weights[next_layer + '/weights'], keep, weights)
+
+	return(pruned_weights)
+
+def print_complexity(network_name, network, height=0, width=0):
+	number_of_flops, number_of_parameters = network.complexity(height, width)
+	input_size = '%dx%d' % (height or network.network_size(), width or network.network_size())
+	print('%s %-24s %-10s %14d FLOPs %10d parameters' % (network_name, str(network.widths()), input_size, number_of_flops, number_of_parameters))
+
+def parse_arguments(argv):
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--network_name', type=str, help='The name of the network.', default='PNet')
+	parser.add_argument('--model_root_dir', type=str, help='Input model root directory where model weights are saved, or a weight file.', default=None)
+	parser.add_argument('--output_dir', type=str, help='Output model root directory where pruned model weights are saved.', default=None)
+	parser.add_argument('--pruning_ratio', type=float, help='Fraction of channels removed from every hidden layer.', default=0.5)
+	parser.add_argument('--widths', type=str, help='Comma separated layer widths of the pruned network, overrides --pruning_ratio.', default=None)
+	parser.add_argument('--evaluation_image_dir', type=str, help='Input evaluation image directory.', default=None)
+	parser.add_argument('--number_of_images', type=int, help='Maximum number of evaluation images.', default=100)
+	return(parser.parse_args(argv))
+
+def main(args):
+	if( not (args.network_name in ['PNet', 'RNet', 'ONet']) ):
+		raise ValueError('The network name should be either PNet, RNet or ONet.')
+	if(not args.output_dir):
+		raise ValueError('You must supply output directory for storing pruned model weights with --output_dir.')
+	if( (args.pruning_ratio < 0) or (args.pruning_ratio >= 1) ):
+		raise ValueError('The pruning ratio should be in [0, 1).')
+
+	if(args.model_root_dir):
+		model_root_dir = args.model_root_dir
+	else:
+		model_root_dir = NetworkFactory.model_deploy_dir()
+
+	model_weights = FaceDetector.load_weights(model_root_dir)
+	if(not model_weights):
+		raise ValueError('Error loading the models from ' + model_root_dir + '.')
+
+	network = NetworkFactory.network(args.network_name)
+	network.load_widths(model_weights[args.network_name])
+	if(network.separable()):
+		raise ValueError('Depthwise separable networks can not be pruned.')
+	if(args.widths):
+		widths = [ int(width) for width in args.widths.split(',') ]
+	else:
+		widths = [ max(1, int(round(width * (1.0 - args.pruning_ratio)))) for width in network.widths() ]
+	if( (len(widths) != len(network.widths())) or any( (width < 1) or (width > original_width) for width, original_width in zip(widths, network.widths()) ) ):
+		raise ValueError('The widths should be between 1 and ' + str(network.widths()) + '.')
+
+	pruned_network = NetworkFactory.network(args.network_name)
+	pruned_weights = prune_weights(network, model_weights[args.network_name], widths)
+	pruned_network.load_widths(pruned_weights)
+
+	for network_name in ['PNet', 'RNet', 'ONet']:
+		if( network_name == args.network_name ):
+			output_network, output_weights = pruned_network, pruned_weights
+		else:
+			output_network, output_weights = NetworkFactory.network(network_name), model_weights[network_name]
+			output_network.load_widths(output_weights)
+		network_dir = os.path.join(args.output_dir, network_name)
+		if(not os.path.exists(network_dir)):
+			os.makedirs(network_dir)
+		# The step suffix lets the trainers resume from the saved weights.
+		output_network.save_model(output_weights, os.path.join(network_dir, network_name + '-0'))
+	print('Pruned model is saved at ' + args.output_dir + '.')
+
+	print_complexity('Original', network)
+	print_complexity('Pruned  ', pruned_network)
+	if( args.network_name == 'PNet' ):
+		print_complexity('Original', network, 480, 640)
+		print_complexity('Pruned  ', pruned_network, 480, 640)
+
+	if(args.evaluation_image_dir):
+		images = read_images(args.evaluation_image_dir, args.number_of_images)
+		print_comparison(FaceDetector(model_root_dir, model_weights), FaceDetector(args.output_dir), images, 'pruned')
+
+if __name__ == '__main__':
+	main(parse_arguments(sys.argv[1:]))
@@ -0,0 +1,149 @@
+# MIT License
+# 
+# Copyright (c) 2018
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+r"""Quantizes PNet, RNet and ONet with post-training quantization.
+
+The networks are calibrated with the inputs of the float cascade on a local image
+set. The quantized cascade is then compared with the float cascade for recall, box
+IoU, landmark error and detection time.
+
+uint8 models are converted with calibrated fake quantization ranges and run on the
+8-bit kernels of TensorFlow Lite, int8 models are quantized per channel and are more
+accurate. On x86 CPUs with TensorFlow 1.15 neither is faster than the float cascade,
+so check the reported speedup before deploying a quantized model.
+
+Usage:
+```shell
+
+$ python quantize_model.py \
+	--calibration_image_dir=./data/calibration \
+	--output_dir=./models/mtcnn/quantized
+
+$ python quantize_model.py \
+	--model_root_dir=./models/mtcnn/deploy \
+	--calibration_image_dir=./data/calibration \
+	--evaluation_image_dir=./data/evaluation \
+	--output_dir=./models/mtcnn/quantized \
+	--data_type=float16
+```
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import sys
+import argparse
+
+import numpy as np
+
+from compare_models import read_images, print_comparison
+from nets.FaceDetector import FaceDetector
+from nets.NetworkFactory import NetworkFactory
+from nets.QuantizedNetwork import QuantizedNetwork
+
+def calibration_inputs(face_detector, images, calibration_size, number_of_samples):
+	random_state = np.random.RandomState(0)
+
+	inputs = { 'PNet': [], 'RNet': [], 'ONet': [] }
+	for image in images:
+		image_inputs = face_detector.calibration_inputs(image)
+		# PNet is calibrated on fixed size crops of the pyramid levels.
+		for level_image in image_inputs['PNet']:
+			height, width, _ = level_image.shape
+			if( min(height, width) < calibration_size ):
+				continue
+			y = random_state.randint(0, height - calibration_size + 1)
+			x = random_state.randint(0, width - calibration_size + 1)
+			inputs['PNet'].append(level_image[y:y + calibration_size, x:x + calibration_size, :])
+		for network_name in ['RNet', 'ONet']:
+			if( image_inputs[network_name] is not None ):
+				inputs[network_name].extend(image_inputs[network_name])
+
+	for network_name in inputs:
+		if( len(inputs[network_name]) > number_of_samples ):
+			indices = random_state.choice(len(inputs[network_name]), number_of_samples, replace=False)
+			inputs[network_name] = [ inputs[network_name][index] for index in indices ]
+	return(inputs)
+
+def parse_arguments(argv):
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--model_root_dir', type=str, help='Input model root directory where model weights are saved, or a weight file.', default=None)
+	parser.add_argument('--calibration_image_dir', type=str, help='Input calibration image directory.', default=None)
+	parser.add_argument('--evaluation_image_dir', type=str, help='Input evaluation image directory, the calibration images are used when not set.', default=None)
+	parser.add_argument('--network_names', type=str, help='Comma separated PNet, RNet and ONet stage network names, PNet,RNet,ONet by default.', default=None)
+	parser.add_argument('--output_dir', type=str, help='Output directory where quantized models are saved.', default=None)
+	parser.add_argument('--data_type', type=str, choices=QuantizedNetwork.data_types(), help='Quantized data type.', default='uint8')
+	parser.add_argument('--number_of_images', type=int, help='Maximum number of calibration and evaluation images.', default=100)
+	parser.add_argument('--number_of_calibration_samples', type=int, help='Maximum number of calibration samples per network.', default=500)
+	parser.add_argument('--calibration_size', type=int, help='Size of PNet calibration crops.', default=96)
+	return(parser.parse_args(argv))
+
+def main(args):
+	if(not args.calibration_image_dir):
+		raise ValueError('You must supply input calibration image directory with --calibration_image_dir.')
+	if(not args.output_dir):
+		raise ValueError('You must supply output directory for storing quantized models with --output_dir.')
+
+	if(args.model_root_dir):
+		model_root_dir = args.model_root_dir
+	else:
+		model_root_dir = NetworkFactory.model_deploy_dir()
+	network_names = NetworkFactory.cascade_network_names(args.network_names)
+
+	model_weights = FaceDetector.load_weights(model_root_dir, network_names)
+	if(not model_weights):
+		raise ValueError('Error loading the models from ' + model_root_dir + '.')
+	face_detector = FaceDetector(model_root_dir, model_weights, network_names)
+
+	calibration_images = read_images(args.calibration_image_dir, args.number_of_images)
+	if(not calibration_images):
+		raise ValueError('No images found in ' + args.calibration_image_dir + '.')
+	inputs = calibration_inputs(face_detector, calibration_images, args.calibration_size, args.number_of_calibration_samples)
+
+	if(not os.path.exists(args.output_dir)):
+		os.makedirs(args.output_dir)
+
+	for stage, network_name in zip(['PNet', 'RNet', 'ONet'], network_names):
+		if(not inputs[stage]):
+			raise ValueError('No calibration samples found for ' + network_name + '.')
+		model_content = QuantizedNetwork.convert(network_name, model_weights[network_name], args.data_type, inputs[stage])
+		if(not model_content):
+			raise ValueError('Error quantizing ' + network_name + '.')
+
+		model_file_name = os.path.join(args.output_dir, QuantizedNetwork.model_file_name(network_name, args.data_type))
+		with open(model_file_name, 'wb') as model_file:
+			model_file.write(model_content)
+		print(network_name + ' - ' + str(len(inputs[stage])) + ' calibration samples, model is saved at ' + model_file_name + ' - ' + str(len(model_content)) + ' bytes.')
+
+	if(args.evaluation_image_dir):
+		evaluation_images = read_images(args.evaluation_image_dir, args.number_of_images)
+	else:
+		evaluation_images = calibration_images
+
+	quantized_face_detector = FaceDetector(model_root_dir, model_weights, network_names)
+	quantized_face_detector.set_quantized_networks(args.output_dir, args.data_type)
+
+	print_comparison(face_detector, quantized_face_detector, evaluation_images, args.data_type)
+
+if __name__ == '__main__':
+	main(parse_arguments(sys.argv[1:]))
@@ -45,6 +45,37 @@ $ python train_model.py \
 	--dataset_root_dir=./data/datasets/mtcnn \
 	--base_learning_rate=0.01 \
 	--max_number_of_epoch=22
+
+$ python train_model.py \
+	--network_name=ONet \ 
+	--train_root_dir=./data/models/mtcnn/train \
+	--dataset_root_dir=./data/datasets/mtcnn \
+	--base_learning_rate=0.001 \
+	--max_number_of_epoch=2 \
+	--quantize
+
+$ python train_model.py \
+	--network_name=RNetLite \ 
+	--train_root_dir=./data/models/mtcnn/train \
+	--dataset_root_dir=./data/datasets/mtcnn \
+	--base_learning_rate=0.01 \
+	--max_number_of_epoch=22
+
+$ python train_model.py \
+	--network_name=RNetStudent \ 
+	--train_root_dir=./data/models/mtcnn/train \
+	--dataset_root_dir=./data/datasets/mtcnn \
+	--teacher_model_root_dir=./models/mtcnn/deploy \
+	--base_learning_rate=0.01 \
+	--max_number_of_epoch=22
+
+$ python train_model.py \
+	--network_name=PNet \ 
+	--train_root_dir=./data/models/mtcnn/train \
+	--dataset_root_dir=./data/datasets/mtcnn \
+	--dataset_format=memmap \
+	--base_learning_rate=0.01 \
+	--max_number_of_epoch=30
 ```
 """
 
@@ -58,23 +89,29 @@ import argparse
 
 from trainers.SimpleNetworkTrainer import SimpleNetworkTrainer
 from trainers.HardNetworkTrainer import HardNetworkTrainer
+from trainers.DistillationNetworkTrainer import DistillationNetworkTrainer
 
+from trainers.AbstractNetworkTrainer import AbstractNetworkTrainer
 from nets.NetworkFactory import NetworkFactory
 
 def parse_arguments(argv):
 	parser = argparse.ArgumentParser()
 	parser.add_argument('--network_name', type=str, help='The name of the network.', default='PNet')  
 	parser.add_argument('--dataset_root_dir', type=str, help='The directory where the dataset files are stored.', default=None)
+	parser.add_argument('--dataset_format', type=str, choices=AbstractNetworkTrainer.dataset_formats(), help='Read the dataset from TensorFlow files or from memory-mapped arrays.', default='tensorflow')
 	parser.add_argument('--train_root_dir', type=str, help='Input train root directory where model weights are saved.', default=None)
 	parser.add_argument('--base_learning_rate', type=float, help='Initial learning rate.', default=0.01)
 	parser.add_argument('--max_number_of_epoch', type=int, help='The maximum number of training steps.', default=5)
 	parser.add_argument('--log_every_n_steps', type=int, help='The frequency with which logs are print.', default=200)
+	parser.add_argument('--quantize', action='store_true', help='Train with quantization simulation in a quantized subdirectory of the network and export a uint8 model.')
+	parser.add_argument('--teacher_model_root_dir', type=str, help='Input teacher model root directory, trains the network by distillation when set.', default=None)
+	parser.add_argument('--teacher_network_name', type=str, help='The name of the teacher network, the network of the same stage when not set.', default=None)
 
 	return(parser.parse_args(argv))
 
 def main(args):
-	if( not (args.network_name in ['PNet', 'RNet', 'ONet']) ):
-		raise ValueError('The network name should be either PNet, RNet or ONet.')
+	if( not (args.network_name in NetworkFactory.network_names()) ):
+		raise ValueError('The network name should be one of ' + ', '.join(NetworkFactory.network_names()) + '.')
 
 	if(not args.dataset_root_dir):
 		raise ValueError('You must supply input dataset directory with --dataset_root_dir.')
@@ -84,12 +121,15 @@ def main(args):
 	else:
 		train_root_dir = NetworkFactory.model_train_dir()
 
-	if(args.network_name == 'PNet'):
+	if(args.teacher_model_root_dir):
+		trainer = DistillationNetworkTrainer(args.network_name, args.teacher_model_root_dir, args.teacher_network_name)
+	elif(NetworkFactory.stage(args.network_name) == 'PNet'):
 		trainer = SimpleNetworkTrainer(args.network_name)
 	else:
 		trainer = HardNetworkTrainer(args.network_name)
+	trainer.set_dataset_format(args.dataset_format)
 		
-	status = trainer.train(args.network_name, args.dataset_root_dir, train_root_dir, args.base_learning_rate, args.max_number_of_epoch, args.log_every_n_steps)
+	status = trainer.train(args.network_name, args.dataset_root_dir, train_root_dir, args.base_learning_rate, args.max_number_of_epoch, args.log_every_n_steps, args.quantize)
 	if(status):
 		print(args.network_name + ' - network is trained and weights are generated at ' + train_root_dir)
 	else:
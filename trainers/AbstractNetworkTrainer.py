@@ -29,12 +29,16 @@ from easydict import EasyDict as edict
 
 from nets.NetworkFactory import NetworkFactory
 from datasets.TensorFlowDataset import TensorFlowDataset
+from datasets.MemmapDataset import MemmapDataset
 
 class AbstractNetworkTrainer(object):
 
+	__dataset_formats = ['tensorflow', 'memmap']
+
 	def __init__(self, network_name):
 		self._network = NetworkFactory.network(network_name)
 		self._number_of_samples = 0
+		self._dataset_format = 'tensorflow'
 		self._config = edict()
 
 		self._batch_size = 384
@@ -46,21 +50,46 @@ class AbstractNetworkTrainer(object):
 		self._config.EPS = 1e-14
 		self._config.LR_EPOCH = [6,16,20]
 
+		self._config.QUANTIZE_DELAY = 0
+		self._config.QUANTIZE_CALIBRATION_SAMPLES = 256
+		self._config.QUANTIZE_EVALUATION_SAMPLES = 2048
+
 	def network_name(self):
 		return(self._network.network_name())
 
 	def network_size(self):
 		return(self._network.network_size())
+
+	@classmethod
+	def dataset_formats(cls):
+		return(AbstractNetworkTrainer.__dataset_formats)
+
+	def dataset_format(self):
+		return(self._dataset_format)
+
+	def set_dataset_format(self, dataset_format):
+		if( not (dataset_format in AbstractNetworkTrainer.__dataset_formats) ):
+			return(False)
+		self._dataset_format = dataset_format
+		return(True)
 		
 	def dataset_dir(self, dataset_root_dir):
-		dataset_dir = os.path.join(dataset_root_dir, self.network_name())
+		dataset_dir = os.path.join(dataset_root_dir, NetworkFactory.stage(self.network_name()))
 		tensorflow_dir = os.path.join(dataset_dir, 'tensorflow')
 		return(tensorflow_dir)
 
+	def memmap_dir(self, dataset_root_dir):
+		dataset_dir = os.path.join(dataset_root_dir, NetworkFactory.stage(self.network_name()))
+		return(MemmapDataset.memmap_dir(dataset_dir))
+
 	def network_train_dir(self, train_root_dir):
 		network_train_dir = os.path.join(train_root_dir, self.network_name())
 		return(network_train_dir)
 
+	def quantized_train_dir(self, train_root_dir):
+		quantized_train_dir = os.path.join(self.network_train_dir(train_root_dir), 'quantized')
+		return(quantized_train_dir)
+
 	def _positive_file_name(self, dataset_dir):
 		positive_file_name = TensorFlowDataset.tensorflow_file_name(dataset_dir, 'positive')
 		return(positive_file_name)
@@ -77,6 +106,6 @@ class AbstractNetworkTrainer(object):
 		image_list_file_name = TensorFlowDataset.tensorflow_file_name(dataset_dir, 'image_list')
 		return(image_list_file_name)
 
-	def train(self, network_name, dataset_root_dir, train_root_dir, base_learning_rate, max_number_of_epoch, log_every_n_steps):
+	def train(self, network_name, dataset_root_dir, train_root_dir, base_learning_rate, max_number_of_epoch, log_every_n_steps, quantize=False):
 		raise NotImplementedError('Must be implemented by the subclass.')
 
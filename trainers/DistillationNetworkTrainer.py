@@ -0,0 +1,112 @@
+# MIT License
+# 
+# Copyright (c) 2018
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import tensorflow as tf
+
+from trainers.SimpleNetworkTrainer import SimpleNetworkTrainer
+from trainers.HardNetworkTrainer import HardNetworkTrainer
+
+from nets.NetworkFactory import NetworkFactory
+from nets.FaceDetector import FaceDetector
+
+from losses.distillation_loss import distillation_loss
+
+class DistillationNetworkTrainer(HardNetworkTrainer):
+
+	def __init__(self, network_name='RNetStudent', teacher_model_root_dir=None, teacher_network_name=None):	
+		HardNetworkTrainer.__init__(self, network_name)	
+
+		if( teacher_network_name ):
+			self._teacher_network_name = teacher_network_name
+		else:
+			self._teacher_network_name = NetworkFactory.stage(network_name)
+
+		if( teacher_model_root_dir ):
+			self._teacher_model_root_dir = teacher_model_root_dir
+		else:
+			self._teacher_model_root_dir = NetworkFactory.model_deploy_dir()
+
+		self._config.DISTILLATION_RATIO = 1.0
+		self._teacher_session = None
+
+	def teacher_network_name(self):
+		return(self._teacher_network_name)
+
+	def _read_data(self, dataset_root_dir):
+		if( NetworkFactory.stage(self.network_name()) == 'PNet' ):
+			return(SimpleNetworkTrainer._read_data(self, dataset_root_dir))
+		else:
+			return(HardNetworkTrainer._read_data(self, dataset_root_dir))
+
+	def _setup_teacher(self):
+		if( NetworkFactory.stage(self._teacher_network_name) != NetworkFactory.stage(self.network_name()) ):
+			return(False)
+
+		model_weights = FaceDetector.load_weights(self._teacher_model_root_dir, [ self._teacher_network_name ])
+		if( not model_weights ):
+			return(False)
+		teacher_weights = model_weights[self._teacher_network_name]
+
+		# The teacher runs in its own graph, so its variables do not clash with the student.
+		teacher = NetworkFactory.network(self._teacher_network_name)
+		teacher.load_widths(teacher_weights)
+		graph = tf.Graph()
+		with graph.as_default():
+			image_size = teacher.network_size()
+			self._teacher_input_image = tf.placeholder(tf.float32, shape=[None, image_size, image_size, 3], name='input_image')
+			self._teacher_outputs = teacher.setup_training_network(self._teacher_input_image)
+			self._teacher_session = tf.Session()
+			return(teacher.load_model(self._teacher_session, teacher_weights))
+
+	def _auxiliary_loss(self, target_label, output_class_probability, output_bounding_box, output_landmarks):
+		self._teacher_class_probability = tf.placeholder(tf.float32, shape=[self._batch_size, 2], name='teacher_class_probability')
+		self._teacher_bounding_box = tf.placeholder(tf.float32, shape=[self._batch_size, 4], name='teacher_bounding_box')
+		self._teacher_landmarks = tf.placeholder(tf.float32, shape=[self._batch_size, 10], name='teacher_landmarks')
+
+		class_loss_op, bounding_box_loss_op, landmark_loss_op = distillation_loss(output_class_probability, output_bounding_box, output_landmarks, self._teacher_class_probability, self._teacher_bounding_box, self._teacher_landmarks, target_label)
+		tf.summary.scalar("distillation_class_loss", class_loss_op)
+		tf.summary.scalar("distillation_bounding_box_loss", bounding_box_loss_op)
+		tf.summary.scalar("distillation_landmark_loss", landmark_loss_op)
+
+		class_loss_ratio, bbox_loss_ratio, landmark_loss_ratio = NetworkFactory.loss_ratio(self.network_name())
+		return( self._config.DISTILLATION_RATIO * (class_loss_ratio*class_loss_op + bbox_loss_ratio*bounding_box_loss_op + landmark_loss_ratio*landmark_loss_op) )
+
+	def _auxiliary_feed_dict(self, image_batch_array):
+		teacher_class_probability, teacher_bounding_box, teacher_landmarks = self._teacher_session.run(self._teacher_outputs, feed_dict={self._teacher_input_image: image_batch_array})
+		return({
+			self._teacher_class_probability: teacher_class_probability,
+			self._teacher_bounding_box: teacher_bounding_box,
+			self._teacher_landmarks: teacher_landmarks
+			})
+
+	def train(self, network_name, dataset_root_dir, train_root_dir, base_learning_rate, max_number_of_epoch, log_every_n_steps, quantize=False):
+		if( not self._setup_teacher() ):
+			print('Error loading the teacher network ' + self._teacher_network_name + ' from ' + self._teacher_model_root_dir + '.')
+			return(False)
+
+		status = HardNetworkTrainer.train(self, network_name, dataset_root_dir, train_root_dir, base_learning_rate, max_number_of_epoch, log_every_n_steps, quantize)
+		self._teacher_session.close()
+		return(status)
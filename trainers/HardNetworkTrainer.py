@@ -29,6 +29,7 @@ import tensorflow as tf
 
 from trainers.SimpleNetworkTrainer import SimpleNetworkTrainer
 from datasets.TensorFlowDataset import TensorFlowDataset
+from datasets.MemmapDataset import MemmapDataset
 
 
 class HardNetworkTrainer(SimpleNetworkTrainer):
@@ -59,11 +60,18 @@ class HardNetworkTrainer(SimpleNetworkTrainer):
 
         	batch_sizes = [positive_batch_size, part_batch_size, negative_batch_size, landmark_batch_size]
 		
+		image_size = self.network_size()
+		if( self.dataset_format() == 'memmap' ):
+			memmap_dir = self.memmap_dir(dataset_root_dir)
+			memmap_file_names = [ MemmapDataset.memmap_file_name(memmap_dir, name) for name in ['positive', 'part', 'negative', 'image_list'] ]
+			self._number_of_samples = sum( MemmapDataset.number_of_records(memmap_file_name) for memmap_file_name in memmap_file_names )
+			memmap_dataset = MemmapDataset()
+			return(memmap_dataset.read_memmap_files(memmap_file_names, batch_sizes, image_size))
+
 		self._number_of_samples = 0
         	for d in tensorflow_file_names:
-            		self._number_of_samples += sum(1 for _ in tf.python_io.tf_record_iterator(d))
+            		self._number_of_samples += TensorFlowDataset.number_of_records(d)
 
-		image_size = self.network_size()
 		tensorflow_dataset = TensorFlowDataset()
 		return(tensorflow_dataset.read_tensorflow_files(tensorflow_file_names, batch_sizes, image_size))
 
@@ -34,8 +34,10 @@ from datetime import datetime
 
 from trainers.AbstractNetworkTrainer import AbstractNetworkTrainer
 from datasets.TensorFlowDataset import TensorFlowDataset
+from datasets.MemmapDataset import MemmapDataset
 
 from nets.NetworkFactory import NetworkFactory
+from nets.QuantizedNetwork import QuantizedNetwork
 
 from losses.class_loss_ohem import class_loss_ohem
 from losses.bounding_box_loss_ohem import bounding_box_loss_ohem
@@ -87,23 +89,94 @@ class SimpleNetworkTrainer(AbstractNetworkTrainer):
     		accuracy_op = tf.reduce_mean(tf.cast(tf.equal(label_picked,pred_picked),tf.float32))
     		return accuracy_op
 
+	def _auxiliary_loss(self, target_label, output_class_probability, output_bounding_box, output_landmarks):
+		return(None)
+
+	def _auxiliary_feed_dict(self, image_batch_array):
+		return({})
+
 	def _read_data(self, dataset_root_dir):
+		if( self.dataset_format() == 'memmap' ):
+			memmap_file_name = MemmapDataset.memmap_file_name(self.memmap_dir(dataset_root_dir), 'image_list')
+			self._number_of_samples = MemmapDataset.number_of_records(memmap_file_name)
+			memmap_dataset = MemmapDataset()
+			return(memmap_dataset.read_memmap_file(memmap_file_name, self._batch_size, self.network_size()))
+
 		dataset_dir = self.dataset_dir(dataset_root_dir)		
 		tensorflow_file_name = self._image_list_file_name(dataset_dir)
 		
 		self._number_of_samples = 0
-		self._number_of_samples = sum(1 for _ in tf.python_io.tf_record_iterator(tensorflow_file_name))
+		self._number_of_samples = TensorFlowDataset.number_of_records(tensorflow_file_name)
 		
 		image_size = self.network_size()
 		tensorflow_dataset = TensorFlowDataset()
 		return(tensorflow_dataset.read_tensorflow_file(tensorflow_file_name, self._batch_size, image_size))
 
-	def train(self, network_name, dataset_root_dir, train_root_dir, base_learning_rate, max_number_of_epoch, log_every_n_steps):
+	def _network_weights(self):
+		variables = tf.global_variables()
+		return(dict( (variable.op.name, value) for variable, value in zip(variables, self._session.run(variables)) ))
+
+	def _predict(self, network_weights, images):
+		network = NetworkFactory.network(self.network_name())
+		network.load_widths(network_weights)
+		graph = tf.Graph()
+		with graph.as_default():
+			input_image = tf.placeholder(tf.float32, shape=(None,) + images.shape[1:], name='input_image')
+			outputs = network.setup_training_network(input_image)
+			with tf.Session() as session:
+				network.load_model_weights(session, network_weights)
+				return(session.run(outputs, feed_dict={input_image: images}))
+
+	def _evaluate(self, outputs, label_batch, bbox_batch, landmark_batch):
+		class_probabilities, bounding_boxes, landmarks = outputs
+		class_indexes = np.where(label_batch >= 0)[0]
+		bbox_indexes = np.where(np.abs(label_batch) == 1)[0]
+		landmark_indexes = np.where(label_batch == -2)[0]
+
+		accuracy = np.mean(np.argmax(class_probabilities[class_indexes], axis=1) == label_batch[class_indexes]) if class_indexes.size else 0.0
+		bbox_error = np.mean(np.square(bounding_boxes[bbox_indexes] - bbox_batch[bbox_indexes])) if bbox_indexes.size else 0.0
+		landmark_error = np.mean(np.square(landmarks[landmark_indexes] - landmark_batch[landmark_indexes])) if landmark_indexes.size else 0.0
+		return(accuracy, bbox_error, landmark_error)
+
+	def _export_quantized_model(self, quantized_train_dir, data_batches, float_weights):
+		batches = [ self._session.run(data_batches) for _ in range(int(np.ceil(self._config.QUANTIZE_EVALUATION_SAMPLES / self._batch_size))) ]
+		image_batch, label_batch, bbox_batch, landmark_batch = [ np.concatenate(arrays, axis=0) for arrays in zip(*batches) ]
+
+		# The learned fake quantization ranges are kept, only the ranges the training graph does not simulate are calibrated.
+		network_weights = self._network_weights()
+		model_content = QuantizedNetwork.convert(self.network_name(), network_weights, 'uint8', list(image_batch[:self._config.QUANTIZE_CALIBRATION_SAMPLES]), quantization_aware=True)
+		if( not model_content ):
+			return(False)
+		model_file_name = os.path.join(quantized_train_dir, QuantizedNetwork.model_file_name(self.network_name(), 'uint8'))
+		with open(model_file_name, 'wb') as model_file:
+			model_file.write(model_content)
+		print( 'Quantized model is saved at %s.' %( model_file_name ) )
+
+		quantized_network = QuantizedNetwork(self.network_name(), model_file_name, self._batch_size)
+		results = []
+		if( float_weights ):
+			results.append(('float32', self._predict(float_weights, image_batch)))
+		results.append(('quantization-aware float32', self._predict(network_weights, image_batch)))
+		results.append(('quantization-aware uint8', quantized_network.predict(image_batch)))
+
+		print( '%-28s %10s %12s %16s' %( 'model', 'accuracy', 'bbox error', 'landmark error' ) )
+		for model_name, outputs in results:
+			print( '%-28s %10.4f %12.6f %16.6f' %( (model_name,) + self._evaluate(outputs, label_batch, bbox_batch, landmark_batch) ) )
+		return(True)
+
+	def train(self, network_name, dataset_root_dir, train_root_dir, base_learning_rate, max_number_of_epoch, log_every_n_steps, quantize=False):
 		network_train_dir = self.network_train_dir(train_root_dir)
-		if(not os.path.exists(network_train_dir)):
-			os.makedirs(network_train_dir)
+		# Quantization-aware checkpoints are kept apart from the float checkpoints they start from.
+		if( quantize ):
+			checkpoint_dir = self.quantized_train_dir(train_root_dir)
+		else:
+			checkpoint_dir = network_train_dir
+		if(not os.path.exists(checkpoint_dir)):
+			os.makedirs(checkpoint_dir)
 		
 		image_size = self.network_size()	
+		# Pruned models are fine-tuned with the widths of their checkpoint.
+		self._network.load_widths(network_train_dir)
 	
 		image_batch, label_batch, bbox_batch, landmark_batch = self._read_data(dataset_root_dir)		
 
@@ -123,7 +196,15 @@ class SimpleNetworkTrainer(AbstractNetworkTrainer):
 		class_accuracy_op = self._calculate_accuracy(output_class_probability, target_label)
 		L2_loss_op = tf.add_n(tf.losses.get_regularization_losses())
 
-		train_op, learning_rate_op = self._train_model(base_learning_rate, class_loss_ratio*class_loss_op + bbox_loss_ratio*bounding_box_loss_op + landmark_loss_ratio*landmark_loss_op + L2_loss_op, self._number_of_samples)
+		if( quantize ):
+			tf.contrib.quantize.experimental_create_training_graph(input_graph=tf.get_default_graph(), quant_delay=self._config.QUANTIZE_DELAY)
+
+		loss_op = class_loss_ratio*class_loss_op + bbox_loss_ratio*bounding_box_loss_op + landmark_loss_ratio*landmark_loss_op + L2_loss_op
+		auxiliary_loss_op = self._auxiliary_loss(target_label, output_class_probability, output_bounding_box, output_landmarks)
+		if( auxiliary_loss_op is not None ):
+			loss_op = loss_op + auxiliary_loss_op
+
+		train_op, learning_rate_op = self._train_model(base_learning_rate, loss_op, self._number_of_samples)
 
     		init = tf.global_variables_initializer()
     		self._session = tf.Session()
@@ -137,7 +218,7 @@ class SimpleNetworkTrainer(AbstractNetworkTrainer):
     		tf.summary.scalar("class_accuracy",class_accuracy_op)
     		summary_op = tf.summary.merge_all()
 
-    		logs_dir = os.path.join(network_train_dir, "logs")
+    		logs_dir = os.path.join(checkpoint_dir, "logs")
 		if(not os.path.exists(logs_dir)):
 			os.makedirs(logs_dir)
 
@@ -151,12 +232,24 @@ class SimpleNetworkTrainer(AbstractNetworkTrainer):
     		epoch = 0
 
 		global_step = 0
-		if( self._network.load_model(self._session, network_train_dir) ):
+		float_weights = None
+		restore_dir = network_train_dir
+		if( quantize ):
+			float_weights = self._network.load_weights(network_train_dir)
+			if( tf.train.latest_checkpoint(checkpoint_dir) ):
+				restore_dir = checkpoint_dir
+		# Weight exports such as prune_model.py output are saved at step 0, without optimizer slots.
+		restore_path = tf.train.latest_checkpoint(restore_dir)
+		is_weight_export = bool(restore_path) and os.path.basename(restore_path).endswith('-0')
+		# Quantization ranges and optimizer slots missing from float or exported checkpoints keep their initial values, any other checkpoint is restored strictly.
+		if( self._network.load_model(self._session, restore_dir, allow_missing=(quantize or is_weight_export)) ):
 			model_path = self._network.model_path()		
 			print( 'Model is restored from %s.' %( model_path ) )
+			if( self._network.missing_variables() ):
+				print( 'Variables missing from the checkpoint keep their initial values - %s.' %( ', '.join(self._network.missing_variables()) ) )
 			global_step = int(os.path.basename(model_path).split('-')[1])
 		
-		network_train_file_name = os.path.join(network_train_dir, self.network_name())	
+		network_train_file_name = os.path.join(checkpoint_dir, self.network_name())	
     		self._session.graph.finalize()    
 
     		try:
@@ -169,24 +262,20 @@ class SimpleNetworkTrainer(AbstractNetworkTrainer):
             			image_batch_array, label_batch_array, bbox_batch_array, landmark_batch_array = self._session.run([image_batch, label_batch, bbox_batch, landmark_batch])
             			image_batch_array, landmark_batch_array = self._random_flip_images(image_batch_array, label_batch_array, landmark_batch_array)
 
-             			_, _, summary = self._session.run(
-							[train_op, learning_rate_op ,summary_op], 
-							feed_dict={
-								input_image:image_batch_array, 
-								target_label:label_batch_array, 
-								target_bounding_box:bbox_batch_array, 
-								target_landmarks:landmark_batch_array
-								})
+				feed_dict = {
+						input_image:image_batch_array, 
+						target_label:label_batch_array, 
+						target_bounding_box:bbox_batch_array, 
+						target_landmarks:landmark_batch_array
+						}
+				feed_dict.update(self._auxiliary_feed_dict(image_batch_array))
+
+             			_, _, summary = self._session.run([train_op, learning_rate_op ,summary_op], feed_dict=feed_dict)
             
             			if( (step+1) % log_every_n_steps == 0 ):
                 			current_class_loss, current_bbox_loss, current_landmark_loss, current_L2_loss, current_lr, current_accuracy = self._session.run(
 							[class_loss_op, bounding_box_loss_op, landmark_loss_op, L2_loss_op, learning_rate_op, class_accuracy_op],
-							feed_dict={
-								input_image:image_batch_array, 
-								target_label:label_batch_array, 
-								target_bounding_box:bbox_batch_array, 
-								target_landmarks: landmark_batch_array
-								})                
+							feed_dict=feed_dict)                
                 			print("%s - step - %d accuracy - %3f, class loss - %4f, bbox loss - %4f, landmark loss - %4f, L2 loss - %4f, lr - %f " 
 						% (datetime.now(), step+1, current_accuracy, current_class_loss, current_bbox_loss, current_landmark_loss, current_L2_loss, current_lr))
 
@@ -196,6 +285,9 @@ class SimpleNetworkTrainer(AbstractNetworkTrainer):
                 			epoch = epoch + 1
                 			current_step = 0
                 			saver.save(self._session, network_train_file_name, global_step=(global_step + epoch))            			
+
+			if( quantize ):
+				self._export_quantized_model(checkpoint_dir, [image_batch, label_batch, bbox_batch, landmark_batch], float_weights)
 		except tf.errors.OutOfRangeError:
        			print("Error")
 		finally:
@@ -54,16 +54,12 @@ class BBox(object):
         return np.asarray([x, y])
 
     def reprojectLandmark(self, landmark):
-        p = np.zeros((len(landmark), 2))
-        for i in range(len(landmark)):
-            p[i] = self.reproject(landmark[i])
-        return p
+        landmark = np.asarray(landmark, dtype=np.float64)
+        return np.asarray([self.x, self.y], dtype=np.float64) + np.asarray([self.w, self.h], dtype=np.float64) * landmark
 
     def projectLandmark(self, landmark):
-        p = np.zeros((len(landmark), 2))
-        for i in range(len(landmark)):
-            p[i] = self.project(landmark[i])
-        return p
+        landmark = np.asarray(landmark, dtype=np.float64)
+        return (landmark - np.asarray([self.x, self.y], dtype=np.float64)) / np.asarray([self.w, self.h], dtype=np.float64)
 
     def subBBox(self, leftR, rightR, topR, bottomR):
         leftDelta = self.w * leftR
@@ -0,0 +1,138 @@
+# MIT License
+# 
+# Copyright (c) 2018
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+
+from utils.BBox import BBox
+from utils.IoU import IoU_matrix
+from utils.convert_to_square import convert_to_square
+
+class BBoxArray(object):
+    # N boxes as one N x 4 array of left, top, right and bottom, with the BBox operations applied to all of them.
+
+    __slots__ = ('_boxes',)
+
+    def __init__(self, boxes):
+        boxes = np.asarray(boxes)
+        if not (np.issubdtype(boxes.dtype, np.integer) or np.issubdtype(boxes.dtype, np.floating)):
+            boxes = boxes.astype(np.float64)
+        self._boxes = boxes.reshape(-1, 4)
+
+    @classmethod
+    def from_array(cls, boxes):
+        # Keeps the coordinates of detector style N x 5 or N x 15 arrays.
+        return BBoxArray(np.asarray(boxes)[:, 0:4])
+
+    def __getstate__(self):
+        return (self._boxes,)
+
+    def __setstate__(self, state):
+        self._boxes, = state
+
+    def __len__(self):
+        return len(self._boxes)
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return BBox(self._boxes[index])
+        return BBoxArray(self._boxes[index])
+
+    def boxes(self):
+        return self._boxes
+
+    @property
+    def left(self):
+        return self._boxes[:, 0]
+
+    @property
+    def top(self):
+        return self._boxes[:, 1]
+
+    @property
+    def right(self):
+        return self._boxes[:, 2]
+
+    @property
+    def bottom(self):
+        return self._boxes[:, 3]
+
+    @property
+    def x(self):
+        return self._boxes[:, 0]
+
+    @property
+    def y(self):
+        return self._boxes[:, 1]
+
+    @property
+    def w(self):
+        return self._boxes[:, 2] - self._boxes[:, 0]
+
+    @property
+    def h(self):
+        return self._boxes[:, 3] - self._boxes[:, 1]
+
+    def _broadcast(self, values, points):
+        # Shapes per box values as (N, 1, ..., 2) against points of shape (N, ..., 2).
+        return values.reshape((len(self._boxes),) + (1,) * (points.ndim - 2) + (2,))
+
+    def project(self, points):
+        points = np.asarray(points, dtype=np.float64)
+        origin = self._broadcast(np.stack([self.x, self.y], axis=1).astype(np.float64), points)
+        size = self._broadcast(np.stack([self.w, self.h], axis=1).astype(np.float64), points)
+        return (points - origin) / size
+
+    def reproject(self, points):
+        points = np.asarray(points, dtype=np.float64)
+        origin = self._broadcast(np.stack([self.x, self.y], axis=1).astype(np.float64), points)
+        size = self._broadcast(np.stack([self.w, self.h], axis=1).astype(np.float64), points)
+        return origin + size * points
+
+    def projectLandmark(self, landmarks):
+        return self.project(landmarks)
+
+    def reprojectLandmark(self, landmarks):
+        return self.reproject(landmarks)
+
+    def expand(self, scale=0.05):
+        delta_w = np.trunc(self.w * scale)
+        delta_h = np.trunc(self.h * scale)
+        return BBoxArray(np.stack([self.left - delta_w, self.top - delta_h, self.right + delta_w, self.bottom + delta_h], axis=1))
+
+    def subBBox(self, leftR, rightR, topR, bottomR):
+        left = self.left + self.w * leftR
+        right = self.left + self.w * rightR
+        top = self.top + self.h * topR
+        bottom = self.top + self.h * bottomR
+        return BBoxArray(np.stack([left, top, right, bottom], axis=1))
+
+    def IoU(self, boxes):
+        if isinstance(boxes, BBoxArray):
+            boxes = boxes.boxes()
+        return IoU_matrix(self._boxes, boxes)
+
+    def square(self):
+        return BBoxArray(convert_to_square(self._boxes.astype(np.float64)))
@@ -0,0 +1,115 @@
+# MIT License
+# 
+# Copyright (c) 2018
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import time
+import multiprocessing
+from Queue import Empty
+
+import numpy as np
+
+class FrameRingBuffer(object):
+
+    def __init__(self, number_of_slots, height, width, channels=3):
+        self._number_of_slots = number_of_slots
+        self._frame_shape = (height, width, channels)
+
+        self._frame_buffer = multiprocessing.RawArray('B', number_of_slots * height * width * channels)
+        self._frame_indexes = multiprocessing.RawArray('l', number_of_slots)
+        self._timestamps = multiprocessing.RawArray('d', number_of_slots)
+        self._frames = None
+
+        self._free_slots = multiprocessing.Queue()
+        for slot in range(number_of_slots):
+            self._free_slots.put(slot)
+        self._ready_slots = multiprocessing.Queue()
+        self._results = multiprocessing.Queue()
+
+    def number_of_slots(self):
+        return(self._number_of_slots)
+
+    def frame_shape(self):
+        return(self._frame_shape)
+
+    def frame(self, slot):
+        if( self._frames is None ):
+            self._frames = np.frombuffer(self._frame_buffer, dtype=np.uint8).reshape((self._number_of_slots,) + self._frame_shape)
+        return(self._frames[slot])
+
+    def acquire(self, block=True, timeout=None):
+        try:
+            return(self._free_slots.get(block, timeout))
+        except Empty:
+            return(None)
+
+    def publish(self, slot, frame_index, timestamp=None):
+        self._frame_indexes[slot] = frame_index
+        self._timestamps[slot] = time.time() if timestamp is None else timestamp
+        self._ready_slots.put(slot)
+
+    def put(self, frame, frame_index, timestamp=None, block=True):
+        slot = self.acquire(block)
+        if( slot is None ):
+            return(False)
+        self.frame(slot)[...] = frame
+        self.publish(slot, frame_index, timestamp)
+        return(True)
+
+    def close(self, number_of_consumers=1):
+        for _ in range(number_of_consumers):
+            self._ready_slots.put(None)
+
+    def get(self, block=True, timeout=None):
+        try:
+            slot = self._ready_slots.get(block, timeout)
+        except Empty:
+            return(None, False)
+        if( slot is None ):
+            return(None, True)
+        return((slot, self._frame_indexes[slot], self._timestamps[slot]), False)
+
+    def get_batch(self, batch_size):
+        batch = []
+        item, is_closed = self.get()
+        while( not is_closed ):
+            batch.append(item)
+            if( len(batch) == batch_size ):
+                break
+            item, is_closed = self.get(block=False)
+            if( item is None ):
+                break
+        return(batch, is_closed)
+
+    def release(self, slot):
+        self._free_slots.put(slot)
+
+    def put_result(self, result):
+        self._results.put(result)
+
+    def get_result(self, block=True, timeout=None):
+        try:
+            return(self._results.get(block, timeout))
+        except Empty:
+            return(None)
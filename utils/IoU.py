@@ -37,3 +37,20 @@ def IoU(box, boxes):
     ovrerlap = inter / (box_area + area - inter)
     return(ovrerlap)
 
+def IoU_matrix(boxes, other_boxes):
+    # Pairwise IoU of N boxes against M boxes as an N x M matrix.
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    other_boxes = np.asarray(other_boxes, dtype=np.float64).reshape(-1, 4)
+
+    box_area = (boxes[:, 2] - boxes[:, 0] + 1) * (boxes[:, 3] - boxes[:, 1] + 1)
+    area = (other_boxes[:, 2] - other_boxes[:, 0] + 1) * (other_boxes[:, 3] - other_boxes[:, 1] + 1)
+    xx1 = np.maximum(boxes[:, 0:1], other_boxes[:, 0])
+    yy1 = np.maximum(boxes[:, 1:2], other_boxes[:, 1])
+    xx2 = np.minimum(boxes[:, 2:3], other_boxes[:, 2])
+    yy2 = np.minimum(boxes[:, 3:4], other_boxes[:, 3])
+
+    w = np.maximum(0, xx2 - xx1 + 1)
+    h = np.maximum(0, yy2 - yy1 + 1)
+
+    inter = w * h
+    return(inter / (box_area[:, np.newaxis] + area - inter))
@@ -0,0 +1,142 @@
+# MIT License
+# 
+# Copyright (c) 2018
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import mmap
+import json
+import struct
+
+import numpy as np
+
+class WeightFile(object):
+
+    # Magic, format version and header length, followed by the JSON header and the tensor data.
+    __magic = b'MTCNNWGT'
+    __version = 1
+    __prefix = struct.Struct('<8sII')
+    __alignment = 64
+
+    __data_types = ['float32', 'float16', 'int8']
+
+    def __init__(self, file_name):
+        self._file_name = file_name
+        self._file = open(file_name, 'rb')
+        self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, header_length = WeightFile.__prefix.unpack_from(self._buffer, 0)
+        if( (magic != WeightFile.__magic) or (version != WeightFile.__version) ):
+            raise ValueError('Invalid weight file ' + file_name + '.')
+
+        header = json.loads(self._buffer[WeightFile.__prefix.size:WeightFile.__prefix.size + header_length].decode('utf-8'))
+        self._data_offset = WeightFile._aligned(WeightFile.__prefix.size + header_length)
+        self._tensors = dict( (tensor['name'], tensor) for tensor in header['tensors'] )
+
+    @classmethod
+    def data_types(cls):
+        return(cls.__data_types)
+
+    @classmethod
+    def _aligned(cls, offset):
+        return( (offset + cls.__alignment - 1) // cls.__alignment * cls.__alignment )
+
+    @classmethod
+    def write(cls, file_name, model_weights, data_type='float32'):
+        if( data_type not in cls.__data_types ):
+            return(False)
+
+        tensors = []
+        arrays = []
+        offset = 0
+        for network_name in sorted(model_weights.keys()):
+            for variable_name in sorted(model_weights[network_name].keys()):
+                value = np.asarray(model_weights[network_name][variable_name], dtype=np.float32)
+                tensor = { 'name': network_name + '/' + variable_name, 'shape': list(value.shape) }
+
+                # Only the multi-dimensional kernels are reduced, biases and PReLU slopes stay float32.
+                if( (data_type == 'int8') and (value.ndim > 1) ):
+                    # Symmetric quantization with one scale per output channel.
+                    scale = np.abs(value.reshape(-1, value.shape[-1])).max(axis=0) / 127.0
+                    scale[scale == 0] = 1.0
+                    tensor['scale'] = scale.tolist()
+                    value = np.clip(np.round(value / scale), -127, 127).astype(np.int8)
+                elif( (data_type == 'float16') and (value.ndim > 1) ):
+                    value = value.astype(np.float16)
+
+                # Tensor offsets are relative to the aligned start of the data section.
+                offset = cls._aligned(offset)
+                tensor['data_type'] = value.dtype.name
+                tensor['offset'] = offset
+                offset = offset + value.nbytes
+
+                tensors.append(tensor)
+                arrays.append(value)
+
+        header = json.dumps({ 'tensors': tensors }).encode('utf-8')
+        data_offset = cls._aligned(cls.__prefix.size + len(header))
+
+        with open(file_name, 'wb') as weight_file:
+            weight_file.write(cls.__prefix.pack(cls.__magic, cls.__version, len(header)))
+            weight_file.write(header)
+            for tensor, value in zip(tensors, arrays):
+                weight_file.seek(data_offset + tensor['offset'])
+                weight_file.write(value.tobytes())
+
+        return(True)
+
+    def file_name(self):
+        return(self._file_name)
+
+    def tensor_names(self):
+        return(sorted(self._tensors.keys()))
+
+    def network_names(self):
+        return(sorted(set( tensor_name.split('/')[0] for tensor_name in self._tensors )))
+
+    def raw_tensor(self, tensor_name):
+        tensor = self._tensors[tensor_name]
+        shape = tuple(tensor['shape'])
+        return(np.frombuffer(self._buffer, dtype=np.dtype(tensor['data_type']), count=int(np.prod(shape)), offset=self._data_offset + tensor['offset']).reshape(shape))
+
+    def tensor(self, tensor_name):
+        value = self.raw_tensor(tensor_name)
+        tensor = self._tensors[tensor_name]
+        if( 'scale' in tensor ):
+            return(value.astype(np.float32) * np.array(tensor['scale'], dtype=np.float32))
+        elif( value.dtype != np.float32 ):
+            return(value.astype(np.float32))
+        else:
+            return(value)
+
+    def network_weights(self, network_name):
+        prefix = network_name + '/'
+        return(dict( (tensor_name[len(prefix):], self.tensor(tensor_name)) for tensor_name in self._tensors if tensor_name.startswith(prefix) ))
+
+    def model_weights(self):
+        return(dict( (network_name, self.network_weights(network_name)) for network_name in self.network_names() ))
+
+    def close(self):
+        self._buffer.close()
+        self._file.close()
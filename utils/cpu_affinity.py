@@ -0,0 +1,109 @@
+# MIT License
+# 
+# Copyright (c) 2018
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import ctypes
+import ctypes.util
+import multiprocessing
+
+try:
+    import psutil
+    _affinity_errors = (OSError, ValueError, psutil.Error)
+except ImportError:
+    psutil = None
+    _affinity_errors = (OSError, ValueError)
+
+_cpu_set_bits = 1024
+
+def _libc():
+    library_name = ctypes.util.find_library('c')
+    if( library_name is None ):
+        return(None)
+    try:
+        libc = ctypes.CDLL(library_name, use_errno=True)
+    except OSError:
+        return(None)
+    if( not (hasattr(libc, 'sched_getaffinity') and hasattr(libc, 'sched_setaffinity')) ):
+        return(None)
+    return(libc)
+
+def _libc_cpu_set(cores=()):
+    # cpu_set_t as an array of unsigned longs, one bit per core.
+    word_bits = 8 * ctypes.sizeof(ctypes.c_ulong)
+    cpu_set = (ctypes.c_ulong * (_cpu_set_bits // word_bits))()
+    for core in cores:
+        cpu_set[core // word_bits] |= (1 << (core % word_bits))
+    return(cpu_set, word_bits)
+
+def _libc_get_affinity(libc):
+    cpu_set, word_bits = _libc_cpu_set()
+    if( libc.sched_getaffinity(0, ctypes.sizeof(cpu_set), ctypes.byref(cpu_set)) != 0 ):
+        return(None)
+    return( [ core for core in range(_cpu_set_bits) if (cpu_set[core // word_bits] >> (core % word_bits)) & 1 ] )
+
+def _libc_set_affinity(libc, cores):
+    if( max(cores) >= _cpu_set_bits ):
+        return(False)
+    cpu_set, _ = _libc_cpu_set(cores)
+    return( libc.sched_setaffinity(0, ctypes.sizeof(cpu_set), ctypes.byref(cpu_set)) == 0 )
+
+def available_cores():
+    if( hasattr(os, 'sched_getaffinity') ):
+        return( sorted(os.sched_getaffinity(0)) )
+    if( psutil is not None ):
+        return( sorted(psutil.Process().cpu_affinity()) )
+    libc = _libc()
+    cores = _libc_get_affinity(libc) if libc is not None else None
+    if( cores ):
+        return(cores)
+    return( list(range(multiprocessing.cpu_count())) )
+
+def set_cpu_affinity(cores):
+    # Pins the calling process and returns the cores it now runs on, an empty list when it could not be pinned.
+    cores = sorted(set(cores))
+    if( not cores ):
+        return([])
+    try:
+        if( hasattr(os, 'sched_setaffinity') ):
+            os.sched_setaffinity(0, cores)
+        elif( psutil is not None ):
+            psutil.Process().cpu_affinity(cores)
+        else:
+            libc = _libc()
+            if( (libc is None) or (not _libc_set_affinity(libc, cores)) ):
+                return([])
+    except _affinity_errors:
+        return([])
+    return( available_cores() )
+
+def worker_cores(worker_index, cores_per_worker, cores=None):
+    # Consecutive blocks of cores, wrapping around when there are more workers than blocks.
+    if( cores is None ):
+        cores = available_cores()
+    if( (cores_per_worker <= 0) or (not cores) ):
+        return([])
+    cores_per_worker = min(cores_per_worker, len(cores))
+    start = (worker_index * cores_per_worker) % len(cores)
+    return( [ cores[(start + index) % len(cores)] for index in range(cores_per_worker) ] )
@@ -0,0 +1,78 @@
+# MIT License
+# 
+# Copyright (c) 2018
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import struct
+
+_jpeg_frame_markers = set([0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF])
+_jpeg_standalone_markers = set([0x01] + list(range(0xD0, 0xD9)))
+
+def _jpeg_size(image_file):
+    image_file.seek(2)
+    while(True):
+        marker = image_file.read(1)
+        while(marker == b'\xff'):
+            marker = image_file.read(1)
+        if(len(marker) == 0):
+            return(None)
+        marker = ord(marker)
+        if(marker in _jpeg_standalone_markers):
+            image_file.read(1)
+            continue
+        segment = image_file.read(2)
+        if(len(segment) < 2):
+            return(None)
+        length, = struct.unpack('>H', segment)
+        if(marker in _jpeg_frame_markers):
+            frame = image_file.read(5)
+            if(len(frame) < 5):
+                return(None)
+            _, height, width = struct.unpack('>BHH', frame)
+            return((height, width))
+        image_file.seek(length - 2, 1)
+        if(image_file.read(1) != b'\xff'):
+            return(None)
+
+def read_image_size(file_name):
+    # Reads the height and width from the image header without decoding, None for unknown or broken headers.
+    try:
+        with open(file_name, 'rb') as image_file:
+            header = image_file.read(26)
+            if(header[:2] == b'\xff\xd8'):
+                size = _jpeg_size(image_file)
+            elif( (header[:8] == b'\x89PNG\r\n\x1a\n') and (header[12:16] == b'IHDR') ):
+                width, height = struct.unpack('>II', header[16:24])
+                size = (height, width)
+            elif( header[:2] == b'BM' and (len(header) == 26) ):
+                width, height = struct.unpack('<ii', header[18:26])
+                size = (abs(height), width)
+            else:
+                size = None
+    except (IOError, OSError, struct.error):
+        return(None)
+
+    if( (size is None) or (size[0] <= 0) or (size[1] <= 0) ):
+        return(None)
+    return(size)
@@ -24,11 +24,22 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import numpy as np
 import tensorflow as tf
 
 def prelu(inputs):
     alphas = tf.get_variable("alphas", shape=inputs.get_shape()[-1], dtype=tf.float32, initializer=tf.constant_initializer(0.25))
+    # Written as relu(x) + (-alpha) * relu(-x), which the TensorFlow Lite converter fuses into one PReLU operation.
     pos = tf.nn.relu(inputs)
-    neg = alphas * (inputs-abs(inputs))*0.5
+    neg = (-alphas) * tf.nn.relu(-inputs)
     return( pos + neg )
 
+def fused_prelu(inputs, alphas):
+    # With known slopes PReLU is max(x, alpha * x) for alpha <= 1 and min(x, alpha * x) for alpha > 1.
+    alphas = np.asarray(alphas, dtype=np.float32)
+    if( np.all(alphas <= 1.0) ):
+        return( tf.maximum(inputs, inputs * alphas) )
+    if( np.all(alphas > 1.0) ):
+        return( tf.minimum(inputs, inputs * alphas) )
+    signs = np.where(alphas <= 1.0, 1.0, -1.0).astype(np.float32)
+    return( tf.maximum(inputs * signs, inputs * (signs * alphas)) * signs )
@@ -40,6 +40,18 @@ $ python webcamera_demo.py \
 	 --webcamera_id=0 \
 	 --threshold=0.125 \
 	 --model_root_dir=/mtcnn/models/mtcnn/deploy/
+
+$ python webcamera_demo.py \
+	 --webcamera_id=0 \
+	 --motion_gated
+
+$ python webcamera_demo.py \
+	 --webcamera_id=0 \
+	 --adaptive_pyramid
+
+$ python webcamera_demo.py \
+	 --webcamera_id=0 \
+	 --number_of_workers=2
 ```
 """
 
@@ -55,14 +67,22 @@ import cv2
 import numpy as np
 
 from nets.FaceDetector import FaceDetector
+from nets.FaceDetectorSupervisor import FaceDetectorSupervisor
+from nets.AdaptiveScalePlanner import AdaptiveScalePlanner
+from nets.MotionGatedFaceDetector import MotionGatedFaceDetector
 from nets.NetworkFactory import NetworkFactory
+from utils.FrameRingBuffer import FrameRingBuffer
 
 def parse_arguments(argv):
 	parser = argparse.ArgumentParser()
 	parser.add_argument('--webcamera_id', type=int, help='Webcamera ID.', default=0)
 	parser.add_argument('--threshold', type=float, help='Lower threshold value for face probability (0 to 1.0).', default=0.125)
-	parser.add_argument('--model_root_dir', type=str, help='Input model root directory where model weights are saved.', default=None)
+	parser.add_argument('--model_root_dir', type=str, help='Input model root directory where model weights are saved, or a weight file.', default=None)
+	parser.add_argument('--network_names', type=str, help='Comma separated PNet, RNet and ONet stage network names, PNet,RNet,ONet by default.', default=None)
 	parser.add_argument('--test_mode', action='store_true')
+	parser.add_argument('--adaptive_pyramid', action='store_true', help='Narrow the image pyramid to the face sizes observed in the stream.')
+	parser.add_argument('--number_of_workers', type=int, help='Number of detection worker processes, 0 to detect in the capture process.', default=0)
+	parser.add_argument('--motion_gated', action='store_true', help='Run detection only on the regions that changed since the last detection.')
 	return(parser.parse_args(argv))
 
 def main(args):
@@ -73,18 +93,52 @@ def main(args):
 			model_root_dir = NetworkFactory.model_train_dir()
 		else:
 			model_root_dir = NetworkFactory.model_deploy_dir()
+	network_names = NetworkFactory.cascade_network_names(args.network_names)
+
+	if(args.number_of_workers > 0):
+		if(args.adaptive_pyramid or args.motion_gated):
+			raise ValueError('Detection worker processes can not be used with --adaptive_pyramid or --motion_gated.')
+		face_detector = None
+	else:
+		face_detector = FaceDetector(model_root_dir, network_names=network_names)
+		if(args.adaptive_pyramid):
+			face_detector = AdaptiveScalePlanner(face_detector)
+		if(args.motion_gated):
+			face_detector = MotionGatedFaceDetector(face_detector)
 
-	face_detector = FaceDetector(model_root_dir)
 	webcamera = cv2.VideoCapture(args.webcamera_id)
 	webcamera.set(3, 600)
 	webcamera.set(4, 800)
+
+	ring_buffer = None
+	frame_index = 0
+	latest_frame_index = -1
+	boxes_c = np.zeros((0, 5))
 	
 	while True:
     		start_time = cv2.getTickCount()
     		status, current_frame = webcamera.read()
     		if status:
         		image = np.array(current_frame)
-        		boxes_c, landmarks = face_detector.detect(image)
+			if(face_detector):
+				boxes_c, landmarks = face_detector.detect(image)
+			else:
+				if(ring_buffer is None):
+					height, width, channels = image.shape
+					ring_buffer = FrameRingBuffer(2 * args.number_of_workers, height, width, channels)
+					supervisor = FaceDetectorSupervisor(ring_buffer, model_root_dir, args.number_of_workers, network_names=network_names)
+					if( not supervisor.start() ):
+						raise ValueError('Error loading the models from ' + model_root_dir + '.')
+					supervisor.print_statistics()
+
+				# Frames are dropped while all workers are busy, and the latest detections are drawn.
+				ring_buffer.put(image, frame_index, block=False)
+				frame_index = frame_index + 1
+				result = ring_buffer.get_result(block=False)
+				while(result is not None):
+					if(result[0] > latest_frame_index):
+						latest_frame_index, _, boxes_c, landmarks = result
+					result = ring_buffer.get_result(block=False)
 
 			end_time = cv2.getTickCount()
         		time_duration = (end_time - start_time) / cv2.getTickFrequency()
@@ -106,6 +160,8 @@ def main(args):
         		print('Error detecting the webcamera.')
         		break
 
+	if(ring_buffer):
+		ring_buffer.close(args.number_of_workers)
 	webcamera.release()
 	cv2.destroyAllWindows()
 